@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+'''Benchmarks.
+
+Usage: python -m aterm._bench [FILE]...
+
+Reports the memory used by the terms read from the given files (e.g., the
+translations in the examples directory), or from a synthetic module when no
+file is given.
+'''
+
+
+import sys
+
+from aterm.factory import factory
+from aterm import types
+
+
+def _synthetic(size = 10000):
+	'''Synthetic module, resembling the translation of a real binary.'''
+	stmt = 'Assign(Int(32,Signed),Sym("eax"){Path([%d])},Binary(Plus(Int(32,Signed)),Sym("ebx"),Lit(Int(32,Signed),%d)))'
+	stmts = [stmt % (i, i % 64) for i in range(size)]
+	return 'Module([Function(Void,"main",[],[' + ','.join(stmts) + '])])'
+
+
+def memory(term):
+	'''Count the term nodes, and the bytes taken by them. Shared nodes, and
+	shared argument tuples, are only counted once in the size.'''
+	seen = set()
+	nodes = 0
+	size = 0
+	stack = [term]
+	while stack:
+		term = stack.pop()
+		nodes += 1
+		type = term.type
+		if type == types.APPL:
+			stack.extend(term.args)
+			stack.append(term.annotations)
+		elif type == types.CONS:
+			stack.append(term.head)
+			stack.append(term.tail)
+		for obj in (term, getattr(term, 'args', None)):
+			if obj is not None and id(obj) not in seen:
+				seen.add(id(obj))
+				size += sys.getsizeof(obj)
+	return nodes, size
+
+
+def main():
+	names = sys.argv[1:]
+	if names:
+		inputs = [(name, factory.readFromFile(open(name, 'rb'))) for name in names]
+	else:
+		inputs = [('<synthetic>', factory.parse(_synthetic()))]
+	for name, term in inputs:
+		nodes, size = memory(term)
+		sys.stdout.write('%s: %d nodes, %d bytes, %.1f bytes/node\n' % (name, nodes, size, float(size)/nodes))
+
+
+if __name__ == '__main__':
+	main()
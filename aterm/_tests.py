@@ -3,12 +3,19 @@
 
 
 import unittest
+import tempfile
+import weakref
+from cStringIO import StringIO
 
 from aterm.factory import factory
 from aterm import types
+from aterm import exception
 from aterm import lists
 from aterm import annotation
 from aterm import path
+from aterm import visitor
+from aterm import walker
+from aterm import term as term_
 
 
 class TestTerm(unittest.TestCase):
@@ -188,6 +195,39 @@ class TestTerm(unittest.TestCase):
 
 				self.failUnlessEqual(term1Str, term2Str)
 
+	def testIterative(self):
+		from aterm import compare
+		from aterm import write
+
+		# must agree with the recursive visitors
+		for terms1Str in self.identityTestCases:
+			for term1Str in terms1Str:
+				term1 = factory.parse(term1Str)
+				fp = StringIO()
+				write.TextWriter(fp).visit(term1)
+				self.failUnlessEqual(str(term1), fp.getvalue())
+				for terms2Str in self.identityTestCases:
+					for term2Str in terms2Str:
+						term2 = factory.parse(term2Str)
+						self.failUnlessEqual(
+							compare.isEquivalent(term1, term2),
+							compare._EquivalenceComparator().visit(term1, term2)
+						)
+						self.failUnlessEqual(
+							compare.isEqual(term1, term2),
+							compare._EqualityComparator().visit(term1, term2)
+						)
+
+		# long lists and deep terms must not exhaust the stack
+		depth = 10000
+		termStr = '[' + 'C(' * depth + '[' + ','.join(['1'] * depth) + ']' + ')' * depth + ']'
+		term1 = factory.readFromTextFile(StringIO(termStr))
+		term2 = factory.readFromTextFile(StringIO(termStr))
+		self.failIf(term1 is term2)
+		self.failUnless(term1.isEqual(term2))
+		self.failUnlessEqual(term1.getHash(), term2.getHash())
+		self.failUnlessEqual(str(term1), termStr)
+
 	matchTestCases = [
 		# ints
 		('1', '_', True, ['1'], {}),
@@ -317,6 +357,54 @@ class TestTerm(unittest.TestCase):
 			result = factory.make(patternStr, *args, **kargs)
 			self.failUnlessEqual(result, expectedResult)
 
+	def testCompile(self):
+		matcher = factory.compileMatch('C(x,_)')
+		self.failUnless(factory.compileMatch('C(x,_)') is matcher)
+		match = matcher.match(factory.parse('C(1,2)'))
+		self.failUnlessEqual(match.args, [factory.parse('2')])
+		self.failUnlessEqual(match.kargs, {'x': factory.parse('1')})
+		self.failUnless(matcher.match(factory.parse('D(1,2)')) is None)
+
+		builder = factory.compileMake('C(x,_)')
+		self.failUnless(factory.compileMake('C(x,_)') is builder)
+		self.failUnlessEqual(builder.make(2, x = 1), factory.parse('C(1,2)'))
+		self.failUnlessEqual(builder.make('s', x = [factory.makeInt(1)]), factory.parse('C([1],"s")'))
+
+	def testLRUCache(self):
+		from aterm import cache
+		lru = cache.LRUCache(8)
+		for i in range(8):
+			lru[i] = str(i)
+		self.failUnlessEqual(lru[0], '0')
+		lru[8] = '8'
+		self.failUnless(len(lru) <= 8)
+		self.failUnless(0 in lru)
+		self.failUnless(8 in lru)
+		self.failIf(1 in lru)
+		self.failUnlessRaises(KeyError, lru.__getitem__, 1)
+		self.failUnlessEqual(lru.get(1), None)
+
+	def testParseCache(self):
+		factory.parseCache.clear()
+		stats = factory.parseCache.getStats()
+		term = factory.parse('C(1,2)')
+		self.failUnless(factory.parse('C(1,2)') is term)
+		newStats = factory.parseCache.getStats()
+		self.failUnlessEqual(newStats['hits'], stats['hits'] + 1)
+		self.failUnlessEqual(newStats['misses'], stats['misses'] + 1)
+
+		# bounded by the approximate size of the terms
+		factory.setParseCacheSize(1000*factory.PARSE_CACHE_BYTES_PER_CHAR)
+		try:
+			for i in range(1000):
+				factory.parse('C(%d)' % i)
+			self.failUnless(factory.parseCache.size <= 1000*factory.PARSE_CACHE_BYTES_PER_CHAR)
+			self.failUnless(factory.parseCache.getStats()['evictions'] > stats['evictions'])
+			# recently used terms are kept
+			self.failUnless('C(999)' in factory.parseCache)
+		finally:
+			factory.setParseCacheSize(factory.MAX_PARSE_CACHE_SIZE)
+
 	def _testHash(self, cmpf, hashf, msg = None):
 		for terms1Str in self.identityTestCases:
 			for term1Str in terms1Str:
@@ -362,6 +450,89 @@ class TestTerm(unittest.TestCase):
 			msg = 'python'
 		)
 
+	def testHashCache(self):
+		term = factory.parse('C(1,[2,3]){A(4)}')
+		self.failUnless(term._hash is None)
+		hash1 = term.getStructuralHash()
+		self.failUnlessEqual(term._hash, hash1)
+		self.failUnlessEqual(term.args[1]._hash, term.args[1].getStructuralHash())
+		self.failUnlessEqual(hash1, term.removeAnnotations().getStructuralHash())
+		self.failIfEqual(term.getHash(), term.removeAnnotations().getHash())
+		# the other values are only allocated once cached
+		self.failUnlessEqual(term._hash, [hash1, term.getHash(), None, None])
+		self.failUnlessEqual(term.getStructuralHash(), hash1)
+
+		# long lists must not exhaust the stack
+		term = factory.makeList([factory.makeInt(i) for i in range(10000)])
+		self.failUnlessEqual(hash(term), hash(factory.makeList(list(term))))
+		self.failUnless(isinstance(term.getHash(), int))
+
+	def testDigest(self):
+		term = factory.parse('C(1,0.5,"s",[D]){A}')
+		# digests must be stable across runs
+		self.failUnlessEqual(term.getDigest(), 14007878813836887572L)
+		self.failUnlessEqual(term.getDigest(True), 3690108266510599858L)
+		self.failUnlessEqual(term.removeAnnotations().getDigest(True), term.getDigest())
+		self.failUnlessEqual(term._hash[2:], [term.getDigest(), term.getDigest(True)])
+
+		for terms1Str in self.identityTestCases:
+			for term1Str in terms1Str:
+				for terms2Str in self.identityTestCases:
+					for term2Str in terms2Str:
+						term1 = factory.parse(term1Str)
+						term2 = factory.parse(term2Str)
+						self.failUnlessEqual(
+							term1.getDigest() == term2.getDigest(),
+							term1Str == term2Str,
+							'%s vs %s' % (term1Str, term2Str)
+						)
+
+	def testCompact(self):
+		term = factory.parse('C(1,"s")')
+		self.failUnless(term.factory is factory)
+		self.failUnless(term.annotations is factory.makeNil())
+		self.failIf(isinstance(term, term_.AnnotatedAppl))
+		self.failUnless(isinstance(factory.parse('C{A}'), term_.AnnotatedAppl))
+		self.failUnless(factory.parse('C{A}').removeAnnotations().annotations is factory.makeNil())
+
+		# common literals are pooled
+		self.failUnless(factory.makeInt(1) is factory.makeInt(1))
+		self.failUnless(factory.makeStr('eax') is factory.makeStr('eax'))
+		self.failUnless(term.args[0] is factory.makeInt(1))
+
+		# arguments are still checked
+		self.failUnlessRaises(TypeError, factory.makeAppl, 1)
+		self.failUnlessRaises(TypeError, factory.makeAppl, 'C', [1])
+		self.failUnlessRaises(TypeError, factory.makeAppl, 'C', [], 1)
+		self.failUnlessRaises(TypeError, factory.makeCons, 1, factory.makeNil())
+		self.failUnlessRaises(TypeError, factory.makeCons, term, term)
+		self.failUnlessRaises(TypeError, factory.makeList, [1])
+		self.failUnlessRaises(TypeError, factory.makeInt, 0.5)
+		self.failUnlessRaises(TypeError, factory.makeStr, 1)
+
+	def testMetrics(self):
+		from aterm import metrics
+		self.failUnless(factory.getMetrics() is None)
+		factory.setMetrics(True)
+		try:
+			one = factory.makeInt(1)
+			term = factory.makeAppl('C', [one, factory.makeList([one, factory.makeInt(1)])])
+			factory.parse('Metrics(1,2)')
+			snapshot = factory.getMetrics()
+			self.failUnlessEqual(snapshot['nodes']['Appl'], 2)
+			self.failUnlessEqual(snapshot['nodes']['Cons'], 2)
+			self.failUnless(snapshot['poolHits'] >= 1)
+			self.failUnlessEqual(snapshot['parseCache']['misses'], 1)
+			self.failUnless(snapshot['liveNodes'] >= 4)
+			self.failUnless(snapshot['peakLiveNodes'] >= snapshot['liveNodes'])
+
+			fp = StringIO()
+			metrics.dump(factory, 'stage', fp)
+			self.failUnless(fp.getvalue().startswith('metrics: stage: nodes Int='))
+			self.failUnlessEqual(factory.getMetrics()['nodes']['Appl'], 0)
+		finally:
+			factory.setMetrics(False)
+
 	def testAnnotations(self):
 		for terms1Str in self.identityTestCases:
 			for term1Str in terms1Str:
@@ -394,14 +565,332 @@ class TestTerm(unittest.TestCase):
 
 				self.failUnless(term.isEquivalent(term1))
 
+	def testAnnotationIndex(self):
+		term1 = factory.parse('C(1){X,Y(1)}')
+		term2 = annotation.set(term1, factory.parse('Z'))
+		self.failUnless(isinstance(term2.annotations, annotation.Annotations))
+		self.failUnless(term2.annotations.tail is term1.annotations)
+		self.failUnlessEqual(term2, term1)
+		self.failUnlessEqual(str(term2), 'C(1){Z,X,Y(1)}')
+		self.failUnlessEqual(annotation.get(term2, 'Y'), factory.parse('Y(1)'))
+		self.failUnless(annotation.set(term2, annotation.get(term2, 'Z')) is term2)
+
+		term3 = annotation.set(term2, factory.parse('Y(2)'))
+		self.failUnlessEqual(str(term3), 'C(1){Y(2),Z,X}')
+		self.failUnlessEqual(annotation.get(term3, 'Y'), factory.parse('Y(2)'))
+
+		# the index must not leak into the list tails
+		term4 = term3.setAnnotations(term3.annotations.tail)
+		self.failUnlessRaises(ValueError, annotation.get, term4, 'Y')
+
+		# updated annotations are moved to the front, and duplicates removed
+		term5 = annotation.set(term2, factory.parse('X'))
+		self.failUnlessEqual(str(term5), 'C(1){X,Z,Y(1)}')
+		self.failUnlessEqual(annotation.get(term5, 'Z'), factory.parse('Z'))
+		term6 = factory.parse('C(1){X(1),Y,X(2)}')
+		term7 = annotation.set(term6, factory.parse('X(1)'))
+		self.failUnlessEqual(str(term7), 'C(1){X(1),Y}')
+		self.failUnlessEqual(annotation.get(term7, 'X'), factory.parse('X(1)'))
+		term8 = annotation.set(term6, factory.parse('Y'))
+		self.failUnlessEqual(str(term8), 'C(1){Y,X(1),X(2)}')
+		self.failUnlessEqual(annotation.get(term8, 'X'), factory.parse('X(1)'))
+		self.failUnless(annotation.remove(term4, 'Y') is term4)
+		self.failUnlessEqual(str(annotation.remove(term3, 'Z')), 'C(1){Y(2),X}')
+
+
+class TestReader(unittest.TestCase):
+
+	readTestCases = [
+		'0',
+		'-12',
+		'1.5',
+		'-.5E-3',
+		'""',
+		'"a\\"b\\n"',
+		'[]',
+		'[ 1 , [2] ]',
+		'C',
+		'C()',
+		'C ( 1 , "s" )',
+		'()',
+		'(1,[])',
+		'C{A}',
+		'C(1){A,B([2])}',
+		'Module([Func(A{P([0])},[Ret(1)]){P([])}])',
+	]
+
+	def testRead(self):
+		from aterm import lexer
+		from aterm import reader
+		for termStr in self.readTestCases:
+			expected = factory._parse(lexer.Lexer(termStr))
+			result = reader.TextReader(factory).read(termStr)
+			self.failUnless(result.isEqual(expected), termStr)
+
+	readErrorTestCases = [
+		'',
+		'C(',
+		'C(1,)',
+		'[1,]',
+		'[1,,2]',
+		'(1){A,}',
+		'C)',
+		'C D',
+		'_',
+		'x',
+		'[*]',
+		'C(1){',
+	]
+
+	def testReadError(self):
+		from aterm import reader
+		for termStr in self.readErrorTestCases:
+			self.failUnlessRaises(exception.ParseError, reader.TextReader(factory).read, termStr)
+
+	def testDeep(self):
+		from aterm import reader
+		depth = 100000
+		termStr = 'C(' * depth + '[]' + ')' * depth
+		result = reader.TextReader(factory).read(termStr)
+		self.failUnlessEqual(str(result), termStr)
+		for i in range(depth):
+			self.failUnlessEqual(result.name, 'C')
+			result = result.args[0]
+		self.failUnless(result is factory.makeNil())
+
+	def testShared(self):
+		from aterm import reader
+		for termStr in self.readTestCases:
+			term = factory.parse(termStr)
+			fp = StringIO()
+			term.writeToSharedTextFile(fp)
+			result = reader.TextReader(factory).read(fp.getvalue())
+			self.failUnless(result.isEquivalent(term), termStr)
+
+		term = factory.parse('C(1){A}')
+		term = factory.makeList([term, factory.makeAppl('D', [term, term])])
+		for i in range(12):
+			term = factory.makeAppl('E', [term, term])
+		fp = StringIO()
+		term.writeToSharedTextFile(fp)
+		self.failUnless(len(fp.getvalue()) < 128)
+		result = reader.TextReader(factory).read(fp.getvalue())
+		self.failUnless(result.isEquivalent(term))
+		self.failUnless(result.args[0] is result.args[1])
+
+		fp = tempfile.TemporaryFile()
+		term.writeToSharedTextFile(fp)
+		fp.seek(0)
+		result = factory.readFromTextFile(fp, lazy = True)
+		self.failUnless(result.args[0] is result.args[1])
+
+		self.failUnlessRaises(exception.ParseError, reader.TextReader(factory).read, '!C(#B)')
+		self.failUnlessRaises(exception.ParseError, reader.TextReader(factory).read, 'C(#A)')
+
+
+class TestBinary(unittest.TestCase):
+
+	binaryTestCases = [
+		'0',
+		'-1',
+		'123456789012345678901234567890',
+		'-123456789012345678901234567890',
+		'0.1',
+		'-1.5E10',
+		'""',
+		'"s\\n\\t"',
+		'[]',
+		'[1,2,[3]]',
+		'C',
+		'C(1,0.2,"s",[])',
+		'()',
+		'(1,C(2))',
+		'C{A}',
+		'C(D{B(1)},D{B(1)}){A,B(1)}',
+	]
+
+	def testRoundTrip(self):
+		for termStr in self.binaryTestCases:
+			term = factory.parse(termStr)
+			fp = StringIO()
+			term.writeToBinaryFile(fp)
+			fp.seek(0)
+			result = factory.readFromBinaryFile(fp)
+			self.failUnless(result.isEqual(term), termStr)
+			fp.seek(0)
+			result = factory.readFromFile(fp)
+			self.failUnless(result.isEqual(term), termStr)
+
+	def testTextDetection(self):
+		fp = StringIO('C(1)')
+		self.failUnlessEqual(str(factory.readFromFile(fp)), 'C(1)')
+
+	def testSharing(self):
+		sub = factory.parse('Sym("eax"){Reg}')
+		term = factory.makeList([sub]*100)
+		fp = StringIO()
+		term.writeToBinaryFile(fp)
+		data = fp.getvalue()
+		self.failUnless(len(data) < 3*100 + 32)
+		result = factory.readFromBinaryFile(StringIO(data))
+		self.failUnless(result.isEqual(term))
+		self.failUnless(result[0] is result[99])
+
+	def testDeep(self):
+		term = factory.makeNil()
+		for i in range(10000):
+			term = factory.makeAppl('C', [term])
+		fp = StringIO()
+		term.writeToBinaryFile(fp)
+		fp.seek(0)
+		result = factory.readFromBinaryFile(fp)
+		for i in range(10000):
+			self.failUnlessEqual(result.name, 'C')
+			result = result.args[0]
+		self.failUnless(result is factory.makeNil())
+
+	def testPickle(self):
+		import pickle
+		import cPickle
+		import copy
+		for termStr in self.binaryTestCases:
+			term = factory.parse(termStr)
+			for module in (pickle, cPickle):
+				for protocol in (0, 2):
+					result = module.loads(module.dumps(term, protocol))
+					self.failUnless(result.isEqual(term), termStr)
+			self.failUnless(copy.copy(term) is term)
+			self.failUnless(copy.deepcopy(term) is term)
+
+		sub = factory.parse('Sym("eax"){Reg}')
+		term = factory.makeList([sub]*100)
+		for i in range(10000):
+			term = factory.makeAppl('C', [term])
+		result = cPickle.loads(cPickle.dumps(term, 2))
+		self.failUnless(result.isEqual(term))
+		for i in range(10000):
+			result = result.args[0]
+		self.failUnless(result[0] is result[99])
+
+	def testMalformed(self):
+		from aterm import exception
+		for data in ['', 'C(1)', '\x00ATB\x01', '\x00ATB\x01\x05', '\x00ATB\x01\x3f']:
+			self.failUnlessRaises(exception.ParseError, factory.readFromBinaryFile, StringIO(data))
+
+
+class TestLazy(unittest.TestCase):
+
+	lazyTestCases = [
+		'1',
+		'-0.5',
+		'"s,(]"',
+		'[]',
+		'[ ]',
+		'[1, [2,3], "]"]',
+		'C',
+		'C{A}',
+		'C()',
+		'( )',
+		'(1,2)',
+		'C(1, D(2,[3,4]){A(5)}, "(")',
+		'C ( [D(1),E] ) { A, B([1]) }',
+		'Module([Func(A,[Ret(1),Ret(2)]),Func(B,[])])',
+	]
+
+	def testLoad(self):
+		from aterm import lazy
+		for termStr in self.lazyTestCases:
+			expected = factory.parse(termStr)
+			for threshold in (0, 4, 4096):
+				fp = tempfile.TemporaryFile()
+				fp.write(' ' + termStr + '\n')
+				fp.seek(0)
+				result = lazy.load(factory, fp, threshold)
+				self.failUnless(result.isEqual(expected), '%s (%d)' % (termStr, threshold))
+				self.failUnlessEqual(str(result), str(expected))
+
+	def testLaziness(self):
+		from aterm import lazy
+		loader = lazy.Loader(factory, 'Module([F(1),G([2,3])]){A}', 0)
+		term = loader.decode(0)
+		self.failUnlessEqual(term.name, 'Module')
+		self.failUnlessEqual(str(term.annotations), '[A]')
+		self.failIfEqual(term._positions, None)
+		body = term.args[0]
+		self.failUnlessEqual(term._positions, None)
+		self.failUnless(body._index == 0)
+		self.failUnlessEqual(str(body.tail.head), 'G([2,3])')
+
+	def testMalformed(self):
+		from aterm import lazy
+		for buf in ['', 'C(1', '[1,2']:
+			loader = lazy.Loader(factory, buf, 0)
+			self.failUnlessRaises(exception.ParseError, loader.decode, 0)
+
+
+class TestSharing(unittest.TestCase):
+
+	sharingTestCases = [
+		'1',
+		'0.1',
+		'"s"',
+		'[1,2]',
+		'C(1,[2,3])',
+		'C(1){A}',
+	]
+
+	def setUp(self):
+		factory.setSharing(True)
+
+	def tearDown(self):
+		factory.setSharing(False)
+
+	def testSharing(self):
+		for termStr in self.sharingTestCases:
+			term1 = factory.readFromTextFile(StringIO(termStr))
+			term2 = factory.readFromTextFile(StringIO(termStr))
+			self.failUnless(term1 is term2, termStr)
+
+	def testAnnotations(self):
+		term1 = factory.makeAppl('C', [factory.makeInt(1)])
+		term2 = annotation.set(term1, factory.parse('A'))
+		self.failIf(term1 is term2)
+		self.failUnless(term2.removeAnnotations() is term1)
+
+	def testLiteralTypes(self):
+		self.failIf(factory.makeInt(1) is factory.makeReal(1.0))
+		self.failUnless(factory.makeReal(0.0) is factory.makeReal(0.0))
+		self.failIf(factory.makeReal(0.0) is factory.makeReal(-0.0))
+		self.failUnlessEqual(str(factory.parse('C(-0.0,0.0)')), 'C(-0.0,0.0)')
+		self.failUnlessRaises(TypeError, factory.makeStr, u's')
+
+	def testPatterns(self):
+		# patterns compiled without sharing hold unshared literal subterms
+		factory.setSharing(False)
+		factory.make('C(1234,x)', x = 1)
+		factory.setSharing(True)
+		self.failUnless(factory.make('C(1234,x)', x = 1) is factory.parse('C(1234,1)'))
+
+	def testLazy(self):
+		from aterm import lazy
+		termStr = 'C([1,2],D(3))'
+		self.failUnless(factory.readFromTextFile(StringIO(termStr), lazy = True) is factory.parse(termStr))
+		self.failUnlessRaises(ValueError, lazy.load, factory, StringIO(termStr))
+
+	def testWeak(self):
+		term1 = factory.makeAppl('C', [factory.makeInt(1234)])
+		ref = weakref.ref(term1)
+		del term1
+		self.failUnless(ref() is None)
+
 
 class TestList(unittest.TestCase):
 
 	splitTestCases = [
 		('[0,1,2,3]', 0, '[]', '[0,1,2,3]'),
-		('[0,1,2,3]', 1, '[0,]', '[1,2,3]'),
-		('[0,1,2,3]', 2, '[0,1,]', '[2,3]'),
-		('[0,1,2,3]', 3, '[0,1,2,]', '[3]'),
+		('[0,1,2,3]', 1, '[0]', '[1,2,3]'),
+		('[0,1,2,3]', 2, '[0,1]', '[2,3]'),
+		('[0,1,2,3]', 3, '[0,1,2]', '[3]'),
 		('[0,1,2,3]', 4, '[0,1,2,3]', '[]'),
 	]
 
@@ -416,6 +905,11 @@ class TestList(unittest.TestCase):
 			self.failUnlessEqual(head, expectedHead)
 			self.failUnlessEqual(tail, expectedTail)
 
+		input = factory.parse('[0,1,2,3]')
+		for index in (-1, 5):
+			self.failUnlessRaises(IndexError, lists.split, input, index)
+			self.failUnlessRaises(IndexError, lists.insert, input, index, factory.makeInt(4))
+
 	rangeTestCases = [
 		('[0,1,2]', 0, 0, '[0,1,2]'),
 		('[0,1,2]', 0, 1, '[X(0),1,2]'),
@@ -431,6 +925,101 @@ class TestList(unittest.TestCase):
 
 
 
+class TestVector(unittest.TestCase):
+
+	def testList(self):
+		for size in (0, 1, 31, 32, 33, 1000):
+			elms = [factory.makeInt(i) for i in range(size)]
+			expected = factory.makeList(elms)
+			result = factory.makeVector(elms)
+			self.failUnlessEqual(result, expected)
+			self.failUnlessEqual(hash(result), hash(expected))
+			self.failUnlessEqual(str(result), str(expected))
+			self.failUnlessEqual(len(result), size)
+			self.failUnlessEqual(list(result), elms)
+			for index in range(size):
+				self.failUnless(result[index] is elms[index])
+			self.failUnlessRaises(IndexError, result.__getitem__, size)
+			if size:
+				self.failUnless(types.isCons(result))
+				self.failUnless(result.head is elms[0])
+				self.failUnlessEqual(result.tail, expected.tail)
+				self.failUnlessEqual(len(result.tail), size - 1)
+				self.failUnless(result.rmatch('[_,*]'))
+			else:
+				self.failUnless(types.isNil(result))
+		self.failUnlessRaises(TypeError, factory.makeVector, [factory.makeInt(0), 1])
+
+	def testSplice(self):
+		size = 1000
+		elms = [factory.makeInt(i) for i in range(size)]
+		vector = factory.makeVector(elms)
+		for index in (0, 1, 31, 32, 500, 999, 1000):
+			head, tail = vector.split(index)
+			self.failUnlessEqual(list(head), elms[:index])
+			self.failUnlessEqual(list(tail), elms[index:])
+			self.failUnlessEqual(list(head.extend(tail)), elms)
+			self.failUnlessEqual(list(vector.insert(index, factory.makeStr('x'))), elms[:index] + [factory.makeStr('x')] + elms[index:])
+		self.failUnlessEqual(list(vector.tail.tail.split(10)[1]), elms[12:])
+		for index in (-1, -size, size + 1):
+			self.failUnlessRaises(IndexError, vector.split, index)
+			self.failUnlessRaises(IndexError, vector.insert, index, factory.makeStr('x'))
+		self.failUnlessRaises(IndexError, vector.tail.split, size)
+		self.failUnlessRaises(IndexError, vector.tail.insert, size, factory.makeStr('x'))
+		self.failUnlessEqual(list(vector.extend(factory.parse('[1,2]'))), elms + [factory.makeInt(1), factory.makeInt(2)])
+		self.failUnlessEqual(list(factory.parse('[1,2]').extend(vector)), [factory.makeInt(1), factory.makeInt(2)] + elms)
+
+		# repeated splicing must keep the tree balanced
+		from aterm import vector as vector_
+		for i in range(1000):
+			vector = vector.insert((i * 7) % len(vector), factory.makeInt(-i))
+		self.failUnlessEqual(len(vector), 2000)
+		self.failUnless(vector_._height(vector.getTree()) < 20)
+
+
+class TestArena(unittest.TestCase):
+
+	def testArena(self):
+		from aterm import arena
+		term = factory.parse('M([A(Sym("x"),1),B{P([0])},A(Sym("y"),2.5),[]])')
+		result = arena.build(term)
+		self.failIf(result.shared)
+		self.failUnless(result.toTerm().isEquivalent(term))
+		self.failUnlessEqual(result.histogram(), {'M': 1, 'A': 2, 'Sym': 2, 'B': 1})
+		self.failUnlessEqual(len(result.find('Sym')), 2)
+		self.failUnlessEqual(result.find('X'), [])
+		self.failUnlessEqual(result.getDescendants()[result.getRoot()], 12)
+
+		index, = result.find('B')
+		self.failUnlessEqual(result.getName(index), 'B')
+		self.failUnlessEqual(result.toTerm(index), factory.parse('B{P([0])}'))
+		index = result.find('A')[1]
+		sym, value = result.getChildren(index)
+		self.failUnlessEqual(result.getType(sym), types.APPL)
+		self.failUnlessEqual(result.getValue(value), 2.5)
+		self.failUnlessEqual(result.getValue(result.getChildren(sym)[0]), 'y')
+
+		sym = factory.parse('Sym("x")')
+		term = factory.makeAppl('A', [sym, factory.makeList([sym, sym])])
+		result = arena.build(term)
+		self.failUnless(result.shared)
+		self.failUnlessEqual(len(result), 4)
+		self.failUnlessEqual(result.histogram(), {'A': 1, 'Sym': 3})
+		self.failUnlessEqual(result.histogram(distinct = True), {'A': 1, 'Sym': 1})
+		self.failUnlessEqual(result.getDescendants()[result.getRoot()], 8)
+		term = result.toTerm()
+		self.failUnless(term.args[0] is term.args[1][1])
+
+		# the empty list is a singleton, but it is not a shared subterm
+		result = arena.build(factory.parse('M([],F([]),[[]])'))
+		self.failIf(result.shared)
+
+		term = factory.parse('M(0.0,-0.0)')
+		result = arena.build(term)
+		self.failUnless(result.toTerm().isEquivalent(term))
+		self.failUnlessEqual(str(result.toTerm()), 'M(0.0,-0.0)')
+
+
 class TestPath(unittest.TestCase):
 
 	testCompareTestCases = [
@@ -513,6 +1102,39 @@ class TestPath(unittest.TestCase):
 			result = path_.transform(term, func)
 			self.failUnlessEqual(result, expectedResult, '%s . %s == %s (!= %s)' % (termStr, pathStr, result, expectedResult))
 
+	def testTransformMany(self):
+		func = lambda x: x.factory.make('X(_)', x)
+		term = factory.parse('A([B,C,D],[E,F],G)')
+		result = path.transformMany(term, {
+			path.Path([0, 1]): func,
+			(0, 2): func,
+			(1, 0): func,
+			(0,): lambda x: x.factory.make('Y(_)', x),
+		})
+		self.failUnlessEqual(result, factory.parse('A(Y([B,X(C),X(D)]),[X(E),F],G)'))
+		# unchanged subterms are shared
+		self.failUnless(result.args[1].tail is term.args[1].tail)
+		self.failUnless(result.args[2] is term.args[2])
+		self.failUnless(path.transformMany(term, {(1, 1): lambda x: x}) is term)
+		self.failUnlessRaises(IndexError, path.transformMany, term, {(0, 3): func})
+
+	def testZipper(self):
+		term = factory.parse('A([B,C],D)')
+		zipper = path.Zipper(term)
+		self.failUnless(zipper.down().down(1).up().up().term is term)
+
+		zipper = zipper.down().down(1)
+		self.failUnlessEqual(zipper.term, factory.parse('C'))
+		self.failUnlessEqual(zipper.getPath(), path.Path([0, 1]))
+		zipper = zipper.replace(factory.parse('X')).left()
+		self.failUnlessEqual(zipper.term, factory.parse('B'))
+		zipper = zipper.replace(factory.parse('Y')).up().right()
+		self.failUnlessEqual(zipper.term, factory.parse('D'))
+		self.failUnlessEqual(zipper.root(), factory.parse('A([Y,X],D)'))
+		self.failUnlessRaises(IndexError, zipper.right)
+		self.failUnlessRaises(IndexError, zipper.down)
+		self.failUnlessRaises(IndexError, path.Zipper(term).up)
+
 	annotateTestCases = [
 		('A', 'A{Path([])}'),
 		('[A,B]', '[A{Path([0])},B{Path([1])}]'),
@@ -530,6 +1152,12 @@ class TestPath(unittest.TestCase):
 			result = path.annotate(term)
 			self.failUnlessEqual(result, expectedResult)
 
+	def testAnnotateLong(self):
+		term = factory.makeList([factory.makeAppl('C') for i in range(10000)])
+		result = path.annotate(term)
+		self.failUnlessEqual(len(result), 10000)
+		self.failUnlessEqual(result[9999], factory.parse('C{Path([9999])}'))
+
 	def testDeAnnotate(self):
 		for expectedResultStr, termStr in self.annotateTestCases:
 			term = factory.parse(termStr)
@@ -537,6 +1165,107 @@ class TestPath(unittest.TestCase):
 			result = path.deannotate(term)
 			self.failUnlessEqual(result, expectedResult)
 
+	def testAnnotateSelection(self):
+		term = factory.parse('M([A(B(1),C),D(E)],F(G))')
+		result = path.annotateSelection(term, path.Path([0, 0]))
+		self.failUnless(result.isEqual(factory.parse(
+			'M([A(B(1){Path([0,0,0])},C{Path([1,0,0])}){Path([0,0])},D(E)],F(G)){Path([])}'
+		)))
+		# terms off the selection path are shared
+		self.failUnless(result.args[0].tail is term.args[0].tail)
+		self.failUnless(result.args[1] is term.args[1])
+		self.failUnless(path.annotateSelection(term, path.Path([])).isEqual(path.annotate(term)))
+
+	def testDeAnnotateDeep(self):
+		term = factory.parse('M([A(B(1),C),D(E)],F(G))')
+		self.failUnless(path.deannotate(term) is term)
+		result = path.deannotate(path.annotateSelection(term, path.Path([0, 0])))
+		self.failUnless(result.isEqual(term))
+		self.failUnless(result.args[1] is term.args[1])
+
+
+class _Kinds(visitor.Visitor):
+
+	def visitTerm(self, term):
+		return 'term'
+
+	def visitLit(self, term):
+		return 'lit'
+
+	def visitStr(self, term):
+		return 'str'
+
+	def visitCons(self, term):
+		return 'cons'
+
+
+class _Walker(walker.Walker):
+
+	kind = walker.Dispatch('kind')
+
+	def kind_Term(self, term):
+		return 'term'
+
+	def kind_Lit(self, value):
+		return 'lit'
+
+	def kind_Str(self, value):
+		return 'str %s' % value
+
+	def kind_Cons(self, head, tail):
+		return 'cons'
+
+	def kindA(self, arg):
+		return 'A'
+
+
+class TestWalker(unittest.TestCase):
+
+	kindTestCases = [
+		('1', 'lit', 'lit'),
+		('0.5', 'lit', 'lit'),
+		('"s"', 'str', 'str s'),
+		('[]', 'term', 'term'),
+		('[1]', 'cons', 'cons'),
+		('A(1)', 'term', 'A'),
+		('B(1)', 'term', 'term'),
+	]
+
+	def testVisitor(self):
+		for termStr, expectedResult, _ in self.kindTestCases:
+			self.failUnlessEqual(_Kinds().visit(factory.parse(termStr)), expectedResult)
+
+	def testDispatch(self):
+		for termStr, _, expectedResult in self.kindTestCases:
+			self.failUnlessEqual(_Walker().kind(factory.parse(termStr)), expectedResult)
+		self.failUnlessRaises(TypeError, _Walker().kind, factory.parse('A'))
+
+		class _Walker2(walker.Walker):
+			kind = _Walker.kind
+		self.failUnlessRaises(ValueError, _Walker2().kind, factory.parse('1'))
+		self.failUnlessEqual(_Walker().kind(factory.parse('(1)')), 'term')
+
+	def testOverride(self):
+		kinds = _Kinds()
+		kinds.visitLit = lambda term: 'instance'
+		self.failUnlessEqual(kinds.visit(factory.parse('1')), 'instance')
+		self.failUnlessEqual(_Kinds().visit(factory.parse('1')), 'lit')
+
+		class _Kinds2(_Kinds):
+			visitLit = staticmethod(lambda term: 'static')
+		self.failUnlessEqual(_Kinds2().visit(factory.parse('1')), 'static')
+		self.failUnlessEqual(_Kinds2().visit(factory.parse('[1]')), 'cons')
+
+		walker1 = _Walker()
+		walker1.kind_Lit = lambda value: 'instance %r' % value
+		self.failUnlessEqual(walker1.kind(factory.parse('1')), 'instance 1')
+		self.failUnlessEqual(walker1.kind(factory.parse('A(1)')), 'A')
+		self.failUnlessEqual(_Walker().kind(factory.parse('1')), 'lit')
+
+		class _Walker3(_Walker):
+			kind_Lit = staticmethod(lambda value: 'static')
+		self.failUnlessEqual(_Walker3().kind(factory.parse('1')), 'static')
+
 
 if __name__ == '__main__':
 	unittest.main()
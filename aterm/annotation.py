@@ -1,8 +1,63 @@
-'''High-level term annotation.'''
+'''High-level term annotation.
+
+Annotations set by this module are kept in an L{Annotations} list, which is
+indexed by the annotation names, so that annotations are looked up and
+updated in constant time (for a given number of annotations). Re-annotated
+copies of a term share the annotation list tail with the original term.
+'''
 
 
 from aterm import types
-from aterm import lists
+from aterm import term as _term
+
+
+class Annotations(_term.Cons):
+	'''Annotation list term, indexed by the annotation names.'''
+
+	__slots__ = ['_index']
+
+	def __init__(self, head, tail, index):
+		_term.Cons.__init__(self, head, tail)
+		self._index = index
+
+
+def _index(annos):
+	'''Get a dictionary mapping the names of an annotation list to its
+	annotations.'''
+	if isinstance(annos, Annotations):
+		return annos._index
+	index = {}
+	while types.isCons(annos):
+		anno = annos.head
+		if types.isAppl(anno) and anno.name not in index:
+			index[anno.name] = anno
+		annos = annos.tail
+	return index
+
+
+def _remove(annos, label):
+	'''Remove the annotations with the given label from an annotation list.'''
+	elms = []
+	while types.isCons(annos):
+		anno = annos.head
+		if not (types.isAppl(anno) and anno.name == label):
+			elms.append(anno)
+		annos = annos.tail
+	return elms
+
+
+def _make(factory, elms, tail, index):
+	'''Make an annotation list from the given annotations and tail. Only the
+	outermost list node is indexed, as the index does not hold for the
+	tails.'''
+	if not elms:
+		return tail
+	if factory.isSharing():
+		# indexed lists are not interned
+		return factory.makeList(list(elms) + list(tail))
+	for anno in elms[:0:-1]:
+		tail = factory.makeCons(anno, tail)
+	return Annotations(elms[0], tail, index)
 
 
 def get(term, label):
@@ -11,12 +66,18 @@ def get(term, label):
 		raise TypeError("label is not a string", label)
 	if not types.isAppl(term):
 		return term
-	def withLabel(term):
-		return types.isAppl(term) and term.name == label
-	if term.annotations:
-		anno = lists.fetch(withLabel, term.annotations)
-		if anno is not None:
-			return anno
+	annos = term.annotations
+	if isinstance(annos, Annotations):
+		try:
+			return annos._index[label]
+		except KeyError:
+			pass
+	else:
+		while types.isCons(annos):
+			anno = annos.head
+			if types.isAppl(anno) and anno.name == label:
+				return anno
+			annos = annos.tail
 	raise ValueError("undefined annotation", label)
 
 
@@ -28,10 +89,19 @@ def set(term, anno):
 	if not types.isAppl(term):
 		return term
 	label = anno.name
-	def withoutLabel(term):
-		return not (types.isAppl(term) and term.name == label)
-	annos = lists.filter(withoutLabel, term.annotations)
-	annos = term.factory.makeCons(anno, annos)
+	annos = term.annotations
+	index = _index(annos)
+	old = index.get(label)
+	if old is anno and annos.head is anno and (isinstance(annos, Annotations) or label not in _index(annos.tail)):
+		# already in front, and not duplicated
+		return term
+	index = index.copy()
+	index[label] = anno
+	if old is None:
+		# the old annotations are shared
+		annos = _make(term.factory, [anno], annos, index)
+	else:
+		annos = _make(term.factory, [anno] + _remove(annos, label), term.factory.makeNil(), index)
 	return term.setAnnotations(annos)
 
 
@@ -42,8 +112,11 @@ def remove(term, label):
 		raise TypeError("label is not a string", label)
 	if not types.isAppl(term):
 		return term
-	def withoutLabel(term):
-		return not (types.isAppl(term) and term.name == label)
-	annos = lists.filter(withoutLabel, term.annotations)
+	annos = term.annotations
+	index = _index(annos)
+	if label not in index:
+		return term
+	index = index.copy()
+	del index[label]
+	annos = _make(term.factory, _remove(annos, label), term.factory.makeNil(), index)
 	return term.setAnnotations(annos)
-
@@ -0,0 +1,261 @@
+'''Columnar term arenas.
+
+An arena is a flat, columnar copy of a term, meant for bulk analyses of huge
+terms -- histograms of the constructors, searches by name, and so on --
+which would otherwise have to visit millions of term objects.
+
+The term nodes are numbered so that the children of a node always precede
+it, and the root is the last node. Each node is described by an entry in a
+few parallel arrays: its type, the index of its name in the L{Arena.names}
+pool, or of its value in the L{Arena.values} pool, and the range of its
+children in the L{Arena.children} array. A list is a single node whose
+children are its elements. Subterms shared in the term DAG are only stored
+once. Annotations are not part of the arena columns, so the queries ignore
+them, but they are kept aside for the conversion back into terms.
+
+The queries are computed with NumPy when it is available, and with plain
+loops over the arrays otherwise.
+'''
+
+
+import operator
+from array import array
+from itertools import compress, imap, repeat
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+from aterm import types
+
+
+class Arena(object):
+	'''Columnar representation of a term DAG.'''
+
+	def __init__(self, factory):
+		self.factory = factory
+		# node columns
+		self.types = array('B')
+		self.symbols = array('i')
+		self.literals = array('i')
+		self.offsets = array('i', [0])
+		self.children = array('i')
+		# name and literal pools
+		self.names = []
+		self.values = []
+		# annotations of the application nodes, by node index
+		self.annotations = {}
+		# whether any application or list node occurs more than once
+		self.shared = False
+		self._occurrences = None
+
+	def __len__(self):
+		return len(self.types)
+
+	def getRoot(self):
+		'''Get the index of the root node.'''
+		return len(self.types) - 1
+
+	def getType(self, index):
+		'''Get the term type of a node, with L{types.LIST} for lists.'''
+		return self.types[index]
+
+	def getName(self, index):
+		'''Get the name of an application node.'''
+		assert self.types[index] == types.APPL
+		return self.names[self.symbols[index]]
+
+	def getValue(self, index):
+		'''Get the value of a literal node.'''
+		assert self.types[index] & types.LIT
+		return self.values[self.literals[index]]
+
+	def getChildren(self, index):
+		'''Get the indices of the arguments, or elements, of a node.'''
+		return self.children[self.offsets[index]:self.offsets[index + 1]]
+
+	def getOccurrences(self):
+		'''Get the number of occurrences of every node in the term tree, i.e.,
+		how many times it would be visited by a traversal of the term.'''
+		if self._occurrences is None:
+			offsets = self.offsets
+			children = self.children
+			occurrences = array('l', [0]) * len(self.types)
+			if occurrences:
+				occurrences[-1] = 1
+			for index in xrange(len(occurrences) - 1, -1, -1):
+				count = occurrences[index]
+				for child in children[offsets[index]:offsets[index + 1]]:
+					occurrences[child] += count
+			self._occurrences = occurrences
+		return self._occurrences
+
+	def getDescendants(self):
+		'''Get the number of nodes of the subtree rooted at every node, itself
+		included, counting shared subterms as many times as they occur.'''
+		offsets = self.offsets
+		children = self.children
+		sizes = array('l')
+		for index in xrange(len(self.types)):
+			size = 1
+			for child in children[offsets[index]:offsets[index + 1]]:
+				size += sizes[child]
+			sizes.append(size)
+		return sizes
+
+	def histogram(self, distinct = False):
+		'''Get a dictionary mapping the application names to the number of
+		their occurrences in the term, or of their distinct nodes.'''
+		names = self.names
+		if not distinct and self.shared:
+			# the occurrences must be weighted
+			occurrences = self.getOccurrences()
+			if numpy is not None:
+				symbols = numpy.frombuffer(self.symbols, dtype = numpy.intc)
+				weights = numpy.frombuffer(occurrences, dtype = numpy.int_)
+				appls = symbols >= 0
+				counts = numpy.bincount(symbols[appls], weights[appls], minlength = len(names))
+			else:
+				counts = [0] * len(names)
+				for symbol, count in zip(self.symbols, occurrences):
+					if symbol >= 0:
+						counts[symbol] += count
+		elif numpy is not None:
+			symbols = numpy.frombuffer(self.symbols, dtype = numpy.intc)
+			counts = numpy.bincount(symbols[symbols >= 0], minlength = len(names))
+		else:
+			count = self.symbols.count
+			counts = [count(symbol) for symbol in xrange(len(names))]
+		return dict([(name, int(count)) for name, count in zip(names, counts) if count])
+
+	def find(self, name):
+		'''Get the indices of the application nodes with the given name.'''
+		try:
+			symbol = self.names.index(name)
+		except ValueError:
+			return []
+		if numpy is not None:
+			symbols = numpy.frombuffer(self.symbols, dtype = numpy.intc)
+			return numpy.nonzero(symbols == symbol)[0].tolist()
+		return list(compress(xrange(len(self.symbols)), imap(operator.eq, self.symbols, repeat(symbol))))
+
+	def toTerm(self, index = None):
+		'''Convert a node, by default the root, back into a term. Nodes shared
+		in the arena are shared in the result.'''
+		if index is None:
+			index = self.getRoot()
+		factory = self.factory
+		kinds = self.types
+		offsets = self.offsets
+		children = self.children
+		built = {}
+		stack = [index]
+		while stack:
+			index = stack[-1]
+			if index in built:
+				stack.pop()
+				continue
+			kids = children[offsets[index]:offsets[index + 1]]
+			missing = [kid for kid in kids if kid not in built]
+			if missing:
+				stack.extend(missing)
+				continue
+			stack.pop()
+			type = kinds[index]
+			if type == types.APPL:
+				args = tuple([built[kid] for kid in kids])
+				annos = self.annotations.get(index)
+				result = factory._makeAppl(self.names[self.symbols[index]], args, annos)
+			elif type == types.LIST:
+				result = factory._makeList([built[kid] for kid in kids])
+			elif type == types.INT:
+				result = factory._makeInt(self.values[self.literals[index]])
+			elif type == types.REAL:
+				result = factory.makeReal(self.values[self.literals[index]])
+			else:
+				result = factory._makeStr(self.values[self.literals[index]])
+			built[index] = result
+		return result
+
+
+def build(term):
+	'''Build the arena of a term.'''
+	arena = Arena(term.factory)
+	kinds = arena.types
+	symbols = arena.symbols
+	literals = arena.literals
+	offsets = arena.offsets
+	children = arena.children
+	names = arena.names
+	values = arena.values
+	annotations = arena.annotations
+	nameIndex = {}
+	valueIndex = {}
+	APPL = types.APPL
+	REAL = types.REAL
+	LIT = types.LIT
+	# node index of every term object already added
+	nodes = {}
+	stack = [term]
+	while stack:
+		term = stack[-1]
+		key = id(term)
+		if key in nodes:
+			stack.pop()
+			continue
+		type = term.type
+		if type & LIT:
+			stack.pop()
+			value = term.value
+			# reals are keyed by their representation, so that 0.0 and -0.0
+			# are kept apart
+			if type == REAL:
+				valueKey = type, repr(value)
+			else:
+				valueKey = type, value
+			try:
+				literal = valueIndex[valueKey]
+			except KeyError:
+				literal = valueIndex[valueKey] = len(values)
+				values.append(value)
+			nodes[key] = len(kinds)
+			kinds.append(type)
+			symbols.append(-1)
+			literals.append(literal)
+			offsets.append(len(children))
+			continue
+		if type == APPL:
+			kids = term.args
+		else:
+			kids = tuple(term)
+		missing = [kid for kid in kids if id(kid) not in nodes]
+		if missing:
+			missing.reverse()
+			stack.extend(missing)
+			continue
+		stack.pop()
+		index = nodes[key] = len(kinds)
+		children.extend([nodes[id(kid)] for kid in kids])
+		offsets.append(len(children))
+		literals.append(-1)
+		if type == APPL:
+			name = term.name
+			try:
+				symbol = nameIndex[name]
+			except KeyError:
+				symbol = nameIndex[name] = len(names)
+				names.append(name)
+			kinds.append(APPL)
+			symbols.append(symbol)
+			if term.annotations:
+				annotations[index] = term.annotations
+		else:
+			kinds.append(types.LIST)
+			symbols.append(-1)
+
+	# in a tree, no application or non-empty list node is the child of more
+	# than one node; the empty list is a singleton, so it does not count
+	compounds = [child for child in children if literals[child] < 0 and (kinds[child] == APPL or offsets[child] != offsets[child + 1])]
+	arena.shared = len(set(compounds)) != len(compounds)
+	return arena
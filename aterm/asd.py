@@ -47,6 +47,10 @@ class Type:
 	def validate(self, spec, term, pname=None, cname=None, fname=None):
 		raise NotImplementedError
 
+	def compile(self, validator, pname=None, cname=None, fname=None):
+		'''Compile into a function which validates a term.'''
+		raise NotImplementedError
+
 	def __str__(self):
 		raise NotImplementedError
 
@@ -66,6 +70,17 @@ class BuiltinType(Type):
 				pname=pname, cname=cname, fname=fname
 			)
 
+	def compile(self, validator, pname=None, cname=None, fname=None):
+		type = self.type
+		def validate(term):
+			if not term.type & type:
+				raise MismatchException(
+					"builtin type mismatch",
+					type, term.type,
+					pname=pname, cname=cname, fname=fname
+				)
+		return validate
+
 	def __str__(self):
 		return self.name
 
@@ -79,6 +94,9 @@ class UserType(Type):
 	def validate(self, spec, term, pname=None, cname=None, fname=None):
 		spec.validate(self.name, term)
 
+	def compile(self, validator, pname=None, cname=None, fname=None):
+		return validator.getProduction(self.name)
+
 	def __str__(self):
 		return self.name
 
@@ -99,6 +117,20 @@ class ListType(Type):
 		for subterm in term:
 			self.subtype.validate(spec, subterm, pname=pname, cname=cname, fname=fname)
 
+	def compile(self, validator, pname=None, cname=None, fname=None):
+		subtype = self.subtype.compile(validator, pname=pname, cname=cname, fname=fname)
+		isList = aterm.types.isList
+		def validate(term):
+			if not isList(term):
+				raise MismatchException(
+					"list term expected",
+					term,
+					pname=pname, cname=cname, fname=fname
+				)
+			for subterm in term:
+				subtype(subterm)
+		return validate
+
 	def __str__(self):
 		return "%s*" % (str(self.subtype),)
 
@@ -116,6 +148,15 @@ class OptionalType(Type):
 		else:
 			self.subtype.validate(spec, term, pname=pname, cname=cname, fname=fname)
 
+	def compile(self, validator, pname=None, cname=None, fname=None):
+		subtype = self.subtype.compile(validator, pname=pname, cname=cname, fname=fname)
+		optname = self.optname
+		APPL = aterm.types.APPL
+		def validate(term):
+			if term.type != APPL or term.name != optname or term.args:
+				subtype(term)
+		return validate
+
 	def __str__(self):
 		return "%s?" % (str(self.subtype),)
 
@@ -130,6 +171,9 @@ class Field:
 	def validate(self, spec, term, pname=None, cname=None):
 		self.type.validate(spec, term, pname=pname, cname=cname, fname=self.name)
 
+	def compile(self, validator, pname=None, cname=None):
+		return self.type.compile(validator, pname=pname, cname=cname, fname=self.name)
+
 	def __str__(self):
 		if self.name:
 			return "%s %s" % (str(self.type), self.name)
@@ -166,6 +210,28 @@ class Constructor:
 		for field, arg in zip(self.fields, term.args):
 			field.validate(spec, arg, pname=pname, cname=self.name)
 
+	def compile(self, validator, pname=None):
+		'''Compile into a function which validates the arguments of an
+		application term with the constructor name and arity.'''
+		fields = [field.compile(validator, pname=pname, cname=self.name) for field in self.fields]
+		if not fields:
+			return None
+		if len(fields) == 1:
+			field, = fields
+			def validate(term):
+				field(term.args[0])
+		elif len(fields) == 2:
+			field0, field1 = fields
+			def validate(term):
+				arg0, arg1 = term.args
+				field0(arg0)
+				field1(arg1)
+		else:
+			def validate(term):
+				for field, arg in zip(fields, term.args):
+					field(arg)
+		return validate
+
 	def __str__(self):
 		if self.fields:
 			return '%s(%s)' % (self.name, ', '.join([str(field) for field in self.fields]))
@@ -224,10 +290,119 @@ class Description:
 			raise ValueError("undefined production %r" % productionName)
 		production.validate(self, term)
 
+	def compile(self):
+		'''Compile into a L{Validator}.'''
+		return Validator(self)
+
 	def __str__(self):
 		return '\n'.join([str(production) for production in self.productions.itervalues()])
 
 
+class Validator:
+	'''AST validator, compiled from a description.
+
+	Each production is compiled into a function, which dispatches on the
+	constructor name and arity of the term to a function validating the
+	constructor arguments, without looking up the description as it goes.
+
+	The application terms which were validated against a production are
+	remembered during each L{validate} call, so that shared subterms are only
+	validated once, and then forgotten, so that no terms are kept alive
+	past the call. Validation can also be restricted to a sample of the
+	terms, to keep its cost low in production runs.
+	'''
+
+	# maximum number of validated terms remembered, per production
+	MAX_MEMO_LEN = 65536
+
+	def __init__(self, spec):
+		self.spec = spec
+		self.memo = {}
+		self.period = 1
+		self.count = 0
+		self.productions = {}
+		tables = {}
+		for name in spec.productions:
+			table = {}
+			tables[name] = table
+			self.productions[name] = self._compileProduction(name, table)
+		for name, production in spec.productions.iteritems():
+			table = tables[name]
+			for constructor in production.constructors.itervalues():
+				arity = len(constructor.fields)
+				table[(constructor.name, arity)] = constructor.compile(self, pname=name)
+
+	def _compileProduction(self, pname, table):
+		memo = self.memo[pname] = {}
+		names = self.spec.productions[pname].constructors
+		APPL = aterm.types.APPL
+		MAX_MEMO_LEN = self.MAX_MEMO_LEN
+		def validate(term):
+			if term.type != APPL:
+				raise MismatchException(
+					"not an application term",
+					term,
+					pname=pname
+				)
+			args = term.args
+			if args:
+				# the term is kept in the memo, so that its id is not reused
+				key = id(term)
+				if key in memo:
+					return
+			try:
+				constructor = table[(term.name, len(args))]
+			except KeyError:
+				if term.name in names:
+					raise MismatchException(
+						"wrong number of arguments",
+						term,
+						pname=pname, cname=term.name
+					)
+				raise MismatchException(
+					"unexpected term",
+					term,
+					pname=pname
+				)
+			if constructor is not None:
+				constructor(term)
+				if len(memo) >= MAX_MEMO_LEN:
+					memo.clear()
+				memo[key] = term
+		return validate
+
+	def getProduction(self, name):
+		'''Get the compiled function which validates a term against the
+		given production.'''
+		try:
+			return self.productions[name]
+		except KeyError:
+			def validate(term):
+				raise ValueError("undefined production %r" % name)
+			return validate
+
+	def setSampling(self, period):
+		'''Only validate one in every given number of terms passed to
+		L{validate}. A period of 1 validates every term.'''
+		self.period = period
+		self.count = 0
+
+	def clear(self):
+		'''Forget the validated terms.'''
+		for memo in self.memo.itervalues():
+			memo.clear()
+
+	def validate(self, productionName, term):
+		if self.period > 1:
+			self.count += 1
+			if self.count % self.period:
+				return
+		try:
+			self.getProduction(productionName)(term)
+		finally:
+			self.clear()
+
+
 
 ###############################################################################
 # Parsing
@@ -298,6 +473,7 @@ def parse(buf):
 # Unit tests
 
 
+import sys
 import unittest
 
 
@@ -344,6 +520,33 @@ class TestAsd(unittest.TestCase):
 				result = True
 			self.failUnlessEqual(result, expectedResult, "%s ~ %s" % (productionName, termStr))
 
+	def testCompile(self):
+		validator = parse(self.sampleDescription).compile()
+		from aterm.factory import factory
+		for productionName, termStr, expectedResult in self.validateTestCases:
+			term = factory.parse(termStr)
+			try:
+				validator.validate(productionName, term)
+			except MismatchException:
+				result = False
+			else:
+				result = True
+			self.failUnlessEqual(result, expectedResult, "%s ~ %s" % (productionName, termStr))
+
+		term = factory.parse('Op(Num(1),Plus,Num(1))')
+		refcount = sys.getrefcount(term)
+		validator.validate('exp', term)
+		# the validated terms are not kept alive
+		self.failIf(filter(None, validator.memo.itervalues()))
+		self.failUnlessEqual(sys.getrefcount(term), refcount)
+		self.failUnlessRaises(MismatchException, validator.validate, 'stm', term)
+		self.failUnlessRaises(ValueError, validator.validate, 'xxx', term)
+
+		validator.setSampling(2)
+		term = factory.parse('Id(1)')
+		validator.validate('exp', term)
+		self.failUnlessRaises(MismatchException, validator.validate, 'exp', term)
+
 
 if __name__ == "__main__":
 	unittest.main()
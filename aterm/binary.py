@@ -0,0 +1,324 @@
+'''Binary term representation.
+
+A compact binary encoding of terms, in the spirit of the ATerm library's BAF
+and SAF formats. The stream starts with a magic header, followed by the term
+nodes in post-order. Each node starts with an opcode byte:
+
+ - literals are encoded inline, integers as zigzag varints, reals as IEEE 754
+   doubles, and strings as a varint length followed by the bytes;
+ - application symbols (name and arity) are defined once, by a symbol
+   definition opcode, and thereafter referred by their varint index;
+ - application and list construction nodes take their subterms from the
+   nodes previously decoded;
+ - subterms which occur more than once are flagged on their first occurrence
+   and thereafter emitted as back-references, so that shared subterms are
+   written only once.
+
+Both the reader and the writer use explicit stacks, hence there is no limit on
+the term depth.
+'''
+
+
+import gc
+import struct
+
+from aterm import types
+from aterm import exception
+
+
+MAGIC = '\x00ATB\x01'
+
+_INT = 0x01
+_REAL = 0x02
+_STR = 0x03
+_NIL = 0x04
+_CONS = 0x05
+_APPL = 0x06
+_SYMBOL = 0x07
+_REF = 0x08
+
+_OPCODE = 0x3f
+_ANNOS = 0x40
+_SHARED = 0x80
+
+
+_EMIT = object()
+
+
+class BinaryWriter(object):
+	'''Writes terms to a binary stream.'''
+
+	def __init__(self, fp):
+		self.fp = fp
+
+	def _varint(self, value, out):
+		while value >= 0x80:
+			out.append(chr((value & 0x7f) | 0x80))
+			value >>= 7
+		out.append(chr(value))
+
+	def _str(self, value, out):
+		self._varint(len(value), out)
+		out.append(value)
+
+	def _count(self, term):
+		'''Count the number of occurrences of each term node.'''
+		counts = {}
+		stack = [term]
+		pop = stack.pop
+		push = stack.append
+		while stack:
+			term = pop()
+			key = id(term)
+			if key in counts:
+				counts[key] += 1
+				continue
+			counts[key] = 1
+			type = term.type
+			if type == types.APPL:
+				stack.extend(term.args)
+				if term.annotations.type != types.NIL:
+					push(term.annotations)
+			elif type == types.CONS:
+				push(term.head)
+				push(term.tail)
+		return counts
+
+	def write(self, term):
+		'''Write a term.'''
+		counts = self._count(term)
+		refs = {}
+		symbols = {}
+		out = [MAGIC]
+		varint = self._varint
+		stack = [term]
+		pop = stack.pop
+		push = stack.append
+		while stack:
+			term = pop()
+			if term is _EMIT:
+				# all subterms have been emitted
+				term = pop()
+			else:
+				key = id(term)
+				if key in refs:
+					index = refs[key]
+					out.append(chr(_REF))
+					if index < 0x80:
+						out.append(chr(index))
+					else:
+						varint(index, out)
+					continue
+				type = term.type
+				if type == types.APPL:
+					push(term)
+					push(_EMIT)
+					if term.annotations.type != types.NIL:
+						push(term.annotations)
+					args = list(term.args)
+					args.reverse()
+					stack.extend(args)
+					continue
+				elif type == types.CONS:
+					push(term)
+					push(_EMIT)
+					push(term.tail)
+					push(term.head)
+					continue
+
+			key = id(term)
+			type = term.type
+			if counts[key] > 1 and type != types.NIL:
+				flags = _SHARED
+				refs[key] = len(refs)
+			else:
+				flags = 0
+
+			if type == types.APPL:
+				symbol = term.name, len(term.args)
+				try:
+					index = symbols[symbol]
+				except KeyError:
+					index = symbols[symbol] = len(symbols)
+					out.append(chr(_SYMBOL))
+					varint(len(term.args), out)
+					self._str(term.name, out)
+				if term.annotations.type != types.NIL:
+					flags |= _ANNOS
+				out.append(chr(_APPL | flags))
+				if index < 0x80:
+					out.append(chr(index))
+				else:
+					varint(index, out)
+			elif type == types.CONS:
+				out.append(chr(_CONS | flags))
+			elif type == types.NIL:
+				out.append(chr(_NIL))
+			elif type == types.INT:
+				value = term.value
+				if value >= 0:
+					value = value << 1
+				else:
+					value = ((-value) << 1) - 1
+				out.append(chr(_INT | flags))
+				varint(value, out)
+			elif type == types.REAL:
+				out.append(chr(_REAL | flags))
+				out.append(struct.pack('>d', term.value))
+			elif type == types.STR:
+				out.append(chr(_STR | flags))
+				self._str(term.value, out)
+			else:
+				assert False
+
+			if len(out) > 4096:
+				self.fp.write(''.join(out))
+				out = []
+		self.fp.write(''.join(out))
+
+
+class BinaryReader(object):
+	'''Reads terms from a binary stream.'''
+
+	def __init__(self, factory):
+		self.factory = factory
+
+	def read(self, buf):
+		'''Read a term from a buffer.'''
+		if buf[:len(MAGIC)] != MAGIC:
+			raise exception.ParseError('not a binary term stream')
+
+		# terms are acyclic, so there is no point in having the garbage
+		# collector repeatedly scanning the terms as they are allocated
+		enabled = gc.isenabled()
+		gc.disable()
+		try:
+			return self._read(buf)
+		finally:
+			if enabled:
+				gc.enable()
+
+	def _read(self, buf):
+		factory = self.factory
+		# the terms are built by the factory, so there is no need to check them
+		makeInt = factory._makeInt
+		makeReal = factory.makeReal
+		makeStr = factory._makeStr
+		makeCons = factory._makeCons
+		makeAppl = factory._makeAppl
+		unpack = struct.unpack
+
+		stack = []
+		refs = []
+		symbols = []
+		pos = len(MAGIC)
+		end = len(buf)
+		try:
+			while pos < end:
+				opcode = ord(buf[pos])
+				pos += 1
+
+				if opcode == _REF or opcode == _SYMBOL or opcode & _OPCODE in (_INT, _STR, _APPL):
+					# decode varint
+					value = 0
+					shift = 0
+					while True:
+						byte = ord(buf[pos])
+						pos += 1
+						value |= (byte & 0x7f) << shift
+						if byte < 0x80:
+							break
+						shift += 7
+
+				if opcode == _REF:
+					stack.append(refs[value])
+					continue
+				if opcode == _SYMBOL:
+					length, pos = self._varint(buf, pos)
+					name = buf[pos:pos + length]
+					pos += length
+					symbols.append((name, value))
+					continue
+
+				code = opcode & _OPCODE
+				if code == _INT:
+					if value & 1:
+						value = -((value + 1) >> 1)
+					else:
+						value = value >> 1
+					term = makeInt(value)
+				elif code == _REAL:
+					term = makeReal(unpack('>d', buf[pos:pos + 8])[0])
+					pos += 8
+				elif code == _STR:
+					term = makeStr(buf[pos:pos + value])
+					pos += value
+				elif code == _NIL:
+					term = factory.makeNil()
+				elif code == _CONS:
+					tail = stack.pop()
+					head = stack.pop()
+					term = makeCons(head, tail)
+				elif code == _APPL:
+					name, arity = symbols[value]
+					if opcode & _ANNOS:
+						annos = stack.pop()
+					else:
+						annos = None
+					if arity:
+						args = tuple(stack[-arity:])
+						del stack[-arity:]
+					else:
+						args = ()
+					term = makeAppl(name, args, annos)
+				else:
+					raise exception.ParseError('bad opcode 0x%02x at offset %d' % (opcode, pos - 1))
+
+				if opcode & _SHARED:
+					refs.append(term)
+				stack.append(term)
+		except (IndexError, TypeError, struct.error):
+			raise exception.ParseError('malformed binary term stream at offset %d' % pos)
+
+		if len(stack) != 1:
+			raise exception.ParseError('malformed binary term stream')
+		return stack[0]
+
+	def _varint(self, buf, pos):
+		value = 0
+		shift = 0
+		while True:
+			byte = ord(buf[pos])
+			pos += 1
+			value |= (byte & 0x7f) << shift
+			if byte < 0x80:
+				return value, pos
+			shift += 7
+
+
+def dumps(term):
+	'''Encode a term into a binary string. Terms sharing subterms should be
+	encoded together, as a list term, so that the shared subterms are only
+	encoded once.'''
+	from cStringIO import StringIO
+	fp = StringIO()
+	BinaryWriter(fp).write(term)
+	return fp.getvalue()
+
+
+def loads(buf, factory = None):
+	'''Decode a term from a binary string, with the given factory, or the
+	default one.'''
+	if factory is None:
+		from aterm.factory import factory
+	return BinaryReader(factory).read(buf)
+
+
+def isBinary(fp):
+	'''Whether a seekable file object holds a binary term stream. The file
+	position is left unchanged.'''
+	pos = fp.tell()
+	try:
+		return fp.read(len(MAGIC)) == MAGIC
+	finally:
+		fp.seek(pos)
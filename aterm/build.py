@@ -22,6 +22,18 @@ class Builder(object):
 		build = Build(list(args), kargs)
 		return self._build(build)
 
+	def make(self, *args, **kargs):
+		'''Build a term, after coercing the arguments to terms.'''
+		_args = []
+		for i in range(len(args)):
+			_args.append(factory.coerce(args[i], str(i)))
+
+		_kargs = {}
+		for name, value in kargs.iteritems():
+			_kargs[name] = factory.coerce(value, "'" + name + "'")
+
+		return self.build(*_args, **_kargs)
+
 	def _build(self, build):
 		raise NotImplementedError
 
@@ -0,0 +1,115 @@
+'''Caching.'''
+
+
+class LRUCache(object):
+	'''Mapping with a bounded number of entries, and optionally a bounded
+	total size, which discards the least recently used entries when full.
+
+	The cache keeps count of its hits, misses and evictions, so that it can be
+	sized from actual usage.
+	'''
+
+	def __init__(self, maxlen = None, maxsize = None, sizeof = None):
+		'''
+		@param maxlen: maximum number of entries, or None for no limit.
+		@param maxsize: maximum total size of the entries, or None for no
+		limit.
+		@param sizeof: function returning the (approximate) size of an entry,
+		given its key and value; required if maxsize is given.
+		'''
+		assert maxsize is None or sizeof is not None
+		self.maxlen = maxlen
+		self.maxsize = maxsize
+		self.sizeof = sizeof
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		self.clear()
+
+	def clear(self):
+		'''Remove all entries.'''
+		# entries are kept in a dictionary, together with the time of their
+		# last use and their size; the least recently used entries are only
+		# looked for when the cache overflows, so that hits stay cheap
+		self._entries = {}
+		self._clock = 0
+		self.size = 0
+
+	def resize(self, maxlen = None, maxsize = None):
+		'''Change the cache bounds, discarding entries as needed.'''
+		assert maxsize is None or self.sizeof is not None
+		self.maxlen = maxlen
+		self.maxsize = maxsize
+		if self._full():
+			self._evict()
+
+	def getStats(self):
+		'''Get the cache statistics, as a dictionary.'''
+		return {
+			'hits': self.hits,
+			'misses': self.misses,
+			'evictions': self.evictions,
+			'len': len(self._entries),
+			'size': self.size,
+		}
+
+	def __len__(self):
+		return len(self._entries)
+
+	def __contains__(self, key):
+		return key in self._entries
+
+	def __getitem__(self, key):
+		try:
+			entry = self._entries[key]
+		except KeyError:
+			self.misses += 1
+			raise
+		self.hits += 1
+		self._clock += 1
+		entry[1] = self._clock
+		return entry[0]
+
+	def get(self, key, default = None):
+		try:
+			return self[key]
+		except KeyError:
+			return default
+
+	def __setitem__(self, key, value):
+		entries = self._entries
+		if key in entries:
+			self.size -= entries[key][2]
+		if self.sizeof is None:
+			size = 0
+		else:
+			size = self.sizeof(key, value)
+		self._clock += 1
+		entries[key] = [value, self._clock, size]
+		self.size += size
+		if self._full():
+			self._evict()
+
+	def _full(self):
+		return \
+			(self.maxlen is not None and len(self._entries) > self.maxlen) or \
+			(self.maxsize is not None and self.size > self.maxsize)
+
+	def _evict(self):
+		'''Discard the least recently used entries, until the cache is down to
+		three quarters of its bounds.'''
+		maxlen = self.maxlen
+		if maxlen is not None:
+			maxlen = max(maxlen * 3 // 4, 1)
+		maxsize = self.maxsize
+		if maxsize is not None:
+			maxsize = maxsize * 3 // 4
+		entries = self._entries
+		items = [(entry[1], key) for key, entry in entries.iteritems()]
+		items.sort()
+		for age, key in items:
+			if (maxlen is None or len(entries) <= maxlen) and \
+			   (maxsize is None or self.size <= maxsize):
+				break
+			self.size -= entries.pop(key)[2]
+			self.evictions += 1
@@ -48,12 +48,6 @@ class _EquivalenceComparator(_Comparator):
 			term is other or \
 			_Comparator.visit(self, term, other)
 
-def isEquivalent(term, other):
-	'''Determines if two terms are equivalent, i.e., equal except for the
-	annotations.'''
-	comparator = _EquivalenceComparator()
-	return comparator.visit(term, other)
-
 
 class _EqualityComparator(_EquivalenceComparator):
 	'''Comparator for determining term equality, which considers annotations.
@@ -70,7 +64,50 @@ class _EqualityComparator(_EquivalenceComparator):
 			_EquivalenceComparator.visitAppl(self, term, other) and \
 			self.compareAnnos(term.annotations, other.annotations)
 
+
+def _compare(term, other, annos):
+	'''Iterative term comparison.
+
+	Equivalent to the comparator visitors above, but uses an explicit stack
+	instead of recursion, so it is not limited by the term depth nor by the
+	list lengths.
+	'''
+	stack = [(term, other)]
+	pop = stack.pop
+	push = stack.append
+	while stack:
+		term, other = pop()
+		if term is other:
+			continue
+		type = term.type
+		if type != other.type:
+			return False
+		if type & types.LIT:
+			if term.value != other.value:
+				return False
+		elif type == types.CONS:
+			push((term.tail, other.tail))
+			push((term.head, other.head))
+		elif type == types.APPL:
+			if term.name != other.name:
+				return False
+			args = term.args
+			other_args = other.args
+			if len(args) != len(other_args):
+				return False
+			if annos:
+				push((term.annotations, other.annotations))
+			for index in range(len(args) - 1, -1, -1):
+				push((args[index], other_args[index]))
+	return True
+
+
+def isEquivalent(term, other):
+	'''Determines if two terms are equivalent, i.e., equal except for the
+	annotations.'''
+	return _compare(term, other, False)
+
+
 def isEqual(term, other):
 	'''Determines if two terms are equal (including annotations).'''
-	comparator = _EqualityComparator()
-	return comparator.visit(term, other)
+	return _compare(term, other, True)
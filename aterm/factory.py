@@ -1,10 +1,14 @@
 '''Term creation.'''
 
 
+import weakref
+
 import antlr
 
+from aterm import types
 from aterm import exception
 from aterm import term
+from aterm import cache
 from aterm import lexer
 from aterm import parser
 
@@ -30,27 +34,163 @@ class Factory(object):
 
 	__metaclass__ = _Singleton
 
-	# TODO: implement maximal sharing
-
-	MAX_PARSE_CACHE_LEN = 512
-
-	# TODO: cache match and build patterns too
+	# approximate bound, in bytes, of the terms kept in the parse cache
+	MAX_PARSE_CACHE_SIZE = 8*1024*1024
+
+	# approximate number of bytes taken by a parsed term per character of its
+	# textual representation
+	PARSE_CACHE_BYTES_PER_CHAR = 32
+
+	MAX_PATTERN_CACHE_LEN = 512
+
+	# whether to read terms with the fast reader (see L{aterm.reader}) instead
+	# of the generic ANTLR based parser
+	FAST_PARSER = True
+
+	# integer literals in this range, and string literals up to this length,
+	# are pooled, so that the most common literals are only built once
+	MIN_POOLED_INT = -128
+	MAX_POOLED_INT = 1023
+	MAX_POOLED_STR_LEN = 32
+	MAX_POOLED_STRS = 65536
+
+	def __init__(self, sharing = False):
+		self.parseCache = cache.LRUCache(
+			maxsize = self.MAX_PARSE_CACHE_SIZE,
+			sizeof = self._parseCacheSizeof
+		)
+		self.matchCache = cache.LRUCache(self.MAX_PATTERN_CACHE_LEN)
+		self.makeCache = cache.LRUCache(self.MAX_PATTERN_CACHE_LEN)
+		# being a singleton, the factory and the empty list are kept at class
+		# level rather than in every term node
+		term.Term.factory = self
+		self.__nil = term.Nil()
+		term.Appl.annotations = self.__nil
+		self.__ints = {}
+		self.__strs = {}
+		self.metrics = None
+		self.setSharing(sharing)
+
+	def setSharing(self, sharing):
+		'''Enables or disables maximal sharing.
+
+		When enabled, structurally equal terms built by this factory are the
+		same object, so equality tests reduce to identity checks. Terms are kept
+		in a weak-valued intern table, keyed by constructor, children identities
+		and annotations, so unused terms are still garbage collected.
+
+		Only terms built while sharing is enabled are interned, therefore it
+		should be enabled before any significant term is built. Patterns
+		compiled before are discarded from the caches, so the compiled
+		patterns should not be kept across this call.
+		'''
+		if sharing:
+			self.__table = weakref.WeakValueDictionary()
+		else:
+			self.__table = None
+		# cached terms, and the literal subterms held by the compiled patterns,
+		# may have been built under a different policy
+		self.parseCache.clear()
+		self.matchCache.clear()
+		self.makeCache.clear()
+
+	def _parseCacheSizeof(self, buf, term):
+		return len(buf)*self.PARSE_CACHE_BYTES_PER_CHAR
+
+	def setParseCacheSize(self, size):
+		'''Set the approximate bound, in bytes, of the terms kept in the
+		parse cache. The cache hit, miss and eviction counters are available
+		from the parseCache.getStats method.'''
+		self.parseCache.resize(maxsize = size)
+
+	def setMetrics(self, enabled):
+		'''Enables or disables the term layer metrics (see L{aterm.metrics}).
+		Enabling them resets the counters.'''
+		if enabled:
+			from aterm import metrics
+			self.metrics = metrics.Metrics(self)
+		else:
+			self.metrics = None
 
-	def __init__(self):
-		self.parseCache = {}
-		self.__nil = term.Nil(self)
+	def getMetrics(self):
+		'''Get a snapshot of the term layer metrics, as a dictionary, or None
+		if they are disabled.'''
+		if self.metrics is None:
+			return None
+		return self.metrics.snapshot()
+
+	def isSharing(self):
+		'''Whether maximal sharing is enabled.'''
+		return self.__table is not None
+
+	def _intern(self, key, cls, *args):
+		'''Get the interned term with the given key, or create it.'''
+		table = self.__table
+		if table is None:
+			if self.metrics is not None:
+				self.metrics.made(key[0])
+			return cls(*args)
+		try:
+			result = table[key]
+		except KeyError:
+			result = term.interned[cls](*args)
+			table[key] = result
+			if self.metrics is not None:
+				self.metrics.made(key[0])
+		else:
+			if self.metrics is not None:
+				self.metrics.internHits += 1
+		return result
 
 	def makeInt(self, value):
 		'''Creates a new integer literal term'''
-		return term.Integer(self, value)
+		if not isinstance(value, (int, long)):
+			raise TypeError('value is not an integer', value)
+		return self._makeInt(value)
+
+	def _makeInt(self, value):
+		if self.__table is None and type(value) is int and self.MIN_POOLED_INT <= value <= self.MAX_POOLED_INT:
+			try:
+				result = self.__ints[value]
+			except KeyError:
+				result = self.__ints[value] = term.Integer(value)
+				if self.metrics is not None:
+					self.metrics.made(types.INT)
+			else:
+				if self.metrics is not None:
+					self.metrics.poolHits += 1
+			return result
+		return self._intern((types.INT, type(value), value), term.Integer, value)
 
 	def makeReal(self, value):
 		'''Creates a new real literal term'''
-		return term.Real(self, value)
+		if not isinstance(value, float):
+			raise TypeError('value is not a float', value)
+		# keyed by the representation, as 0.0 == -0.0
+		return self._intern((types.REAL, type(value), repr(value)), term.Real, value)
 
 	def makeStr(self, value):
 		'''Creates a new string literal term'''
-		return term.Str(self, value)
+		if not isinstance(value, str):
+			raise TypeError('value is not a string', value)
+		return self._makeStr(value)
+
+	def _makeStr(self, value):
+		if self.__table is None and len(value) <= self.MAX_POOLED_STR_LEN:
+			strs = self.__strs
+			try:
+				result = strs[value]
+			except KeyError:
+				result = term.Str(value)
+				if len(strs) < self.MAX_POOLED_STRS:
+					strs[value] = result
+				if self.metrics is not None:
+					self.metrics.made(types.STR)
+			else:
+				if self.metrics is not None:
+					self.metrics.poolHits += 1
+			return result
+		return self._intern((types.STR, type(value), value), term.Str, value)
 
 	def makeNil(self):
 		'''Creates a new empty list term'''
@@ -58,26 +198,86 @@ class Factory(object):
 
 	def makeCons(self, head, tail):
 		'''Creates a new extended list term'''
-		return term.Cons(self, head, tail)
+		if not isinstance(head, term.Term):
+			raise TypeError("head is not a term", head)
+		if not isinstance(tail, term.List):
+			raise TypeError("tail is not a list term", tail)
+		return self._makeCons(head, tail)
+
+	def _makeCons(self, head, tail):
+		'''Trusted version of makeCons, for terms built by this factory.'''
+		if self.__table is None:
+			if self.metrics is not None:
+				self.metrics.made(types.CONS)
+			return term.Cons(head, tail)
+		return self._intern((types.CONS, id(head), id(tail)), term.Cons, head, tail)
 
 	def makeList(self, seq):
 		'''Creates a new list from a sequence.'''
-		accum = self.makeNil()
+		for elm in seq:
+			if not isinstance(elm, term.Term):
+				raise TypeError("head is not a term", elm)
+		return self._makeList(seq)
+
+	def _makeList(self, seq):
+		'''Trusted version of makeList, for terms built by this factory.'''
+		accum = self.__nil
+		if self.__table is None:
+			if self.metrics is not None:
+				self.metrics.made(types.CONS, len(seq))
+			Cons = term.Cons
+			for elm in reversed(seq):
+				accum = Cons(elm, accum)
+			return accum
 		for elm in reversed(seq):
-			accum = self.makeCons(elm, accum)
+			accum = self._makeCons(elm, accum)
 		return accum
 
+	def makeVector(self, seq):
+		'''Creates a new list from a sequence, represented as a persistent
+		vector (see L{aterm.vector}).'''
+		for elm in seq:
+			if not isinstance(elm, term.Term):
+				raise TypeError("head is not a term", elm)
+		from aterm import vector
+		return vector.make(self, vector._build(seq))
+
 	def makeTuple(self, args = None, annotations = None):
 		'''Creates a new tuple term'''
 		return self.makeAppl("", args, annotations)
 
 	def makeAppl(self, name, args = None, annotations = None):
 		'''Creates a new application term'''
+		if not isinstance(name, basestring):
+			raise TypeError("name is not a string", name)
 		if args is None:
 			args = ()
+		else:
+			args = tuple(args)
+			for arg in args:
+				if not isinstance(arg, term.Term):
+					raise TypeError("arg is not a term", arg)
+		if annotations is not None and not isinstance(annotations, term.List):
+			raise TypeError("annotations is not a list", annotations)
+		return self._makeAppl(name, args, annotations)
+
+	def _makeAppl(self, name, args = (), annotations = None):
+		'''Trusted version of makeAppl, for a tuple of arguments and
+		annotations built by this factory.'''
+		if annotations is self.__nil:
+			annotations = None
+		if self.__table is None:
+			if self.metrics is not None:
+				self.metrics.made(types.APPL)
+			if annotations is None:
+				return term.Appl(name, args)
+			return term.AnnotatedAppl(name, args, annotations)
+		key = tuple([id(arg) for arg in args])
 		if annotations is None:
-			annotations = self.makeNil()
-		return term.Appl(self, name, args, annotations)
+			key = (types.APPL, name, key, id(self.__nil))
+			return self._intern(key, term.Appl, name, args)
+		key = (types.APPL, name, key, id(annotations))
+		return self._intern(key, term.AnnotatedAppl, name, args, annotations)
 
 	def coerce(self, value, name = None):
 		'''Coerce an object to a term. Value must be an int, a float, a string,
@@ -112,10 +312,47 @@ class Factory(object):
 		except antlr.ANTLRException, exc:
 			raise exception.ParseError(str(exc))
 
-	def readFromTextFile(self, fp):
-		'''Creates a new term by parsing from a text stream.'''
+	def _read(self, buf, pos = 0):
+		'''Creates a new term by reading a buffer.'''
 
-		return self._parse(lexer.Lexer(fp = fp))
+		if self.FAST_PARSER:
+			from aterm import reader
+			return reader.TextReader(self).read(buf, pos)
+		else:
+			return self._parse(lexer.Lexer(buf, pos))
+
+	def readFromTextFile(self, fp, lazy = False):
+		'''Creates a new term by parsing from a text stream.
+
+		If lazy is true, then only the outermost term is parsed, and large
+		subterms are parsed as they are accessed. See L{aterm.lazy}. Lazily
+		loaded terms are not interned, so the term is parsed eagerly anyway
+		while maximal sharing is enabled.
+		'''
+
+		if lazy and not self.isSharing():
+			from aterm import lazy
+			return lazy.load(self, fp)
+		buf, pos = lexer.mapFile(fp)
+		return self._read(buf, pos)
+
+	def readFromBinaryFile(self, fp):
+		'''Creates a new term by reading from a binary stream.'''
+
+		from aterm import binary
+		reader = binary.BinaryReader(self)
+		return reader.read(fp.read())
+
+	def readFromFile(self, fp, lazy = False):
+		'''Creates a new term by reading from a stream, either in the text or in
+		the binary format. The stream must be seekable. Only text streams
+		are loaded lazily.'''
+
+		from aterm import binary
+		if binary.isBinary(fp):
+			return self.readFromBinaryFile(fp)
+		else:
+			return self.readFromTextFile(fp, lazy)
 
 	def parse(self, buf):
 		'''Creates a new term by parsing a string.'''
@@ -125,36 +362,42 @@ class Factory(object):
 		except KeyError:
 			pass
 
-		result = self._parse(lexer.Lexer(buf))
-
-		if len(self.parseCache) > self.MAX_PARSE_CACHE_LEN:
-			# TODO: use a LRU cache policy
-			self.parseCache.clear()
+		result = self._read(buf)
 		self.parseCache[buf] = result
 
 		return result
 
-	def match(self, pattern, term):
-		'''Matches the term to a string pattern and a list of arguments.
-		'''
+	def compileMatch(self, pattern):
+		'''Compiles a string pattern into a matcher, whose match method
+		matches terms against the pattern. Matchers are cached, and can be
+		reused.'''
+		try:
+			return self.matchCache[pattern]
+		except KeyError:
+			pass
 		assert isinstance(pattern, basestring)
-		from aterm.match import Parser, Match
+		from aterm.match import Parser
 		p = Parser(lexer.Lexer(pattern))
 		try:
 			matcher = p.term()
 		except antlr.ANTLRException, exc:
 			raise exception.ParseError(str(exc))
-		mo = Match()
-		if matcher.visit(term, mo):
-			return mo
-		else:
-			return None
+		self.matchCache[pattern] = matcher
+		return matcher
 
-	def make(self, pattern, *args, **kargs):
-		'''Creates a new term from a string pattern and a list of arguments.
-		First the string pattern is parsed, then the holes in
-		the pattern are filled with the supplied arguments.
+	def match(self, pattern, term):
+		'''Matches the term to a string pattern and a list of arguments.
 		'''
+		return self.compileMatch(pattern).match(term)
+
+	def compileMake(self, pattern):
+		'''Compiles a string pattern into a builder, whose make method
+		creates new terms from the pattern. Builders are cached, and can be
+		reused.'''
+		try:
+			return self.makeCache[pattern]
+		except KeyError:
+			pass
 		assert isinstance(pattern, basestring)
 		from aterm.build import Parser
 		p = Parser(lexer.Lexer(pattern))
@@ -162,18 +405,15 @@ class Factory(object):
 			builder = p.term()
 		except antlr.ANTLRException, exc:
 			raise exception.ParseError(str(exc))
+		self.makeCache[pattern] = builder
+		return builder
 
-		i = 0
-		_args = []
-		for i in range(len(args)):
-			_args.append(self.coerce(args[i], str(i)))
-			i += 1
-
-		_kargs = {}
-		for name, value in kargs.iteritems():
-			_kargs[name] = self.coerce(value, "'" + name + "'")
-
-		return builder.build(*_args, **_kargs)
+	def make(self, pattern, *args, **kargs):
+		'''Creates a new term from a string pattern and a list of arguments.
+		First the string pattern is parsed, then the holes in
+		the pattern are filled with the supplied arguments.
+		'''
+		return self.compileMake(pattern).make(*args, **kargs)
 
 
 factory = Factory()
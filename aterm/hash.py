@@ -1,9 +1,122 @@
-'''Term hash computation.'''
+'''Term hash computation.
 
+Hash values are computed lazily, once per term node, and cached on the node
+itself. The hash of a node is computed from the cached hashes of its subterms,
+so hashing a term costs O(1) once its subterms have been hashed.
 
+The values are cached in the single _hash slot of the term nodes, which holds
+the structural hash alone, as it is by far the most used, and is only replaced
+by a list of all the values, digests included, once any other one is cached.
+'''
+
+
+import struct
+
+try:
+	from hashlib import sha1
+except ImportError:
+	from sha import new as sha1
+
+from aterm import types
 from aterm import visitor
 
 
+# indices of the values in the list held by the _hash slot
+_STRUCTURAL, _FULL, _DIGEST, _FULL_DIGEST = range(4)
+
+
+class _Cache(object):
+	'''Accessor of a value cached in the _hash slot of the term nodes.'''
+
+	def __init__(self, index):
+		self.index = index
+
+	def get(self, term):
+		value = term._hash
+		if type(value) is list:
+			return value[self.index]
+		if self.index == _STRUCTURAL:
+			return value
+		return None
+
+	def put(self, term, value):
+		values = term._hash
+		if type(values) is list:
+			values[self.index] = value
+		elif self.index == _STRUCTURAL:
+			term._hash = value
+		else:
+			values = term._hash = [values, None, None, None]
+			values[self.index] = value
+
+
+def _spine(term, cache):
+	'''Lists the term and the tails of a list term which are still lacking the
+	given cached hash, innermost first, so that long lists are hashed without
+	deep recursion.'''
+	spine = [term]
+	get = cache.get
+	while types.isCons(term):
+		term = term.tail
+		if get(term) is not None:
+			break
+		spine.append(term)
+	spine.reverse()
+	return spine
+
+
+def _children(term, annotations):
+	if term.type == types.APPL:
+		if annotations and term.annotations:
+			return term.args + (term.annotations,)
+		return term.args
+	if term.type == types.CONS:
+		return (term.head, term.tail)
+	return ()
+
+
+def _fill(term, cache, compute, annotations):
+	'''Computes and caches the given value on the term and all its subterms
+	which are still lacking it, in post-order.
+
+	Recursing over the subterms is faster, so that is tried first. Should the
+	term be too deep for it, the computation falls back to an explicit stack.
+	The values cached before the recursion limit was reached are kept, so
+	that no work is lost.
+	'''
+	try:
+		for subterm in _spine(term, cache):
+			cache.put(subterm, compute(subterm))
+	except RuntimeError:
+		# maximum recursion depth exceeded
+		_fillIteratively(term, cache, compute, annotations)
+
+
+def _fillIteratively(term, cache, compute, annotations):
+	get = cache.get
+	put = cache.put
+	stack = [term]
+	pop = stack.pop
+	push = stack.append
+	while stack:
+		term = stack[-1]
+		if get(term) is not None:
+			pop()
+			continue
+		pending = False
+		for child in _children(term, annotations):
+			if get(child) is None:
+				if child.type & types.LIT or child.type == types.NIL:
+					# leaves are computed right away
+					put(child, compute(child))
+				else:
+					push(child)
+					pending = True
+		if not pending:
+			pop()
+			put(term, compute(term))
+
+
 class _StructuralHash(visitor.Visitor):
 
 	# TODO: use a more efficient hash function
@@ -25,34 +138,136 @@ class _StructuralHash(visitor.Visitor):
 	def visitCons(self, term):
 		return hash((
 			term.type,
-			self.visit(term.head),
-			self.visit(term.tail),
+			structuralHash(term.head),
+			structuralHash(term.tail),
 		))
 
 	def visitAppl(self, term):
 		return hash((
 			term.type,
 			term.name,
-			term.args,
+			tuple([structuralHash(arg) for arg in term.args]),
 		))
 
+_structuralHash = _StructuralHash()
+
+_structuralCache = _Cache(_STRUCTURAL)
+
 def structuralHash(term):
 	'''Perform hashing without considering annotations.'''
-	visitor = _StructuralHash()
-	return visitor.visit(term)
+	result = term._hash
+	if type(result) is not int:
+		result = _structuralCache.get(term)
+		if result is None:
+			_fill(term, _structuralCache, _structuralHash.visit, False)
+			result = _structuralCache.get(term)
+	return result
 
 
 class _FullHash(_StructuralHash):
 
+	def visitCons(self, term):
+		return hash((
+			term.type,
+			fullHash(term.head),
+			fullHash(term.tail),
+		))
+
 	def visitAppl(self, term):
-		term_hash = _StructuralHash.visitAppl(self, term)
+		term_hash = hash((
+			term.type,
+			term.name,
+			tuple([fullHash(arg) for arg in term.args]),
+		))
 		if term.annotations:
-			annos_hash = structuralHash(term.annotations)
-			return hash(term_hash, annos_hash)
+			annos_hash = fullHash(term.annotations)
+			return hash((term_hash, annos_hash))
 		else:
 			return term_hash
 
+_fullHash = _FullHash()
+
+_fullCache = _Cache(_FULL)
+
 def fullHash(term):
 	'''Full hash.'''
-	visitor = _FullHash()
-	return visitor.visit(term)
+	result = _fullCache.get(term)
+	if result is None:
+		_fill(term, _fullCache, _fullHash.visit, True)
+		result = _fullCache.get(term)
+	return result
+
+
+class _Digest(visitor.Visitor):
+	'''Computes the digest of a term node from the cached digests of its
+	subterms.'''
+
+	cache = _Cache(_DIGEST)
+	annotations = False
+
+	def visitTerm(self, term):
+		assert False
+
+	def _digest(self, data):
+		return struct.unpack('>Q', sha1(data).digest()[:8])[0]
+
+	def _digests(self, terms):
+		return ''.join([struct.pack('>Q', self.digest(term)) for term in terms])
+
+	def _str(self, value):
+		return struct.pack('>I', len(value)) + value
+
+	def digest(self, term):
+		result = self.cache.get(term)
+		if result is None:
+			_fill(term, self.cache, self.visit, self.annotations)
+			result = self.cache.get(term)
+		return result
+
+	def visitInt(self, term):
+		return self._digest('I' + str(term.value))
+
+	def visitReal(self, term):
+		return self._digest('R' + repr(term.value))
+
+	def visitStr(self, term):
+		return self._digest('S' + term.value)
+
+	def visitNil(self, term):
+		return self._digest('N')
+
+	def visitCons(self, term):
+		return self._digest('C' + self._digests((term.head, term.tail)))
+
+	def visitAppl(self, term):
+		return self._digest('A' + self._str(term.name) + self._digests(term.args))
+
+
+class _FullDigest(_Digest):
+
+	cache = _Cache(_FULL_DIGEST)
+	annotations = True
+
+	def visitAppl(self, term):
+		data = 'A' + self._str(term.name) + self._digests(term.args)
+		if term.annotations:
+			data += '{' + self._digests((term.annotations,))
+		return self._digest(data)
+
+_digest = _Digest()
+_fullDigest = _FullDigest()
+
+def digest(term, annotations = False):
+	'''Content digest of a term, as a 64-bit unsigned integer.
+
+	Unlike the hash values above, digests are stable across interpreter runs
+	and machines, so they can be used as keys for persistent caches. They
+	are computed bottom-up (as a Merkle tree) and memoized on the term nodes,
+	along with the hash values.
+
+	@param annotations: whether annotations should be taken into account.
+	'''
+	if annotations:
+		return _fullDigest.digest(term)
+	else:
+		return _digest.digest(term)
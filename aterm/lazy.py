@@ -0,0 +1,225 @@
+'''Lazy term loading.
+
+Loads terms from their textual representation on demand. The input is memory
+mapped, and only the regions of the terms which are actually visited are
+decoded: the arguments of large application terms, and the elements of large
+list terms, are decoded on first access. Small subterms are parsed eagerly as
+usual.
+
+The bracket structure of the input is scanned once: the extent of every large
+subterm found while scanning is recorded in an index, so that later accesses
+skip over it without rescanning.
+'''
+
+
+import re
+
+from aterm import exception
+from aterm import lexer
+from aterm import term
+
+
+_token_re = re.compile(r'[()\[\]{},]|"[^"\\]*(?:\\.[^"\\]*)*"')
+_space_re = re.compile(r'[ \t\f\r\n]*')
+_name_re = re.compile(r'[A-Z][a-zA-Z0-9_]*')
+_literal_re = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[^ \t\f\r\n()\[\]{},"]+')
+
+
+class _LazyCons(term.Cons):
+	'''List construction term whose head and tail are decoded on first
+	access.'''
+
+	__slots__ = ['_loader', '_positions', '_index']
+
+	def __init__(self, loader, positions, index):
+		term.Term.__init__(self)
+		self._loader = loader
+		self._positions = positions
+		self._index = index
+
+	def _getHead(self):
+		try:
+			return _head.__get__(self, term.Cons)
+		except AttributeError:
+			head = self._loader.decode(self._positions[self._index])
+			_head.__set__(self, head)
+			return head
+
+	def _getTail(self):
+		try:
+			return _tail.__get__(self, term.Cons)
+		except AttributeError:
+			index = self._index + 1
+			if index < len(self._positions):
+				tail = _LazyCons(self._loader, self._positions, index)
+			else:
+				tail = self.factory.makeNil()
+			_tail.__set__(self, tail)
+			return tail
+
+	head = property(_getHead)
+	tail = property(_getTail)
+
+_head = term.Cons.head
+_tail = term.Cons.tail
+
+
+class _LazyAppl(term.AnnotatedAppl):
+	'''Application term whose arguments are decoded on first access.'''
+
+	__slots__ = ['_loader', '_positions']
+
+	def __init__(self, loader, name, positions, annotations):
+		term.Term.__init__(self)
+		self.name = name
+		self.annotations = annotations
+		self._loader = loader
+		self._positions = positions
+
+	def _getArgs(self):
+		try:
+			return _args.__get__(self, term.Appl)
+		except AttributeError:
+			decode = self._loader.decode
+			args = tuple([decode(pos) for pos in self._positions])
+			_args.__set__(self, args)
+			self._positions = None
+			return args
+
+	args = property(_getArgs)
+
+_args = term.Appl.args
+
+
+class Loader(object):
+	'''Decodes terms from a buffer on demand.'''
+
+	# size in bytes from which subterms are decoded lazily
+	threshold = 4096
+
+	def __init__(self, factory, buf, threshold = None):
+		self.factory = factory
+		self.buf = buf
+		if threshold is not None:
+			self.threshold = threshold
+		self.index = {}
+
+	def _space(self, pos):
+		return _space_re.match(self.buf, pos).end()
+
+	def _scan(self, start):
+		'''Scan the region started by the bracket at the given position,
+		returning the position of the matching bracket and the positions of
+		the top-level commas.'''
+		buf = self.buf
+		index = self.index
+		threshold = self.threshold
+		search = _token_re.search
+		stack = [start]
+		commas = []
+		pos = start + 1
+		while True:
+			mo = search(buf, pos)
+			if mo is None:
+				raise exception.ParseError('unbalanced bracket at offset %d' % stack[-1])
+			tokpos = mo.start()
+			pos = mo.end()
+			char = buf[tokpos]
+			if char in '([{':
+				try:
+					pos = index[tokpos] + 1
+				except KeyError:
+					stack.append(tokpos)
+			elif char in ')]}':
+				openpos = stack.pop()
+				if tokpos - openpos >= threshold:
+					index[openpos] = tokpos
+				if not stack:
+					return tokpos, commas
+			elif char == ',':
+				if len(stack) == 1:
+					commas.append(tokpos)
+
+	def _split(self, start, end, commas):
+		'''Positions of the elements enclosed by the brackets at the given
+		positions.'''
+		if not commas and self._space(start + 1) == end:
+			return []
+		return [start + 1] + [comma + 1 for comma in commas]
+
+	def _parse(self, start, end):
+		'''Eagerly parse the term in the given region.'''
+		return self.factory._read(self.buf[start:end])
+
+	def decode(self, pos):
+		'''Decode the term at the given position.'''
+		buf = self.buf
+		pos = self._space(pos)
+		char = buf[pos:pos + 1]
+
+		if char == '[':
+			end, commas = self._scan(pos)
+			if end - pos < self.threshold:
+				return self._parse(pos, end + 1)
+			positions = self._split(pos, end, commas)
+			if not positions:
+				return self.factory.makeNil()
+			return _LazyCons(self, positions, 0)
+
+		mo = _name_re.match(buf, pos)
+		if mo is None and char != '(':
+			mo = _literal_re.match(buf, pos)
+			if mo is None:
+				raise exception.ParseError('unexpected input at offset %d' % pos)
+			return self._parse(pos, mo.end())
+
+		if mo is None:
+			name = ''
+			argspos = pos
+			end = pos
+		else:
+			name = mo.group()
+			argspos = self._space(mo.end())
+			end = mo.end()
+		if buf[argspos:argspos + 1] == '(':
+			argsend, commas = self._scan(argspos)
+			annospos = self._space(argsend + 1)
+			end = argsend + 1
+		else:
+			argsend = None
+			annospos = argspos
+		if buf[annospos:annospos + 1] == '{':
+			annosend, _ = self._scan(annospos)
+			end = annosend + 1
+		else:
+			annosend = None
+
+		if argsend is None or end - pos < self.threshold:
+			return self._parse(pos, end)
+
+		if annosend is None:
+			annos = self.factory.makeNil()
+		else:
+			annos = '[' + buf[annospos + 1:annosend] + ']'
+			annos = self.factory._read(annos)
+		positions = self._split(argspos, argsend, commas)
+		return _LazyAppl(self, name, positions, annos)
+
+
+def load(factory, fp, threshold = None):
+	'''Lazily load a term from a text file.
+
+	The lazily decoded terms are not made by the factory, so they are not
+	interned, therefore lazy loading is refused while the factory has
+	maximal sharing enabled.
+	'''
+	if factory.isSharing():
+		raise ValueError('lazy loading is not supported with maximal sharing')
+	buf, pos = lexer.mapFile(fp)
+	loader = Loader(factory, buf, threshold)
+	pos = loader._space(pos)
+	if buf[pos:pos + 1] == '!':
+		# the abbreviations in the shared textual format refer to the terms
+		# read before, so it can only be read eagerly
+		return factory._read(buf, pos)
+	return loader.decode(pos)
@@ -36,6 +36,29 @@ class Tokenizer(object):
 			return self.symbols_table.get(c, None), c, pos + 1
 
 
+def mapFile(fp):
+	'''Map the contents of a file object into memory, returning a buffer and the
+	current file position.'''
+	try:
+		fileno = fp.fileno()
+		length = os.path.getsize(fp.name)
+		import mmap
+	except:
+		# read whole file into memory
+		buf = fp.read()
+		pos = 0
+	else:
+		# map the whole file into memory
+		if length:
+			# length must not be zero
+			buf = mmap.mmap(fileno, length, access = mmap.ACCESS_READ)
+			pos = os.lseek(fileno, 0, 1)
+		else:
+			buf = ""
+			pos = 0
+	return buf, pos
+
+
 class TokenStream(antlr.TokenStream):
 
 	tokenizer = None
@@ -46,23 +69,7 @@ class TokenStream(antlr.TokenStream):
 
 	def __init__(self, buf = None, pos = 0, filename = None, fp = None):
 		if fp is not None:
-			try:
-				fileno = fp.fileno()
-				length = os.path.getsize(fp.name)
-				import mmap
-			except:
-				# read whole file into memory
-				buf = fp.read()
-				pos = 0
-			else:
-				# map the whole file into memory
-				if length:
-					# length must not be zero
-					buf = mmap.mmap(fileno, length, access = mmap.ACCESS_READ)
-					pos = os.lseek(fileno, 0, 1)
-				else:
-					buf = ""
-					pos = 0
+			buf, pos = mapFile(fp)
 
 			if filename is None:
 				try:
@@ -77,9 +77,13 @@ def append(head, tail):
 
 def insert(term, index, other):
 	'''Insert an element into the list.'''
+	if index < 0:
+		raise IndexError('index out of bounds')
 	factory = term.factory
 	accum = []
 	for i in range(index):
+		if types.isNil(term):
+			raise IndexError('index out of bounds')
 		accum.append(term.head)
 		term = term.tail
 	term = factory.makeCons(other, term)
@@ -130,9 +134,13 @@ def split(term, index):
 	'''Splits a list term in two lists.
 	The argument is the index of the first element of the second list.
 	'''
+	if index < 0:
+		raise IndexError('index out of bounds')
 	factory = term.factory
 	head = []
 	for i in range(index):
+		if types.isNil(term):
+			raise IndexError('index out of bounds')
 		head.append(term.head)
 		term = term.tail
 	return factory.makeList(head), term
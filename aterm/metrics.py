@@ -0,0 +1,125 @@
+'''Term layer metrics.
+
+Counters of the terms made by the factory, of its intern table and literal
+pools, and of its parse and pattern caches, so that the cost of the term
+layer can be tied to the stages of a pipeline. Metrics are disabled by
+default, so that they cost nothing; see L{aterm.factory.Factory.setMetrics}.
+'''
+
+
+import gc
+import sys
+
+from aterm import types
+from aterm import term
+
+
+_typeNames = {
+	types.INT: 'Int',
+	types.REAL: 'Real',
+	types.STR: 'Str',
+	types.CONS: 'Cons',
+	types.APPL: 'Appl',
+}
+
+_caches = ('parseCache', 'matchCache', 'makeCache')
+
+
+def countLiveNodes():
+	'''Count the term nodes currently alive, by scanning the objects tracked
+	by the garbage collector.'''
+	Term = term.Term
+	count = 0
+	for obj in gc.get_objects():
+		if isinstance(obj, Term):
+			count += 1
+	return count
+
+
+class Metrics(object):
+	'''Term layer counters, gathered by the factory.
+
+	The live nodes can only be counted by scanning the whole heap, so the
+	peak live nodes is the maximum of the counts sampled every
+	L{SAMPLE_PERIOD} nodes made, and at every snapshot.
+	'''
+
+	# number of nodes made between samples of the live nodes
+	SAMPLE_PERIOD = 1 << 20
+
+	def __init__(self, factory):
+		self.factory = factory
+		self.reset()
+
+	def reset(self):
+		'''Reset the counters.'''
+		self.nodes = dict.fromkeys(_typeNames, 0)
+		self.internHits = 0
+		self.poolHits = 0
+		self.peakLiveNodes = 0
+		self.countdown = self.SAMPLE_PERIOD
+		# the cache counters are cumulative, so they are reported relative to
+		# their values on reset
+		self.cacheBase = {}
+		for name in _caches:
+			self.cacheBase[name] = getattr(self.factory, name).getStats()
+
+	def made(self, type, count = 1):
+		'''Count nodes made of the given type.'''
+		self.nodes[type] += count
+		self.countdown -= count
+		if self.countdown <= 0:
+			self.sample()
+
+	def sample(self):
+		'''Sample the live nodes.'''
+		self.countdown = self.SAMPLE_PERIOD
+		live = countLiveNodes()
+		if live > self.peakLiveNodes:
+			self.peakLiveNodes = live
+		return live
+
+	def snapshot(self):
+		'''Get the counters, as a dictionary.'''
+		live = self.sample()
+		result = {
+			'nodes': dict([(_typeNames[type], count) for type, count in self.nodes.iteritems()]),
+			'internHits': self.internHits,
+			'poolHits': self.poolHits,
+			'liveNodes': live,
+			'peakLiveNodes': self.peakLiveNodes,
+		}
+		for name in _caches:
+			stats = getattr(self.factory, name).getStats()
+			base = self.cacheBase[name]
+			result[name] = {
+				'hits': stats['hits'] - base['hits'],
+				'misses': stats['misses'] - base['misses'],
+				'evictions': stats['evictions'] - base['evictions'],
+				'len': stats['len'],
+			}
+		return result
+
+
+def format(snapshot):
+	'''Format a snapshot in a single line.'''
+	nodes = snapshot['nodes']
+	s = 'nodes %s' % ' '.join(['%s=%d' % (name, nodes[name]) for name in ('Int', 'Real', 'Str', 'Cons', 'Appl')])
+	s += '; intern hits %d; pool hits %d' % (snapshot['internHits'], snapshot['poolHits'])
+	for name in _caches:
+		stats = snapshot[name]
+		s += '; %s hits %d misses %d' % (name[:-5], stats['hits'], stats['misses'])
+	s += '; live nodes %d; peak live nodes %d' % (snapshot['liveNodes'], snapshot['peakLiveNodes'])
+	return s
+
+
+def dump(factory, stage, fp = None):
+	'''Write the factory metrics for a pipeline stage, if enabled, and reset
+	them, so that each stage is reported on its own.'''
+	metrics = factory.metrics
+	if metrics is None:
+		return
+	if fp is None:
+		fp = sys.stderr
+	fp.write('metrics: %s: %s\n' % (stage, format(metrics.snapshot())))
+	metrics.reset()
@@ -17,45 +17,6 @@ DESCENDENT = 1
 SUBSEQUENT = 2
 
 
-class _Transformer(visitor.IncrementalVisitor):
-
-	def __init__(self, index, func):
-		visitor.IncrementalVisitor.__init__(self)
-		self.index = index
-		self.func = func
-
-	def __call__(self, term):
-		return self.visit(term, 0)
-
-	def visitTerm(self, term, index):
-		raise TypeError('not a term list or application', term)
-
-	def visitNil(self, term, index):
-		raise IndexError('index out of range', index)
-
-	def visitHead(self, term, index):
-		if index == self.index:
-			return self.func(term)
-		else:
-			return term
-
-	def visitTail(self, term, index):
-		if index >= self.index:
-			return term
-		else:
-			return self.visit(term, index + 1)
-
-	def visitAppl(self, term, index):
-		old_arg = term.args[self.index]
-		new_arg = self.func(old_arg)
-		if new_arg is not old_arg:
-			args = list(term.args)
-			args[self.index] = new_arg
-			return term.factory.makeAppl(term.name, args, term.annotations)
-		else:
-			return term
-
-
 class Path(object):
 	'''A path is a term comprehending a list of integer indexes which indicate
 	the position of a term relative to the root term.
@@ -100,6 +61,9 @@ class Path(object):
 
 	__eq__ = equals
 
+	def __hash__(self):
+		return hash(tuple(self.indices))
+
 	def contains(self, other):
 		return self.compare(other) in (DESCENDENT, EQUAL)
 
@@ -131,11 +95,8 @@ class Path(object):
 		return term
 
 	def transform(self, term, func):
-		func = func
-		for index in reversed(self.indices):
-			func = _Transformer(index, func)
-		term = func(term)
-		return term
+		'''Transforms the subterm specified by a path.'''
+		return transformMany(term, {self: func})
 
 	def fromTerm(cls, trm):
 		res = []
@@ -169,6 +130,187 @@ class Path(object):
 	__str__ = toStr
 
 
+def _children(term):
+	'''Direct subterms of a term, as a tuple.'''
+	type = term.type
+	if type == types.APPL:
+		return term.args
+	if type == types.CONS:
+		return tuple(term)
+	if type == types.NIL:
+		return ()
+	raise TypeError('not a term list or application', term)
+
+
+def _rebuild(term, children):
+	'''Rebuild a term with new direct subterms.'''
+	if types.isAppl(term):
+		return term.factory.makeAppl(term.name, children, term.annotations)
+	else:
+		return term.factory.makeList(children)
+
+
+def _transformMany(term, edits):
+	# edits is a trie, keyed by the indices, and by None for the function to
+	# apply at this position
+	if len(edits) > 1 or None not in edits:
+		type = term.type
+		if type == types.APPL:
+			args = list(term.args)
+			changed = False
+			for index, subedits in edits.iteritems():
+				if index is None:
+					continue
+				old_arg = args[index]
+				new_arg = _transformMany(old_arg, subedits)
+				if new_arg is not old_arg:
+					args[index] = new_arg
+					changed = True
+			if changed:
+				term = term.factory.makeAppl(term.name, args, term.annotations)
+		elif type in (types.CONS, types.NIL):
+			# only the list prefix up to the last edited element is rebuilt,
+			# the rest of the list is shared
+			last = max([index for index in edits if index is not None])
+			elms = []
+			tail = term
+			for index in range(last + 1):
+				if not types.isCons(tail):
+					raise IndexError('index out of range', index)
+				elms.append(tail.head)
+				tail = tail.tail
+			changed = False
+			for index, subedits in edits.iteritems():
+				if index is None:
+					continue
+				old_elm = elms[index]
+				new_elm = _transformMany(old_elm, subedits)
+				if new_elm is not old_elm:
+					elms[index] = new_elm
+					changed = True
+			if changed:
+				factory = term.factory
+				for elm in reversed(elms):
+					tail = factory.makeCons(elm, tail)
+				term = tail
+		else:
+			raise TypeError('not a term list or application', term)
+	func = edits.get(None)
+	if func is not None:
+		term = func(term)
+	return term
+
+
+def transformMany(term, edits):
+	'''Transforms several subterms at once. The edits are given as a mapping
+	of paths (or sequences of indices) to the functions which transform the
+	respective subterms. Each ancestor of the transformed subterms is rebuilt
+	only once. When a path and one of its descendents are both transformed,
+	the descendent is transformed first.'''
+	trie = {}
+	for path, func in edits.iteritems():
+		if isinstance(path, Path):
+			path = path.indices
+		node = trie
+		for index in path:
+			node = node.setdefault(index, {})
+		node[None] = func
+	if not trie:
+		return term
+	return _transformMany(term, trie)
+
+
+class Zipper(object):
+	'''A zipper is a cursor over a term, which allows to move around and to
+	replace subterms, rebuilding the modified ancestors only when moving up.
+
+	Zippers are not modifiable. Moves and replacements are carried out by
+	returning another zipper instance.
+	'''
+
+	__slots__ = ['term', 'parent', 'index', 'siblings', 'changed']
+
+	def __init__(self, term, parent = None, index = None, siblings = None, changed = False):
+		# focused term
+		self.term = term
+		# zipper focused on the parent term, before any changes
+		self.parent = parent
+		# index of the focused term in the parent term
+		self.index = index
+		# direct subterms of the parent term, with changes other than the
+		# focused term
+		self.siblings = siblings
+		# whether the siblings were changed
+		self.changed = changed
+
+	def isRoot(self):
+		return self.parent is None
+
+	def _flush(self):
+		'''Get the siblings, including the focused term.'''
+		siblings = self.siblings
+		index = self.index
+		if self.term is siblings[index]:
+			return siblings, self.changed
+		siblings = siblings[:index] + (self.term,) + siblings[index + 1:]
+		return siblings, True
+
+	def down(self, index = 0):
+		'''Move to the direct subterm with the given index.'''
+		children = _children(self.term)
+		if index < 0 or index >= len(children):
+			raise IndexError('index out of range', index)
+		return Zipper(children[index], self, index, children, False)
+
+	def up(self):
+		'''Move to the parent term.'''
+		parent = self.parent
+		if parent is None:
+			raise IndexError('no parent term')
+		siblings, changed = self._flush()
+		if not changed:
+			return parent
+		term = _rebuild(parent.term, siblings)
+		return Zipper(term, parent.parent, parent.index, parent.siblings, parent.changed)
+
+	def _sibling(self, index):
+		if self.parent is None:
+			raise IndexError('no parent term')
+		siblings, changed = self._flush()
+		if index < 0 or index >= len(siblings):
+			raise IndexError('index out of range', index)
+		return Zipper(siblings[index], self.parent, index, siblings, changed)
+
+	def left(self):
+		'''Move to the previous sibling term.'''
+		return self._sibling(self.index - 1)
+
+	def right(self):
+		'''Move to the next sibling term.'''
+		return self._sibling(self.index + 1)
+
+	def replace(self, term):
+		'''Replace the focused term.'''
+		return Zipper(term, self.parent, self.index, self.siblings, self.changed)
+
+	def root(self):
+		'''Move up to the root term, and return it.'''
+		zipper = self
+		while zipper.parent is not None:
+			zipper = zipper.up()
+		return zipper.term
+
+	def getPath(self):
+		'''Get the path of the focused term.'''
+		indices = []
+		zipper = self
+		while zipper.parent is not None:
+			indices.append(zipper.index)
+			zipper = zipper.parent
+		indices.reverse()
+		return Path(indices)
+
+
 class _Annotator(visitor.Visitor):
 
 	def __init__(self, func = None):
@@ -202,19 +344,122 @@ class _Annotator(visitor.Visitor):
 def annotate(term, root = None, func = None):
 	'''Recursively annotates the terms and all subterms with their
 	path.'''
-	annotator = _Annotator(func)
+	if func is None:
+		func = lambda term: True
+	factory = term.factory
+	makeCons = factory.makeCons
+	makeInt = factory.makeInt
 	if root is None:
-		root = term.factory.makeNil()
-	return annotator.visit(term, root)
-
+		root = factory.makeNil()
+
+	# same as _Annotator, but with an explicit stack of (term, path, count)
+	# entries, where count is None until the subterms have been pushed, so
+	# that long lists and deep terms do not exhaust the interpreter stack
+	results = []
+	stack = [(term, root, None)]
+	pop = stack.pop
+	push = stack.append
+	while stack:
+		term, path, count = pop()
+		type = term.type
+		if count is None:
+			if type == types.CONS:
+				elms = list(term)
+			elif type == types.APPL:
+				elms = term.args
+			else:
+				results.append(term)
+				continue
+			push((term, path, len(elms)))
+			for index in range(len(elms) - 1, -1, -1):
+				push((elms[index], makeCons(makeInt(index), path), None))
+			continue
+
+		if count:
+			elms = results[-count:]
+			del results[-count:]
+		else:
+			elms = []
+		if type == types.CONS:
+			results.append(factory.makeList(elms))
+		else:
+			term = factory.makeAppl(term.name, elms, term.annotations)
+			if func(term):
+				term = annotation.set(term, factory.makeAppl('Path', [path]))
+			results.append(term)
+	return results[0]
+
+
+def annotateSelection(term, path, func = None):
+	'''Annotates with their path only the terms along the given path, from the
+	root term to the selected subterm, and the subterms of the selected
+	subterm, i.e., the terms which either contain or are contained in the
+	selection. The rest of the term is shared, so this takes time proportional
+	to the path length and to the size of the selected subterm, rather than to
+	the size of the whole term.'''
+	if func is None:
+		func = lambda term: True
+	if not isinstance(path, Path):
+		path = Path(path)
+	indices = path.indices
+	factory = term.factory
+
+	def ancestor(depth):
+		anno = factory.makeAppl('Path', [Path(indices[:depth]).toTerm()])
+		def annotateAncestor(term):
+			if types.isAppl(term) and func(term):
+				return annotation.set(term, anno)
+			return term
+		return annotateAncestor
 
-class _DeAnnotator(_Annotator):
+	edits = {}
+	for depth in range(len(indices)):
+		edits[tuple(indices[:depth])] = ancestor(depth)
+	edits[tuple(indices)] = lambda term: annotate(term, path.toTerm(), func)
+	return transformMany(term, edits)
 
-	def visitAppl(self, term, path):
-		return annotation.remove(term, 'Path')
 
 def deannotate(term):
-	'''Recursively removes all path annotations.'''
-	annotator = _DeAnnotator()
-	root = term.factory.makeNil()
-	return annotator.visit(term, root)
+	'''Recursively removes all path annotations. Only the terms which held
+	any, and their ancestors, are rebuilt.'''
+	factory = term.factory
+
+	# explicit stack of (term, count) entries, as in annotate
+	results = []
+	stack = [(term, None)]
+	pop = stack.pop
+	push = stack.append
+	while stack:
+		term, count = pop()
+		type = term.type
+		if count is None:
+			if type == types.CONS:
+				elms = list(term)
+			elif type == types.APPL:
+				elms = term.args
+			else:
+				results.append(term)
+				continue
+			push((term, len(elms)))
+			for index in range(len(elms) - 1, -1, -1):
+				push((elms[index], None))
+			continue
+
+		if count:
+			elms = results[-count:]
+			del results[-count:]
+		else:
+			elms = []
+		if type == types.CONS:
+			for old, new in itertools.izip(term, elms):
+				if new is not old:
+					term = factory.makeList(elms)
+					break
+		else:
+			for old, new in itertools.izip(term.args, elms):
+				if new is not old:
+					term = factory.makeAppl(term.name, elms, term.annotations)
+					break
+			term = annotation.remove(term, 'Path')
+		results.append(term)
+	return results[0]
@@ -30,10 +30,7 @@ class _Subterm(visitor.Visitor):
 		raise IndexError('index out of bounds')
 
 	def visitCons(self, term, index):
-		if index == 0:
-			return term.head
-		else:
-			return self.visit(term.tail, index - 1)
+		return term[index]
 
 	def visitAppl(self, term, index):
 		return term.args[index]
@@ -0,0 +1,233 @@
+'''Term reading.
+
+A fast reader for the textual representation of terms. The input is tokenized
+by a single compiled regular expression, and terms are built bottom-up with an
+explicit stack, so there is no limit on the nesting depth. Unlike the generic
+term parser (see L{aterm.parser}), it only accepts terms, not patterns.
+
+It also reads the shared textual format written by L{aterm.write.writeText}.
+'''
+
+
+import gc
+import re
+
+from aterm import exception
+from aterm import write
+
+
+_token_re = re.compile(r'''
+	[ \t\f\r\n]*
+	(?:
+		# REAL
+		(-?(?:(?:[0-9]+\.[0-9]*|\.[0-9]+)(?:[eE][-+]?[0-9]+)?|[0-9]+[eE][-+]?[0-9]+))
+	|
+		# INT
+		(-?[0-9]+)
+	|
+		# STR
+		("[^"\\]*(?:\\.[^"\\]*)*")
+	|
+		# CONS
+		([A-Z][a-zA-Z0-9_]*)
+	|
+		# symbols
+		([][(){},])
+	|
+		# ABBREV
+		\#([A-Za-z0-9+/]+)
+	|
+		# anything else
+		(.)
+	|
+		\Z
+	)
+''', re.VERBOSE | re.DOTALL)
+
+_REAL = 1
+_INT = 2
+_STR = 3
+_CONS = 4
+_SYMBOL = 5
+_ABBREV = 6
+_ERROR = 7
+
+_EOF = None
+
+# stack frame kinds
+_LIST = 0
+_ARGS = 1
+_ANNOS = 2
+
+_closers = {
+	_LIST: ']',
+	_ARGS: ')',
+	_ANNOS: '}',
+}
+
+# no value was read yet
+_NONE = object()
+
+
+_abbrev_values = dict([(digit, value) for value, digit in enumerate(write.ABBREV_DIGITS)])
+
+
+def _abbrev(text):
+	index = 0
+	for digit in text:
+		index = index*64 + _abbrev_values[digit]
+	return index
+
+
+def _unescape(text):
+	text = text[1:-1]
+	if '\\' in text:
+		text = text.replace('\\r', '\r')
+		text = text.replace('\\n', '\n')
+		text = text.replace('\\t', '\t')
+		text = text.replace('\\', '')
+	return text
+
+
+class TextReader(object):
+	'''Reads terms from their textual representation.'''
+
+	def __init__(self, factory):
+		self.factory = factory
+
+	def _error(self, buf, mo):
+		pos = mo.start(mo.lastindex or 0)
+		if mo.lastindex is _EOF:
+			msg = 'unexpected end of input'
+		else:
+			msg = 'unexpected token %r' % mo.group(mo.lastindex)
+		raise exception.ParseError('%s at offset %d' % (msg, pos))
+
+	def read(self, buf, pos = 0):
+		'''Read a term from a buffer, starting at the given position.'''
+
+		# terms are acyclic, so there is no point in having the garbage
+		# collector repeatedly scanning the terms as they are allocated
+		enabled = gc.isenabled()
+		gc.disable()
+		try:
+			return self._read(buf, pos)
+		finally:
+			if enabled:
+				gc.enable()
+
+	def _read(self, buf, pos):
+		factory = self.factory
+		# the terms are built by the factory, so there is no need to check them
+		makeAppl = factory._makeAppl
+		makeList = factory._makeList
+		match = _token_re.match
+
+		# terms numbered so far in the shared textual format
+		mo = match(buf, pos)
+		if mo.lastindex == _ERROR and mo.group(_ERROR) == '!':
+			pos = mo.end()
+			abbrevs = []
+		else:
+			abbrevs = None
+
+		# each stack frame is a list with kind, application name, application
+		# arguments, and the items read so far
+		stack = []
+		value = _NONE
+		lookahead = None
+		while True:
+			if lookahead is None:
+				mo = match(buf, pos)
+			else:
+				mo = lookahead
+				lookahead = None
+			pos = mo.end()
+			kind = mo.lastindex
+
+			if value is _NONE:
+				# expecting a term
+				if kind == _INT:
+					value = factory._makeInt(int(mo.group(_INT)))
+				elif kind == _REAL:
+					value = factory.makeReal(float(mo.group(_REAL)))
+				elif kind == _STR:
+					value = factory._makeStr(_unescape(mo.group(_STR)))
+				elif kind == _CONS:
+					name = mo.group(_CONS)
+					mo = match(buf, pos)
+					symbol = mo.group(_SYMBOL)
+					if symbol == '(':
+						pos = mo.end()
+						stack.append([_ARGS, name, (), []])
+					elif symbol == '{':
+						pos = mo.end()
+						stack.append([_ANNOS, name, (), []])
+					else:
+						lookahead = mo
+						value = makeAppl(name)
+					continue
+				elif kind == _ABBREV and abbrevs is not None:
+					try:
+						value = abbrevs[_abbrev(mo.group(_ABBREV))]
+					except IndexError:
+						raise exception.ParseError('undefined abbreviation %r at offset %d' % (mo.group(), mo.start(_ABBREV)))
+					continue
+				elif kind == _SYMBOL:
+					symbol = mo.group(_SYMBOL)
+					if symbol == '[':
+						stack.append([_LIST, None, None, []])
+						continue
+					elif symbol == '(':
+						stack.append([_ARGS, '', (), []])
+						continue
+					elif stack and symbol == _closers[stack[-1][0]] and not stack[-1][3]:
+						# empty list, arguments, or annotations (a closer
+						# directly following a comma is rejected)
+						frame = stack.pop()
+					else:
+						self._error(buf, mo)
+				else:
+					self._error(buf, mo)
+			else:
+				# expecting a separator or a closing bracket
+				if not stack:
+					if kind is _EOF:
+						return value
+					self._error(buf, mo)
+				if kind != _SYMBOL:
+					self._error(buf, mo)
+				symbol = mo.group(_SYMBOL)
+				frame = stack[-1]
+				if symbol == ',':
+					frame[3].append(value)
+					value = _NONE
+					continue
+				if symbol != _closers[frame[0]]:
+					self._error(buf, mo)
+				frame[3].append(value)
+				value = _NONE
+				stack.pop()
+
+			if value is not _NONE:
+				continue
+
+			# a frame was closed
+			frame_kind, name, args, items = frame
+			if frame_kind == _LIST:
+				value = makeList(items)
+				if not items:
+					continue
+			elif frame_kind == _ARGS:
+				mo = match(buf, pos)
+				if mo.group(_SYMBOL) == '{':
+					pos = mo.end()
+					stack.append([_ANNOS, name, items, []])
+					continue
+				else:
+					lookahead = mo
+					value = makeAppl(name, tuple(items))
+			else:
+				value = makeAppl(name, tuple(args), makeList(items))
+			if abbrevs is not None:
+				abbrevs.append(value)
@@ -20,10 +20,17 @@ class Term(object):
 
 	# NOTE: most methods defer the execution to visitors
 
-	__slots__ = ['factory']
+	# only the interned terms are weakly referenced, so the __weakref__ slot
+	# is left to their classes (see L{interned})
+	__slots__ = ['_hash']
 
-	def __init__(self, factory):
-		self.factory = factory
+	# the factory is a singleton, so it is kept at class level instead of in
+	# every node; it is set when the factory is created
+	factory = None
+
+	def __init__(self):
+		# hash values are computed lazily by the hash module
+		self._hash = None
 
 	# XXX: this has a large inpact in performance
 	if __debug__ and False:
@@ -43,6 +50,20 @@ class Term(object):
 		'''Prevent deletion of term attributes.'''
 		raise AttributeError("attempt to delete read-only term attribute '%s'" % name)
 
+	def __reduce__(self):
+		'''Terms are pickled in the binary format (see L{aterm.binary}), so
+		that they are rebuilt, and interned, by the factory of the unpickling
+		process, and their shared subterms are preserved.'''
+		from aterm import binary
+		return binary.loads, (binary.dumps(self),)
+
+	def __copy__(self):
+		# terms are immutable
+		return self
+
+	def __deepcopy__(self, memo):
+		return self
+
 	def getType(self):
 		'''Gets the type of this term.'''
 		return self.type
@@ -59,6 +80,12 @@ class Term(object):
 
 	__hash__ = getStructuralHash
 
+	def getDigest(self, annotations = False):
+		'''Generate a 64-bit content digest for this term, which is stable
+		across runs. Annotations are only taken into account if requested.
+		'''
+		return hash.digest(self, annotations)
+
 	def isEquivalent(self, other):
 		'''Checks for structural equivalence of this term agains another term.'''
 		return compare.isEquivalent(self, other)
@@ -70,6 +97,8 @@ class Term(object):
 		return compare.isEqual(self, other)
 
 	def __eq__(self, other):
+		if self is other:
+			return True
 		if not isinstance(other, Term):
 			# TODO: produce a warning
 			return False
@@ -88,8 +117,18 @@ class Term(object):
 
 	def writeToTextFile(self, fp):
 		'''Write this term to a file object.'''
-		writer = write.TextWriter(fp)
-		writer.visit(self)
+		write.writeText(self, fp)
+
+	def writeToSharedTextFile(self, fp):
+		'''Write this term to a file object in the shared textual format,
+		where repeated subterms are written as back-references.'''
+		write.writeText(self, fp, shared = True)
+
+	def writeToBinaryFile(self, fp):
+		'''Write this term to a file object in the binary format.'''
+		from aterm import binary
+		writer = binary.BinaryWriter(fp)
+		writer.write(self)
 
 	def __str__(self):
 		'''Get the string representation of this term.'''
@@ -120,8 +159,8 @@ class Lit(Term):
 
 	__slots__ = ['value']
 
-	def __init__(self, factory, value):
-		Term.__init__(self, factory)
+	def __init__(self, value):
+		Term.__init__(self)
 		self.value = value
 
 	def getValue(self):
@@ -135,11 +174,6 @@ class Integer(Lit):
 
 	type = types.INT
 
-	def __init__(self, factory, value):
-		if not isinstance(value, (int, long)):
-			raise TypeError('value is not an integer', value)
-		Lit.__init__(self, factory, value)
-
 	def __int__(self):
 		return int(self.value)
 
@@ -154,11 +188,6 @@ class Real(Lit):
 
 	type = types.REAL
 
-	def __init__(self, factory, value):
-		if not isinstance(value, float):
-			raise TypeError('value is not a float', value)
-		Lit.__init__(self, factory, value)
-
 	def __float__(self):
 		return float(self.value)
 
@@ -173,11 +202,6 @@ class Str(Lit):
 
 	type = types.STR
 
-	def __init__(self, factory, value):
-		if not isinstance(value, str):
-			raise TypeError('value is not a string', value)
-		Lit.__init__(self, factory, value)
-
 	def accept(self, visitor, *args, **kargs):
 		return visitor.visitStr(self, *args, **kargs)
 
@@ -210,6 +234,9 @@ class List(Term):
 	def extend(self, other):
 		return lists.extend(self, other)
 
+	def split(self, index):
+		return lists.split(self, index)
+
 	def reverse(self):
 		return lists.reverse(self)
 
@@ -224,9 +251,6 @@ class Nil(List):
 
 	type = types.NIL
 
-	def __init__(self, factory):
-		List.__init__(self, factory)
-
 	def accept(self, visitor, *args, **kargs):
 		return visitor.visitNil(self, *args, **kargs)
 
@@ -238,13 +262,9 @@ class Cons(List):
 
 	type = types.CONS
 
-	def __init__(self, factory, head, tail):
-		List.__init__(self, factory)
-		if not isinstance(head, Term):
-			raise TypeError("head is not a term", head)
+	def __init__(self, head, tail):
+		List.__init__(self)
 		self.head = head
-		if not isinstance(tail, List):
-			raise TypeError("tail is not a list term", tail)
 		self.tail = tail
 
 	def accept(self, visitor, *args, **kargs):
@@ -254,22 +274,18 @@ class Cons(List):
 class Appl(Term):
 	'''Application term.'''
 
-	__slots__ = ['name', 'args', 'annotations']
+	__slots__ = ['name', 'args']
 
 	type = types.APPL
 
-	def __init__(self, factory, name, args, annotations):
-		Term.__init__(self, factory)
-		if not isinstance(name, basestring):
-			raise TypeError("name is not a string", name)
+	# most application terms have no annotations, so the empty annotations
+	# list is kept at class level; it is set when the factory is created
+	annotations = None
+
+	def __init__(self, name, args):
+		Term.__init__(self)
 		self.name = name
-		self.args = tuple(args)
-		for arg in self.args:
-			if not isinstance(arg, Term):
-				raise TypeError("arg is not a term", arg)
-		if not isinstance(annotations, List):
-			raise TypeError("annotations is not a list", annotations)
-		self.annotations = annotations
+		self.args = args
 
 	def getArity(self):
 		return len(self.args)
@@ -285,3 +301,26 @@ class Appl(Term):
 	def accept(self, visitor, *args, **kargs):
 		return visitor.visitAppl(self, *args, **kargs)
 
+
+class AnnotatedAppl(Appl):
+	'''Application term with annotations.'''
+
+	__slots__ = ['annotations']
+
+	def __init__(self, name, args, annotations):
+		Appl.__init__(self, name, args)
+		self.annotations = annotations
+
+
+def _interned(cls):
+	'''Make the variant of a term class for the terms interned by the factory,
+	which are weakly referenced from its intern table.'''
+	return type(cls.__name__, (cls,), {
+		'__slots__': ['__weakref__'],
+		'__module__': cls.__module__,
+		'__doc__': cls.__doc__,
+	})
+
+# interned variants of the term classes, which the factory instantiates while
+# maximal sharing is enabled
+interned = dict([(cls, _interned(cls)) for cls in (Integer, Real, Str, Cons, Appl, AnnotatedAppl)])
@@ -0,0 +1,238 @@
+'''Vector list terms.
+
+An alternative representation of list terms, as persistent vectors. The
+elements are kept in chunks at the leaves of a height balanced binary tree, so
+that the length is known in constant time, and indexing, splitting,
+insertion, and concatenation take logarithmic time.
+
+Vector terms are list construction terms -- their head and tail are computed
+on demand -- so they are interchangeable with the usual L{aterm.term.Cons}
+and L{aterm.term.Nil} terms everywhere, including pattern matching.
+'''
+
+
+from aterm import types
+from aterm import term
+
+
+# maximum number of elements in a leaf chunk
+CHUNK = 32
+
+
+class _Node(object):
+	'''Inner tree node. The leaves are tuples.'''
+
+	__slots__ = ['left', 'right', 'size', 'height']
+
+	def __init__(self, left, right):
+		self.left = left
+		self.right = right
+		self.size = _size(left) + _size(right)
+		self.height = max(_height(left), _height(right)) + 1
+
+
+def _size(node):
+	if isinstance(node, tuple):
+		return len(node)
+	return node.size
+
+
+def _height(node):
+	if isinstance(node, tuple):
+		return 0
+	return node.height
+
+
+def _build(elms):
+	'''Build a balanced tree from a sequence of elements.'''
+	elms = tuple(elms)
+	nodes = [elms[i:i + CHUNK] for i in range(0, len(elms), CHUNK)]
+	if not nodes:
+		return ()
+	while len(nodes) > 1:
+		pairs = [_Node(nodes[i], nodes[i + 1]) for i in range(0, len(nodes) - 1, 2)]
+		if len(nodes) % 2:
+			pairs.append(nodes[-1])
+		nodes = pairs
+	return nodes[0]
+
+
+def _balance(left, right):
+	'''Make a node from two subtrees whose heights differ at most by two.'''
+	lh = _height(left)
+	rh = _height(right)
+	if lh > rh + 1:
+		if _height(left.left) >= _height(left.right):
+			return _Node(left.left, _Node(left.right, right))
+		else:
+			return _Node(
+				_Node(left.left, left.right.left),
+				_Node(left.right.right, right)
+			)
+	if rh > lh + 1:
+		if _height(right.right) >= _height(right.left):
+			return _Node(_Node(left, right.left), right.right)
+		else:
+			return _Node(
+				_Node(left, right.left.left),
+				_Node(right.left.right, right.right)
+			)
+	return _Node(left, right)
+
+
+def _join(left, right):
+	'''Concatenate two trees.'''
+	if not _size(left):
+		return right
+	if not _size(right):
+		return left
+	lh = _height(left)
+	rh = _height(right)
+	if lh > rh + 1:
+		return _balance(left.left, _join(left.right, right))
+	if rh > lh + 1:
+		return _balance(_join(left, right.left), right.right)
+	if not lh and not rh and len(left) + len(right) <= CHUNK:
+		return left + right
+	return _Node(left, right)
+
+
+def _split(node, index):
+	'''Split a tree in two at the given index.'''
+	if isinstance(node, tuple):
+		return node[:index], node[index:]
+	size = _size(node.left)
+	if index < size:
+		left, right = _split(node.left, index)
+		return left, _join(right, node.right)
+	elif index > size:
+		left, right = _split(node.right, index - size)
+		return _join(node.left, left), right
+	else:
+		return node.left, node.right
+
+
+def _item(node, index):
+	while not isinstance(node, tuple):
+		size = _size(node.left)
+		if index < size:
+			node = node.left
+		else:
+			index -= size
+			node = node.right
+	return node[index]
+
+
+def _iter(node, start):
+	'''Iterate over the elements of a tree, from the given index onwards.'''
+	stack = [node]
+	while stack:
+		node = stack.pop()
+		if isinstance(node, tuple):
+			if start:
+				node = node[start:]
+				start = 0
+			for elm in node:
+				yield elm
+			continue
+		size = _size(node.left)
+		if start >= size:
+			start -= size
+			stack.append(node.right)
+		else:
+			stack.append(node.right)
+			stack.append(node.left)
+
+
+class Vector(term.Cons):
+	'''List construction term backed by a persistent vector. A vector term
+	is a view of a tree from a given offset onwards, so that taking the tail
+	takes constant time.'''
+
+	__slots__ = ['_tree', '_offset']
+
+	def __init__(self, tree, offset = 0):
+		term.Term.__init__(self)
+		assert offset < _size(tree)
+		self._tree = tree
+		self._offset = offset
+
+	def _getHead(self):
+		try:
+			return _head.__get__(self, term.Cons)
+		except AttributeError:
+			head = _item(self._tree, self._offset)
+			_head.__set__(self, head)
+			return head
+
+	def _getTail(self):
+		try:
+			return _tail.__get__(self, term.Cons)
+		except AttributeError:
+			offset = self._offset + 1
+			if offset < _size(self._tree):
+				tail = Vector(self._tree, offset)
+			else:
+				tail = self.factory.makeNil()
+			_tail.__set__(self, tail)
+			return tail
+
+	head = property(_getHead)
+	tail = property(_getTail)
+
+	def getTree(self):
+		'''Get the tree, without the elements before the offset.'''
+		if self._offset:
+			return _split(self._tree, self._offset)[1]
+		return self._tree
+
+	def __len__(self):
+		return _size(self._tree) - self._offset
+
+	def __getitem__(self, index):
+		if index < 0 or index >= len(self):
+			raise IndexError('index out of bounds')
+		return _item(self._tree, self._offset + index)
+
+	def __iter__(self):
+		return _iter(self._tree, self._offset)
+
+	def insert(self, index, element):
+		if index < 0 or index > len(self):
+			raise IndexError('index out of bounds')
+		left, right = _split(self.getTree(), index)
+		return Vector(_join(_join(left, (element,)), right))
+
+	def append(self, element):
+		return Vector(_join(self.getTree(), (element,)))
+
+	def extend(self, other):
+		if types.isNil(other):
+			return self
+		if isinstance(other, Vector):
+			tree = other.getTree()
+		else:
+			tree = _build(other)
+		return Vector(_join(self.getTree(), tree))
+
+	def split(self, index):
+		if index < 0 or index > len(self):
+			raise IndexError('index out of bounds')
+		left, right = _split(self.getTree(), index)
+		return make(self.factory, left), make(self.factory, right)
+
+	def reverse(self):
+		elms = list(self)
+		elms.reverse()
+		return Vector(_build(elms))
+
+_head = term.Cons.head
+_tail = term.Cons.tail
+
+
+def make(factory, tree):
+	'''Make a vector term from a tree, or the empty list.'''
+	if _size(tree):
+		return Vector(tree)
+	else:
+		return factory.makeNil()
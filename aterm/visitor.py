@@ -1,6 +1,55 @@
 '''Term visiting.'''
 
 
+import inspect
+
+from aterm import types
+
+
+# visit methods for each term type, from the most to the least specific
+_chains = {
+	types.INT: ('visitInt', 'visitLit', 'visitTerm'),
+	types.REAL: ('visitReal', 'visitLit', 'visitTerm'),
+	types.STR: ('visitStr', 'visitLit', 'visitTerm'),
+	types.NIL: ('visitNil', 'visitList', 'visitTerm'),
+	types.CONS: ('visitCons', 'visitList', 'visitTerm'),
+	types.APPL: ('visitAppl', 'visitTerm'),
+}
+
+_names = frozenset([name for names in _chains.itervalues() for name in names])
+
+# visit method tables, per visitor class
+_tables = {}
+
+
+def _lookup(cls, name):
+	'''Look up a class attribute along the method resolution order, without
+	invoking descriptors.'''
+	for base in cls.__mro__:
+		try:
+			return base.__dict__[name]
+		except KeyError:
+			pass
+	return None
+
+
+def _resolve(cls):
+	'''Build the table of the visit methods of a visitor class, indexed by term
+	type. The default visit methods, which merely fall back to the less
+	specific ones, are skipped. Returns None if a visit method is not a plain
+	function.'''
+	table = {}
+	for type, names in _chains.iteritems():
+		for name in names:
+			func = _lookup(cls, name)
+			if not inspect.isfunction(func):
+				return None
+			if func is not Visitor.__dict__[name] or name == 'visitTerm':
+				break
+		table[type] = func
+	return table
+
+
 class Visitor(object):
 	'''Base class for term visitors.'''
 
@@ -9,7 +58,15 @@ class Visitor(object):
 
 	def visit(self, term, *args, **kargs):
 		'''Visit the given term.'''
-		return term.accept(self, *args, **kargs)
+		cls = self.__class__
+		try:
+			table = _tables[cls]
+		except KeyError:
+			table = _tables[cls] = _resolve(cls)
+		if table is None or not _names.isdisjoint(getattr(self, '__dict__', ())):
+			# visit methods overridden per instance, or not plain functions
+			return term.accept(self, *args, **kargs)
+		return table[term.type](self, term, *args, **kargs)
 
 	def visitTerm(self, term, *args, **kargs):
 		raise NotImplementedError
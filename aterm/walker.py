@@ -14,89 +14,74 @@ the same walker methods do not necessarily yield the same results.
 
 import inspect
 
+from aterm import types
 from aterm import visitor
 from aterm import convert
 
 
-class _Dispatcher(visitor.Visitor):
-	'''Visitor which dynamically resolves the walker method name corresponding 
-	to the term being dispatched.
-	'''
-	
-	def __init__(self, walker, prefix):
-		visitor.Visitor.__init__(self)
+# walker method suffixes tried for each term type, in order, together with the
+# function extracting the method arguments from the term
+_args = lambda term: tuple(term.args)
+_value = lambda term: (term.value,)
+_term = lambda term: (term,)
+_suffixes = {
+	types.INT: (('_Int', _value), ('_Lit', _value), ('_Term', _term)),
+	types.REAL: (('_Real', _value), ('_Lit', _value), ('_Term', _term)),
+	types.STR: (('_Str', _value), ('_Lit', _value), ('_Term', _term)),
+	types.NIL: (('_Nil', lambda term: ()), ('_List', _term), ('_Term', _term)),
+	types.CONS: (('_Cons', lambda term: (term.head, term.tail)), ('_List', _term), ('_Term', _term)),
+	types.APPL: (('_Appl', lambda term: (term.name, term.args)), ('_Term', _term)),
+}
+
+
+class _Dispatcher(object):
+	'''Dispatches terms to the walker methods, resolved from a table.'''
+
+	def __init__(self, walker, prefix, table):
 		self.walker = walker
 		self.prefix = prefix
+		# None when the walker methods are overridden per instance
+		self.table = table
 
 	def __call__(self, term, *args, **kargs):
-		method, targs = self.visit(term)
-		return method(*(targs + args), **kargs)
-
-	def getmethod(self, suffix):
-		return getattr(self.walker, self.prefix + suffix)
-		
-	def visitTerm(self, term):
-		try:
-			return self.getmethod('_Term'), (term,)
-		except AttributeError:
-			raise ValueError('%s.%s: cannot dispatch term: %r' % (
-					self.walker.__class__.__name__,
-					self.prefix,
-					term
-				)
+		type = term.type
+		if type == types.APPL:
+			key = term.name
+		else:
+			key = type
+		if self.table is not None:
+			handler = self.table.get(key)
+			if handler is not None:
+				func, targs = handler
+				return func(self.walker, *(targs(term) + args), **kargs)
+		return self.dispatch(term, key, args, kargs)
+
+	def dispatch(self, term, key, args, kargs):
+		'''Dispatch a term by looking up the walker method. Plain functions of
+		the walker class are stored in the table; anything else is looked up
+		in the walker on every call.'''
+		walker = self.walker
+		cls = walker.__class__
+		candidates = _suffixes[term.type]
+		if term.type == types.APPL and key:
+			candidates = ((key, _args),) + candidates
+		for suffix, targs in candidates:
+			name = self.prefix + suffix
+			if self.table is not None:
+				func = visitor._lookup(cls, name)
+				if inspect.isfunction(func):
+					self.table[key] = func, targs
+					return func(walker, *(targs(term) + args), **kargs)
+			method = getattr(walker, name, None)
+			if method is not None:
+				return method(*(targs(term) + args), **kargs)
+		raise ValueError('%s.%s: cannot dispatch term: %r' % (
+				cls.__name__,
+				self.prefix,
+				term
 			)
-	
-	def visitLit(self, term):
-		try:
-			return self.getmethod('_Lit'), (term.value,)
-		except AttributeError:
-			return self.visitTerm(term)
-	
-	def visitInt(self, term):
-		try:
-			return self.getmethod('_Int'), (term.value,)
-		except AttributeError:
-			return self.visitLit(term)
-			
-	def visitReal(self, term):
-		try:
-			return self.getmethod('_Real'), (term.value,)
-		except AttributeError:
-			return self.visitLit(term)
-	
-	def visitStr(self, term):
-		try:
-			return self.getmethod('_Str'), (term.value,)
-		except AttributeError:
-			return self.visitLit(term)
-	
-	def visitList(self, term):
-		try:
-			return self.getmethod('_List'), (term,)
-		except AttributeError:
-			return self.visitTerm(term)
-	
-	def visitNil(self, term):
-		try:
-			return self.getmethod('_Nil'), ()
-		except AttributeError:
-			return self.visitList(term)
-	
-	def visitCons(self, term):
-		try:
-			return self.getmethod('_Cons'), (term.head, term.tail)
-		except AttributeError:
-			return self.visitList(term)
-	
-	def visitAppl(self, term):
-		try:
-			return self.getmethod(term.name), tuple(term.args)
-		except AttributeError:
-			try:
-				return self.getmethod('_Appl'), (term.name, term.args)
-			except AttributeError:
-				return self.visitTerm(term)
-				
+		)
+
 
 class Dispatch(object):
 	'''Descriptor which dispatches a term to a method with a name starting 
@@ -113,14 +98,29 @@ class Dispatch(object):
 	 - "_List" for a generic list term
 	 - "_Appl" for a generic application term
 	 - "_Term" for a generic term
+
+	The methods are looked up in the walker class, once for every term type
+	and application name, and kept in a table, unless they are overridden
+	in the walker instance.
 	'''
 	
 	def __init__(self, prefix, doc = None):
 		self.prefix = prefix
 		self.__doc__ = doc
+		# method tables, per walker class
+		self.tables = {}
 		
 	def __get__(self, obj, objtype):
-		return _Dispatcher(obj, self.prefix)
+		if obj is None:
+			return self
+		prefix = self.prefix
+		for name in getattr(obj, '__dict__', ()):
+			if name.startswith(prefix):
+				return _Dispatcher(obj, prefix, None)
+		table = self.tables.get(objtype)
+		if table is None:
+			table = self.tables[objtype] = {}
+		return _Dispatcher(obj, prefix, table)
 	
 
 class Walker(object):
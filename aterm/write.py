@@ -1,10 +1,62 @@
 '''Term writing.'''
 
 
+import re
+
 from aterm import types
 from aterm import visitor
 
 
+def _real(value):
+	if float(int(value)) == value:
+		return '%0.1f' % value
+	else:
+		return '%g' % value
+
+
+_escapes = {
+	'"': '\\"',
+	'\t': '\\t',
+	'\r': '\\r',
+	'\n': '\\n',
+}
+_escape_re = re.compile('[' + ''.join(_escapes) + ']')
+_escape = lambda mo: _escapes[mo.group()]
+
+
+def _str(value):
+	s = str(value)
+	if _escape_re.search(s) is not None:
+		s = _escape_re.sub(_escape, s)
+	return '"' + s + '"'
+
+
+# digits of the abbreviations in the shared textual format
+ABBREV_DIGITS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/'
+
+
+class _Done(object):
+	'''Marks the completion of the writing of a term.'''
+
+	__slots__ = ['term']
+
+	type = None
+
+	def __init__(self, term):
+		self.term = term
+
+
+def _abbrev(index):
+	digits = []
+	while True:
+		index, digit = divmod(index, 64)
+		digits.append(ABBREV_DIGITS[digit])
+		if not index:
+			break
+	digits.reverse()
+	return '#' + ''.join(digits)
+
+
 class Writer(visitor.Visitor):
 	'''Base class for term writers.'''
 
@@ -29,19 +81,10 @@ class TextWriter(Writer):
 		self.fp.write(str(term.value))
 
 	def visitReal(self, term):
-		value = term.value
-		if float(int(value)) == value:
-			self.fp.write('%0.1f' % value)
-		else:
-			self.fp.write('%g' % value)
+		self.fp.write(_real(term.value))
 
 	def visitStr(self, term):
-		s = str(term.value)
-		s = s.replace('\"', '\\"')
-		s = s.replace('\t', '\\t')
-		s = s.replace('\r', '\\r')
-		s = s.replace('\n', '\\n')
-		self.fp.write('"' + s + '"')
+		self.fp.write(_str(term.value))
 
 	def visitList(self, term):
 		self.writeList(term, '[', ']')
@@ -55,6 +98,154 @@ class TextWriter(Writer):
 			self.writeList(term.annotations, '{', '}')
 
 
+def _push(stack, terms, end):
+	'''Push a sequence of terms, separated by commas, to be written.'''
+	stack.append(end)
+	sep = None
+	for term in reversed(terms):
+		if sep is not None:
+			stack.append(sep)
+		stack.append(term)
+		sep = ','
+
+
+# nesting depth from which terms are written with an explicit stack
+MAX_RECURSION_DEPTH = 256
+
+# number of output pieces buffered before writing
+_CHUNK = 4096
+
+
+def writeText(term, fp, shared = False):
+	'''Write a term to a text stream.
+
+	Produces the same output as L{TextWriter}, but the output is written in
+	large chunks, and subterms nested deeper than L{MAX_RECURSION_DEPTH} are
+	written with an explicit stack instead of recursion, so it is not limited
+	by the term depth nor by the list lengths.
+
+	If shared is true, the term is written in the shared textual format:
+	the output starts with a '!', and every subterm written with brackets
+	is numbered as its writing completes, so that any later occurrence of
+	the same subterm object is written as a '#' followed by its number in
+	base 64 (see L{ABBREV_DIGITS}). This keeps the output of terms with many
+	shared subterms small.
+	'''
+	if shared:
+		out = ['!']
+		_writeStack(term, out, fp, {})
+	else:
+		out = []
+		_write(term, out, fp, 0)
+	fp.write(''.join(out))
+
+
+def _write(term, out, fp, depth):
+	'''Recursively write a term into the output pieces.'''
+	type = term.type
+	if type == types.APPL:
+		if depth > MAX_RECURSION_DEPTH:
+			_writeStack(term, out, fp, None)
+			return
+		depth += 1
+		name = term.name
+		args = term.args
+		out.append(name)
+		if args:
+			sep = '('
+			for arg in args:
+				out.append(sep)
+				_write(arg, out, fp, depth)
+				sep = ','
+			out.append(')')
+		elif not name:
+			out.append('()')
+		annos = term.annotations
+		if annos:
+			sep = '{'
+			for anno in annos:
+				out.append(sep)
+				_write(anno, out, fp, depth)
+				sep = ','
+			out.append('}')
+	elif type == types.STR:
+		out.append(_str(term.value))
+	elif type == types.INT:
+		out.append(str(term.value))
+	elif type == types.CONS:
+		if depth > MAX_RECURSION_DEPTH:
+			_writeStack(term, out, fp, None)
+			return
+		depth += 1
+		sep = '['
+		for elm in term:
+			out.append(sep)
+			_write(elm, out, fp, depth)
+			sep = ','
+			if len(out) > _CHUNK:
+				fp.write(''.join(out))
+				del out[:]
+		out.append(']')
+	elif type == types.NIL:
+		out.append('[]')
+	else:
+		out.append(_real(term.value))
+
+
+def _writeStack(term, out, fp, abbrevs):
+	'''Write a term into the output pieces with an explicit stack. The
+	abbreviations of the terms written so far are given for the shared
+	textual format, or None otherwise.'''
+	shared = abbrevs is not None
+	stack = [term]
+	pop = stack.pop
+	push = stack.append
+	while stack:
+		term = pop()
+		if isinstance(term, str):
+			out.append(term)
+			continue
+		type = term.type
+		if type == types.INT:
+			out.append(str(term.value))
+		elif type == types.REAL:
+			out.append(_real(term.value))
+		elif type == types.STR:
+			out.append(_str(term.value))
+		elif type == types.NIL:
+			out.append('[]')
+		elif type == types.CONS:
+			if shared:
+				if id(term) in abbrevs:
+					out.append(abbrevs[id(term)])
+					continue
+				push(_Done(term))
+			out.append('[')
+			_push(stack, list(term), ']')
+		elif type == types.APPL:
+			brackets = term.name == '' or term.args
+			if shared and (brackets or term.annotations):
+				if id(term) in abbrevs:
+					out.append(abbrevs[id(term)])
+					continue
+				push(_Done(term))
+			out.append(term.name)
+			if term.annotations:
+				_push(stack, list(term.annotations), '}')
+				push('{')
+			if brackets:
+				_push(stack, term.args, ')')
+				push('(')
+		else:
+			assert isinstance(term, _Done)
+			abbrevs[id(term.term)] = _abbrev(len(abbrevs))
+			continue
+
+		if len(out) > _CHUNK:
+			fp.write(''.join(out))
+			del out[:]
+
+
 # TODO: implement a pretty-printer
 
 
@@ -1,10 +1,17 @@
 #!/usr/bin/env python
 
 
+import sys
+
 from ui.mainapp import MainApp
 
 
 if __name__ == '__main__':
+	if '--metrics' in sys.argv:
+		# report the term layer metrics of every stage
+		sys.argv.remove('--metrics')
+		import aterm.factory
+		aterm.factory.factory.setMetrics(True)
 	app = MainApp()
 	app.main()
 
@@ -15,27 +15,34 @@ from transf import util
 import ir
 
 asd = aterm.asd.parse(open(os.path.join(ir.__path__[0], 'ir.asdl'), 'rt').read())
+validator = asd.compile()
+
+
+def setSampling(period):
+	'''Only check one in every given number of terms, e.g., to keep the
+	checking cost low in production runs.'''
+	validator.setSampling(period)
 
 
 class _Check(transformation.Transformation):
 
-	def __init__(self, asd, production):
+	def __init__(self, validator, production):
 		transformation.Transformation.__init__(self)
-		self.asd = asd
+		self.validator = validator
 		self.production = production
 
 	def apply(self, trm, ctx):
 		try:
-			self.asd.validate(self.production, trm)
+			self.validator.validate(self.production, trm)
 		except aterm.asd.MismatchException, ex:
 			raise exception.Fatal(str(ex))
 		else:
 			return trm
 
-type = _Check(asd, "type")
-expr = _Check(asd, "expr")
-stmt = _Check(asd, "stmt")
-module = _Check(asd, "module")
+type = _Check(validator, "type")
+expr = _Check(validator, "expr")
+stmt = _Check(validator, "stmt")
+module = _Check(validator, "module")
 
 
 if __name__ == '__main__':
@@ -45,7 +52,7 @@ if __name__ == '__main__':
 	factory = aterm.factory.factory
 
 	for arg in sys.argv[1:]:
-		term = factory.readFromTextFile(file(arg, 'rt'))
+		term = factory.readFromFile(file(arg, 'rb'))
 		sys.stderr.write('Checking %s ...\n' % arg)
 		try:
 			module(term)
@@ -11,13 +11,14 @@ parse.Transfs(r'''
 # Path annotation
 
 # Only annotate term applications
-annotate = path.Annotate(
+annotatable =
 	match.ApplNames(`
 		ir.match.stmtNames +
 		ir.match.exprNames +
 		ir.match.typeNames
 	`)
-)
+
+annotate = path.Annotate(annotatable)
 
 deannotate = path.deannotate
 
@@ -27,10 +28,16 @@ deannotate = path.deannotate
 
 shared selection
 
+# Only the terms which contain or are contained in the selection are
+# annotated, so that the selection context below is resolved without
+# annotating the whole term
+annotateSelection = path.AnnotateSelection(annotatable, !selection)
+
 Applicable(t) =
 	with selection in
 		?[root, selection] ;
 		!root ;
+		annotateSelection ;
 		t
 	end
 
@@ -38,7 +45,7 @@ Input(t) =
 	with selection in
 		?[root, selection] ;
 		!root ;
-		# annotate ;
+		annotateSelection ;
 		t ;
 		![selection, *<id>]
 	end
@@ -47,14 +54,14 @@ Input2(t) =
 	with selection in
 		?[root, selection] ;
 		!root ;
-		# annotate ;
+		annotateSelection ;
 		t
 	end
 
 Apply(t) =
 	with selection in
 		?[root, [selection, *args]] ;
-		![root, args] ;
+		![<annotateSelection root>, args] ;
 		t ;
 		deannotate
 	end
@@ -15,7 +15,8 @@ class Temp(transformation.Transformation):
 	def apply(self, trm, ctx):
 		self.tmp_no += 1
 		name = "tmp%d" % self.tmp_no
-		return trm.factory.make("Sym(_){Tmp}", name)
+		# the builder is compiled, and cached, by the factory of the term
+		return trm.factory.compileMake("Sym(_){Tmp}").make(name)
 
 temp =  Temp()
 
@@ -25,7 +25,7 @@ class OpcodeDispatch(transformation.Transformation):
 	transformation."""
 
 	def apply(self, trm, ctx):
-		if not trm.rmatch('Asm(_, [*])'):
+		if not trm.factory.compileMatch('Asm(_, [*])').match(trm):
 			raise exception.Failure
 
 		opcode, operands = trm.args
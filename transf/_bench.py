@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+'''Benchmarks.
+
+Usage: python -m transf._bench [FILE]...
+
+Times the native traversals against their recursive, proxy-based
+counterparts, on the terms read from the given files (e.g., the translations
+in the examples directory), or on a synthetic module when no file is given.
+'''
+
+
+import sys
+import time
+
+from aterm.factory import factory
+from aterm import types
+from aterm import _bench
+from transf import util
+from transf.lib import base
+from transf.lib import combine
+from transf.lib import traverse
+
+
+def _isSym(trm):
+	return types.isAppl(trm) and trm.name == 'Sym'
+
+
+def _isLit(trm):
+	return types.isAppl(trm) and trm.name == 'Lit'
+
+
+def _isNone(trm):
+	return False
+
+
+def _halve(trm):
+	'''Lit(type,n) -> Lit(type,n/2), for even n, and Binary(_,x,Lit(_,0)) -> x.'''
+	if types.isAppl(trm):
+		if trm.name == 'Lit':
+			type, value = trm.args
+			if value.value and not value.value % 2:
+				return factory.makeAppl('Lit', (type, factory.makeInt(value.value // 2)), trm.annotations)
+		elif trm.name == 'Binary':
+			op, lhs, rhs = trm.args
+			if types.isAppl(rhs) and rhs.name == 'Lit' and rhs.args[1].value == 0:
+				return lhs
+	return None
+
+
+# (name, native traversal, proxy-based traversal)
+_cases = [
+	('TopDown(id)', traverse.TopDown(base.ident), traverse._ProxyDownUp(down = base.ident)),
+	('BottomUp(id)', traverse.BottomUp(base.ident), traverse._ProxyDownUp(up = base.ident)),
+	('AllTD(?Sym)', traverse.AllTD(util.BoolAdaptor(_isSym)), traverse._ProxyAllTD(util.BoolAdaptor(_isSym))),
+	('AllBU(?Lit)', traverse.AllBU(util.BoolAdaptor(_isLit)), traverse._ProxyAllBU(util.BoolAdaptor(_isLit))),
+	('OnceTD(fail)', combine.Try(traverse.OnceTD(util.BoolAdaptor(_isNone))), combine.Try(traverse._ProxyOnceTD(util.BoolAdaptor(_isNone)))),
+	('SomeBU(?Lit)', traverse.SomeBU(util.BoolAdaptor(_isLit)), traverse._ProxySomeBU(util.BoolAdaptor(_isLit))),
+	('InnerMost(halve)', traverse.InnerMost(util.Adaptor(_halve)), traverse._ProxyInnerMost(util.Adaptor(_halve))),
+]
+
+
+def timeit(trf, trm, repeat = 3):
+	'''Get the best time of applying a transformation to a term.'''
+	best = None
+	for i in range(repeat):
+		start = time.time()
+		trf.apply(trm, None)
+		elapsed = time.time() - start
+		if best is None or elapsed < best:
+			best = elapsed
+	return best
+
+
+def main():
+	names = sys.argv[1:]
+	if names:
+		inputs = [(name, factory.readFromFile(open(name, 'rb'))) for name in names]
+	else:
+		inputs = [('<synthetic>', factory.parse(_bench._synthetic()))]
+	for name, term in inputs:
+		for case, native, proxy in _cases:
+			nativeTime = timeit(native, term)
+			try:
+				proxyTime = timeit(proxy, term)
+			except RuntimeError:
+				# the recursion is too deep
+				sys.stdout.write('%s: %s: native %.3fs, proxy exceeds the recursion limit\n' % (name, case, nativeTime))
+			else:
+				sys.stdout.write('%s: %s: native %.3fs, proxy %.3fs, %.1fx\n' % (name, case, nativeTime, proxyTime, proxyTime/nativeTime))
+
+
+if __name__ == '__main__':
+	main()
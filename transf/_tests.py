@@ -8,8 +8,12 @@ import antlr
 
 import aterm.factory
 
+from transf import exception
+from transf import context
 from transf import transformation
+from transf import util
 from transf import parse
+from transf import specialize
 from transf.lib import *
 from transf.lib.base import ident, fail
 
@@ -170,6 +174,101 @@ class TestCombine(TestMixin, unittest.TestCase):
 		self._testCombination(lambda x, y, z: Transf("if x then y else z end"), 3, func)
 
 
+class TestTryApply(TestMixin, unittest.TestCase):
+
+	def testTryApply(self):
+		transfs = [
+			ident,
+			fail,
+			match.Int(1),
+			match.List([match.Int(1), ident]),
+			match.Appl("C", [match.Int(1)]),
+			combine.Not(match.Int(1)),
+			combine.Try(match.nil),
+			combine.Where(match.Appl("C", [ident])),
+			combine.Choice(match.Int(1), match.Int(2)),
+			combine.GuardedChoice(match.Int(1), fail, ident),
+			combine.IfElse(match.nil, fail, build.Int(3)),
+			congruent.Appl("C", [Rule('1 -> 2')]),
+			match.aList * lists.Map(Rule('1 -> 2')),
+			match.aList * lists.Filter(match.Int(1)),
+			match.aList * lists.Fetch(match.Int(2)),
+			traverse.AllTD(Rule('1 -> 2')),
+			traverse.OnceTD(Rule('2 -> 3')),
+			traverse.InnerMost(Rule('C(x) -> x')),
+		]
+		ctx = context.Context()
+		for transf in transfs:
+			for termStr in self.termInputs:
+				term = self.factory.parse(termStr)
+				result = transf.tryApply(term, ctx)
+				try:
+					expectedResult = transf.apply(term, ctx)
+				except exception.Failure:
+					self.failUnless(result is None, msg = "%r: %s -> %s (!= None)" % (transf, term, result))
+				else:
+					self.failUnless(expectedResult.isEqual(result), msg = "%r: %s -> %s (!= %s)" % (transf, term, result, expectedResult))
+
+	def testApply(self):
+		class Even(transformation.Transformation):
+			def tryApply(self, trm, ctx):
+				if trm.value % 2:
+					return None
+				return trm
+		self._testTransf(Even(), [('0', '0'), ('1', 'FAILURE')])
+		self._testTransf(combine.Choice(Even(), build.Int(4)), [('2', '2'), ('3', '4')])
+
+	def testAbstract(self):
+		trm = self.factory.parse('1')
+		ctx = context.Context()
+		self.failUnlessRaises(NotImplementedError, transformation.Transformation().apply, trm, ctx)
+		self.failUnlessRaises(NotImplementedError, transformation.Transformation().tryApply, trm, ctx)
+
+		# resolved per class, including for the classes derived from them
+		class Abstract(transformation.Transformation):
+			pass
+		class Concrete(Abstract):
+			def apply(self, trm, ctx):
+				raise exception.Failure
+		class Derived(Concrete):
+			pass
+		self.failUnlessRaises(NotImplementedError, Abstract().tryApply, trm, ctx)
+		self.failUnless(Concrete().tryApply(trm, ctx) is None)
+		self.failUnless(Derived().tryApply(trm, ctx) is None)
+
+
+class TestDispatch(TestMixin, unittest.TestCase):
+
+	def testIndexedChoice(self):
+		operands = [
+			Rule('C(x) -> X(x)'),
+			Rule('C -> Y'),
+			Rule('1 -> One'),
+			Transf('?D ; !Z'),
+			Rule('[x] -> x'),
+			Rule('C(x,y) -> Y(x,y)'),
+			Rule('x -> x'),
+			Rule('D(x) -> D'),
+			Rule('[] -> Nil'),
+		]
+		for n in range(len(operands) + 1):
+			choice = combine.UndeterministicChoice(operands[:n])
+			indexed = dispatch.IndexedChoice(operands[:n])
+			testCases = []
+			for termStr in self.termInputs + ['C(1,2)', 'C(1,2,3)', 'D(1)', 'D(1,2)']:
+				try:
+					expectedResult = choice(termStr)
+				except exception.Failure:
+					expectedResult = 'FAILURE'
+				testCases.append((termStr, str(expectedResult)))
+			self._testTransf(indexed, testCases)
+
+	def testParse(self):
+		choice = Transf('C -> X | D(_) -> Y | 1 -> Z', specialize=True)
+		self.failUnless(isinstance(choice.subject.original, dispatch._IndexedChoice))
+		self._testTransf(choice, [('C', 'X'), ('D(1)', 'Y'), ('D', 'FAILURE'), ('1', 'Z'), ('2', 'FAILURE')])
+
+
 class TestMatch(TestMixin, unittest.TestCase):
 
 	def _testMatchTransf(self, transf, *matchStrs):
@@ -225,7 +324,7 @@ class TestTraverse(TestMixin, unittest.TestCase):
 				'A()',
 			],
 			'A(B,C)': [
-				'A(B,C))',
+				'A(B,C)',
 				'FAILURE',
 				'A(X(B),X(C))',
 			],
@@ -249,10 +348,10 @@ class TestTraverse(TestMixin, unittest.TestCase):
 			'A()': ['FAILURE', 'FAILURE', 'FAILURE'],
 			'X()': ['FAILURE', 'FAILURE', 'FAILURE'],
 			'A(X)': ['A(X)', 'FAILURE', 'A(Y)'],
-			'A(B,C)': ['A(B,C))', 'FAILURE', 'FAILURE'],
-			'A(X,B)': ['A(X,B))', 'FAILURE', 'A(Y,B)'],
-			'A(B,X)': ['A(B,X))', 'FAILURE', 'A(B,Y)'],
-			'A(X,X)': ['A(X,X))', 'FAILURE', 'A(Y,X)'],
+			'A(B,C)': ['A(B,C)', 'FAILURE', 'FAILURE'],
+			'A(X,B)': ['A(X,B)', 'FAILURE', 'A(Y,B)'],
+			'A(B,X)': ['A(B,X)', 'FAILURE', 'A(B,Y)'],
+			'A(X,X)': ['A(X,X)', 'FAILURE', 'A(Y,X)'],
 		}
 	)
 
@@ -268,10 +367,10 @@ class TestTraverse(TestMixin, unittest.TestCase):
 			'A()': ['FAILURE', 'FAILURE', 'FAILURE'],
 			'X()': ['FAILURE', 'FAILURE', 'FAILURE'],
 			'A(X)': ['A(X)', 'FAILURE', 'A(Y)'],
-			'A(B,C)': ['A(B,C))', 'FAILURE', 'FAILURE'],
-			'A(X,B)': ['A(X,B))', 'FAILURE', 'A(Y,B)'],
-			'A(B,X)': ['A(B,X))', 'FAILURE', 'A(B,Y)'],
-			'A(X,X)': ['A(X,X))', 'FAILURE', 'A(Y,Y)'],
+			'A(B,C)': ['A(B,C)', 'FAILURE', 'FAILURE'],
+			'A(X,B)': ['A(X,B)', 'FAILURE', 'A(Y,B)'],
+			'A(B,X)': ['A(B,X)', 'FAILURE', 'A(B,Y)'],
+			'A(X,X)': ['A(X,X)', 'FAILURE', 'A(Y,Y)'],
 		}
 	)
 
@@ -316,7 +415,77 @@ class TestTraverse(TestMixin, unittest.TestCase):
 	def testTopdown(self):
 		self._testMetaTransf(traverse.TopDown, self.topDownTestCases)
 
-	# TODO: testInnerMost
+	innerMostTestCases = (
+		[Rule('X(x) -> x'), Rule('A(x,y) -> B(y,x)')],
+		{
+			'1': ['1', '1'],
+			'A(X(1),X(X(2)))': ['A(1,2)', 'B(X(X(2)),X(1))'],
+			'[X(A(X,C)),X(X)]': ['[A(X,C),X]', '[X(B(C,X)),X(X)]'],
+			'A(B(A(1,2)),3)': ['A(B(A(1,2)),3)', 'B(3,B(B(2,1)))'],
+		}
+	)
+
+	def testInnerMost(self):
+		self._testMetaTransf(traverse.InnerMost, self.innerMostTestCases)
+		self._testMetaTransf(traverse._ProxyInnerMost, self.innerMostTestCases)
+
+	proxyTestCases = (
+		(traverse.All, traverse._ProxyAll),
+		(traverse.One, traverse._ProxyOne),
+		(traverse.Some, traverse._ProxySome),
+		(traverse.TopDown, lambda operand: traverse._ProxyDownUp(down = operand)),
+		(traverse.BottomUp, lambda operand: traverse._ProxyDownUp(up = operand)),
+		(traverse.AllTD, traverse._ProxyAllTD),
+		(traverse.AllBU, traverse._ProxyAllBU),
+		(traverse.OnceTD, traverse._ProxyOnceTD),
+		(traverse.OnceBU, traverse._ProxyOnceBU),
+		(traverse.SomeTD, traverse._ProxySomeTD),
+		(traverse.SomeBU, traverse._ProxySomeBU),
+	)
+
+	proxyOperands = [
+		ident,
+		fail,
+		Rule('X -> Y'),
+		Rule('X(x) -> x'),
+		Rule('[x,*y] -> y'),
+	]
+
+	proxyTerms = [
+		'1',
+		'"s"',
+		'[]',
+		'A()',
+		'X(1){Z}',
+		'[X,[X(2)],A]',
+		'A(X(B(X,X{Z})),[X(C),D],X(X(E)))',
+	]
+
+	def testProxy(self):
+		for Native, Proxy in self.proxyTestCases:
+			for operand in self.proxyOperands:
+				for termStr in self.proxyTerms:
+					term = self.factory.parse(termStr)
+					expected = self._apply(Proxy(operand), term)
+					result = self._apply(Native(operand), term)
+					self.failUnlessEqual(result, expected, msg = '%r != %r (%s on %s)' % (result, expected, Native.__name__, termStr))
+					if result is not None:
+						self.failUnless(result.isEquivalent(expected))
+
+	def _apply(self, trf, term):
+		try:
+			return trf.apply(term, None)
+		except exception.Failure:
+			return None
+
+	def testDeep(self):
+		term = self.factory.parse('0')
+		for i in range(10000):
+			term = self.factory.makeAppl('X', (term,))
+		self.failUnless(traverse.TopDown(ident)(term) is term)
+		self.failUnlessEqual(traverse.BottomUp(combine.Try(Rule('X(x) -> x')))(term), self.factory.parse('0'))
+		term = self.factory.makeList([self.factory.parse('X')]*10000)
+		self.failUnlessEqual(traverse.OnceBU(Rule('X -> Y'))(term).head, self.factory.parse('Y'))
 
 
 class TestProject(TestMixin, unittest.TestCase):
@@ -406,6 +575,17 @@ class TestAnno(TestMixin, unittest.TestCase):
 	def testGet(self):
 		self._testAnnoTransf(annotation.Get, self.getTestCases)
 
+	getNameTestCases = (
+		('X{A(1)}', 'A', 'A(1)'),
+		('X{B(1),A(2)}', 'A', 'A(2)'),
+		('X{B(1)}', 'A', 'FAILURE'),
+		('1', 'A', 'FAILURE'),
+	)
+
+	def testGetName(self):
+		for termStr, label, expectedResultStr in self.getNameTestCases:
+			self._testTransf(annotation.Get(label), [(termStr, expectedResultStr)])
+
 	hasTestCases = (
 		('X{A(1)}', '?A', 'X{A(1)}'),
 		('X{A(1),B(2)}', '?A', 'X{A(1),B(2)}'),
@@ -782,6 +962,85 @@ class TestLists(TestMixin, unittest.TestCase):
 		)
 
 
+class TestSpecialize(TestMixin, unittest.TestCase):
+
+	specializeInputs = [
+		'C(1,2)',
+		'C(C(1),2)',
+		'C(1,D)',
+		'D(C(1),[C(2),1])',
+	]
+
+	def _testSpecialize(self, transf):
+		specialized = specialize.Specialize(transf)
+		testCases = []
+		for termStr in self.termInputs + self.specializeInputs:
+			try:
+				expectedResult = transf(termStr)
+			except exception.Failure:
+				expectedResult = 'FAILURE'
+			testCases.append((termStr, str(expectedResult)))
+		self._testTransf(specialized, testCases)
+
+	def testCombine(self):
+		operands = [fail, ident, Rule('C(_) -> X')]
+		for x in operands:
+			self._testSpecialize(combine._Not(x))
+			self._testSpecialize(combine._Try(x))
+			self._testSpecialize(combine._Where(x))
+			for y in operands:
+				self._testSpecialize(combine._Composition(x, y))
+				self._testSpecialize(combine._Choice(x, y))
+				self._testSpecialize(combine._If(x, y))
+				for z in operands:
+					self._testSpecialize(combine._GuardedChoice(x, y, z))
+					self._testSpecialize(combine._IfElse(x, y, z))
+					self._testSpecialize(combine._IfElifElse([(x, y), (z, build.Int(3))], y))
+
+	def testTerms(self):
+		self._testSpecialize(match.Int(1))
+		self._testSpecialize(match.Str("a"))
+		self._testSpecialize(match.nil)
+		self._testSpecialize(match.List([match.Int(1), match.Int(2)]))
+		self._testSpecialize(match.Appl("C", [match.Int(1), ident]))
+		self._testSpecialize(build.Appl("C", [build.Int(1), ident]))
+		self._testSpecialize(build.List([build.Int(1), ident]))
+		self._testSpecialize(congruent.Appl("C", [build.Int(1), ident]))
+		self._testSpecialize(congruent.Cons(build.Int(1), ident))
+
+	def testRules(self):
+		self._testSpecialize(Rule('C(x,y) -> D(y,x)'))
+		self._testSpecialize(Rule('C(x,x) -> x'))
+		self._testSpecialize(Transf('{x: ?C(x,_) ; !x} + ?[_,*_] + !Y'))
+		self._testSpecialize(Transf('if ?C(_) then !X else !Y end'))
+		self._testSpecialize(Transf('traverse.AllTD(C(x,y) -> D(y,x))'))
+
+	def testNesting(self):
+		# deeper than the statically nested blocks Python allows
+		for Wrap in (combine._Try, combine._Not, lambda operand: combine._Choice(operand, match.Int(1))):
+			transf = Rule('C(_) -> X')
+			for i in range(40):
+				transf = Wrap(transf)
+			self.failUnless(isinstance(specialize.Specialize(transf), specialize.Specialized))
+			self._testSpecialize(transf)
+
+	def testRecursion(self):
+		rec = util.Proxy()
+		rec.subject = Transf('~C(<rec>) + ?1 ; !2')
+		self._testSpecialize(rec)
+		specialize.specializeProxies([rec])
+		self.failUnless(isinstance(rec.subject, specialize.Specialized))
+		self._testTransf(rec, [('C(C(1))', 'C(C(2))'), ('C(C(0))', 'FAILURE')])
+
+	def testParse(self):
+		parse.Transfs('''
+			length = ?[] ; !0 + ?[_,*t] ; !t ; length ; arith.Inc(id)
+			lengths = traverse.AllTD(length)
+		''', specialize=True)
+		self.failUnless(isinstance(length.subject, specialize.Specialized))
+		self._testTransf(lengths, [('[1,2,3]', '3'), ('C([1],[])', 'C(1,0)')])
+
+
 if __name__ == '__main__':
 	unittest.main()
 
@@ -18,6 +18,12 @@ class Failure(Base):
 	pass
 
 
+# whether the failures raised on behalf of transformations which signal
+# them by returning None should describe the transformation and the term;
+# most failures are caught, so this is only useful when debugging
+DEBUG = False
+
+
 class Fatal(Base):
 	'''Unrecoverable error during transformation.'''
 	
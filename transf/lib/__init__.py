@@ -9,6 +9,7 @@ from transf.lib import project
 from transf.lib import match
 from transf.lib import build
 from transf.lib import congruent
+from transf.lib import dispatch
 
 from transf.lib import lists
 from transf.lib import traverse
@@ -1,8 +1,11 @@
 '''High-level annotation transformations.'''
 
 
+import aterm.types
 import aterm.annotation
 
+from transf import exception
+from transf import transformation
 from transf import operate
 from transf.lib import combine
 from transf.lib import congruent
@@ -17,7 +20,26 @@ class Set(operate.Unary):
 		return aterm.annotation.set(trm, anno)
 
 
+class _GetName(transformation.Transformation):
+
+	def __init__(self, name):
+		transformation.Transformation.__init__(self)
+		self.name = name
+
+	def apply(self, trm, ctx):
+		if not aterm.types.isAppl(trm):
+			raise exception.Failure('not an application term', trm)
+		try:
+			return aterm.annotation.get(trm, self.name)
+		except ValueError:
+			raise exception.Failure('undefined annotation', self.name)
+
+
 def Get(label):
+	'''Get the first annotation matching the label transformation. If the
+	label is a string, the annotation with that name is looked up directly.'''
+	if isinstance(label, basestring):
+		return _GetName(label)
 	return combine.Composition(project.annos, lists.Fetch(label))
 
 
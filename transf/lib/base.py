@@ -11,6 +11,8 @@ class Ident(transformation.Transformation):
 	def apply(self, trm, ctx):
 		return trm
 
+	tryApply = apply
+
 id = ident = Ident()
 
 
@@ -20,5 +22,8 @@ class Fail(transformation.Transformation):
 	def apply(self, trm, ctx):
 		raise exception.Failure
 
+	def tryApply(self, trm, ctx):
+		return None
+
 fail = Fail()
 
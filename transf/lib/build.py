@@ -31,6 +31,8 @@ class _Term(_common._Term):
 	def apply(self, term, ctx):
 		return self.term
 
+	tryApply = apply
+
 def Term(term):
 	return _common.Term(term, _Term)
 
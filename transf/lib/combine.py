@@ -11,13 +11,10 @@ class _Not(operate.Unary):
 
 	__slots__ = []
 
-	def apply(self, term, ctx):
-		try:
-			self.operand.apply(term, ctx)
-		except exception.Failure:
+	def tryApply(self, term, ctx):
+		if self.operand.tryApply(term, ctx) is None:
 			return term
-		else:
-			raise exception.Failure
+		return None
 
 def Not(operand):
 	'''Fail if a transformation applies.'''
@@ -34,11 +31,13 @@ class _Try(operate.Unary):
 
 	__slots__ = []
 
-	def apply(self, term, ctx):
-		try:
-			return self.operand.apply(term, ctx)
-		except exception.Failure:
+	def tryApply(self, term, ctx):
+		result = self.operand.tryApply(term, ctx)
+		if result is None:
 			return term
+		return result
+
+	apply = tryApply
 
 def Try(operand):
 	'''Attempt a transformation, otherwise return the term unmodified.'''
@@ -53,8 +52,9 @@ class _Where(operate.Unary):
 
 	__slots__ = []
 
-	def apply(self, term, ctx):
-		self.operand.apply(term, ctx)
+	def tryApply(self, term, ctx):
+		if self.operand.tryApply(term, ctx) is None:
+			return None
 		return term
 
 def Where(operand):
@@ -74,9 +74,11 @@ class _Composition(operate.Binary):
 
 	__slots__ = []
 
-	def apply(self, term, ctx):
-		term = self.loperand.apply(term, ctx)
-		return self.roperand.apply(term, ctx)
+	def tryApply(self, term, ctx):
+		term = self.loperand.tryApply(term, ctx)
+		if term is None:
+			return None
+		return self.roperand.tryApply(term, ctx)
 
 def Composition(loperand, roperand):
 	'''Transformation composition.'''
@@ -98,11 +100,11 @@ class _Choice(operate.Binary):
 
 	__slots__ = []
 
-	def apply(self, term, ctx):
-		try:
-			return self.loperand.apply(term, ctx)
-		except exception.Failure:
-			return self.roperand.apply(term, ctx)
+	def tryApply(self, term, ctx):
+		result = self.loperand.tryApply(term, ctx)
+		if result is None:
+			return self.roperand.tryApply(term, ctx)
+		return result
 
 def Choice(loperand, roperand):
 	'''Attempt the first transformation, transforming the second on failure.'''
@@ -126,13 +128,11 @@ class _GuardedChoice(operate.Ternary):
 
 	__slots__ = []
 
-	def apply(self, term, ctx):
-		try:
-			term = self.operand1.apply(term, ctx)
-		except exception.Failure:
-			return self.operand3.apply(term, ctx)
-		else:
-			return self.operand2.apply(term, ctx)
+	def tryApply(self, term, ctx):
+		result = self.operand1.tryApply(term, ctx)
+		if result is None:
+			return self.operand3.tryApply(term, ctx)
+		return self.operand2.tryApply(result, ctx)
 
 def GuardedChoice(operand1, operand2, operand3):
 	'''If operand1 succeeds then operand2 is applied, otherwise operand3 is
@@ -163,13 +163,10 @@ class _If(operate.Binary):
 
 	__slots__ = []
 
-	def apply(self, term, ctx):
-		try:
-			self.loperand.apply(term, ctx)
-		except exception.Failure:
+	def tryApply(self, term, ctx):
+		if self.loperand.tryApply(term, ctx) is None:
 			return term
-		else:
-			return self.roperand.apply(term, ctx)
+		return self.roperand.tryApply(term, ctx)
 
 def If(loperand, roperand):
 	'''If the first transformation succeeds, then applies the second
@@ -190,13 +187,10 @@ class _IfElse(operate.Ternary):
 
 	__slots__ = []
 
-	def apply(self, term, ctx):
-		try:
-			self.operand1.apply(term, ctx)
-		except exception.Failure:
-			return self.operand3.apply(term, ctx)
-		else:
-			return self.operand2.apply(term, ctx)
+	def tryApply(self, term, ctx):
+		if self.operand1.tryApply(term, ctx) is None:
+			return self.operand3.tryApply(term, ctx)
+		return self.operand2.tryApply(term, ctx)
 
 def IfElse(operand1, operand2, operand3):
 	'''If the first transformation succeeds, then apply the second
@@ -220,15 +214,11 @@ class _IfElifElse(transformation.Transformation):
 		self.clauses = clauses
 		self.otherwise = otherwise
 
-	def apply(self, term, ctx):
+	def tryApply(self, term, ctx):
 		for if_cond, if_then in self.clauses:
-			try:
-				if_cond.apply(term, ctx)
-			except exception.Failure:
-				pass
-			else:
-				return if_then.apply(term, ctx)
-		return self.otherwise.apply(term, ctx)
+			if if_cond.tryApply(term, ctx) is not None:
+				return if_then.tryApply(term, ctx)
+		return self.otherwise.tryApply(term, ctx)
 
 def IfElifElse(clauses, otherwise = None):
 	'''Nested if-then-else combinator.
@@ -258,14 +248,16 @@ class _Switch(transformation.Transformation):
 		self.cases = cases
 		self.otherwise = otherwise
 
-	def apply(self, term, ctx):
-		switch_term = self.expr.apply(term, ctx)
+	def tryApply(self, term, ctx):
+		switch_term = self.expr.tryApply(term, ctx)
+		if switch_term is None:
+			return None
 		try:
 			action = self.cases[switch_term]
 		except KeyError:
-			return self.otherwise.apply(term, ctx)
+			return self.otherwise.tryApply(term, ctx)
 		else:
-			return action.apply(term, ctx)
+			return action.tryApply(term, ctx)
 
 def Switch(expr, cases, otherwise = None):
 	'''Switch combination.
@@ -15,15 +15,19 @@ from transf.lib import match
 
 class _ConsL(_common._Cons):
 
-	def apply(self, term, ctx):
+	def tryApply(self, term, ctx):
 		try:
 			old_head = term.head
 			old_tail = term.tail
 		except AttributeError:
-			raise exception.Failure('not a list cons term', term)
+			return None
 
-		new_head = self.head.apply(old_head, ctx)
-		new_tail = self.tail.apply(old_tail, ctx)
+		new_head = self.head.tryApply(old_head, ctx)
+		if new_head is None:
+			return None
+		new_tail = self.tail.tryApply(old_tail, ctx)
+		if new_tail is None:
+			return None
 
 		if new_head is not old_head or new_tail is not old_tail:
 			return term.factory.makeCons(new_head, new_tail)
@@ -36,15 +40,19 @@ def ConsL(head, tail):
 
 class _ConsR(_common._Cons):
 
-	def apply(self, term, ctx):
+	def tryApply(self, term, ctx):
 		try:
 			old_head = term.head
 			old_tail = term.tail
 		except AttributeError:
-			raise exception.Failure('not a list cons term', term)
+			return None
 
-		new_tail = self.tail.apply(old_tail, ctx)
-		new_head = self.head.apply(old_head, ctx)
+		new_tail = self.tail.tryApply(old_tail, ctx)
+		if new_tail is None:
+			return None
+		new_head = self.head.tryApply(old_head, ctx)
+		if new_head is None:
+			return None
 
 		if new_head is not old_head or new_tail is not old_tail:
 			return term.factory.makeCons(new_head, new_tail)
@@ -65,23 +73,25 @@ def List(elms, tail = None):
 class Appl(_common.Appl):
 	'''Traverse a term application.'''
 
-	def apply(self, term, ctx):
+	def tryApply(self, term, ctx):
 		try:
 			name = term.name
 			old_args = term.args
 		except AttributeError:
-			raise exception.Failure('not an application term', term)
+			return None
 
 		if name != self.name:
-			raise exception.Failure
+			return None
 
 		if len(self.args) != len(old_args):
-			raise exception.Failure
+			return None
 
 		new_args = []
 		modified = False
 		for self_arg, old_arg in zip(self.args, old_args):
-			new_arg = self_arg.apply(old_arg, ctx)
+			new_arg = self_arg.tryApply(old_arg, ctx)
+			if new_arg is None:
+				return None
 			new_args.append(new_arg)
 			modified = modified or new_arg is not old_arg
 
@@ -97,18 +107,22 @@ class Appl(_common.Appl):
 class ApplCons(_common.ApplCons):
 	'''Traverse a term application.'''
 
-	def apply(self, term, ctx):
+	def tryApply(self, term, ctx):
 		try:
 			old_name = term.name
 			old_args = term.args
 		except AttributeError:
-			raise exception.Failure('not an application term', term)
+			return None
 
 		factory = term.factory
 		old_name = factory.makeStr(old_name)
 		old_args = factory.makeList(old_args)
-		new_name = self.name.apply(old_name, ctx)
-		new_args = self.args.apply(old_args, ctx)
+		new_name = self.name.tryApply(old_name, ctx)
+		if new_name is None:
+			return None
+		new_args = self.args.tryApply(old_args, ctx)
+		if new_args is None:
+			return None
 
 		if new_name is not old_name or new_args is not old_args:
 			new_name = new_name.value
@@ -129,9 +143,11 @@ def Var(var):
 
 class Annos(_common.Annos):
 
-	def apply(self, term, ctx):
+	def tryApply(self, term, ctx):
 		if aterm.types.isAppl(term):
-			annos = self.annos.apply(term.annotations, ctx)
+			annos = self.annos.tryApply(term.annotations, ctx)
+			if annos is None:
+				return None
 			if annos is not term.annotations:
 				return term.factory.makeAppl(term.name, term.args, annos)
 		return term
@@ -155,11 +171,11 @@ class Subterms(transformation.Transformation):
 		self.list = children
 		self.appl = ApplCons(base.ident, children)
 
-	def apply(self, term, ctx):
+	def tryApply(self, term, ctx):
 		if aterm.types.isAppl(term):
-			return self.appl.apply(term, ctx)
+			return self.appl.tryApply(term, ctx)
 		elif aterm.types.isList(term):
-			return self.list.apply(term, ctx)
+			return self.list.tryApply(term, ctx)
 		else:
-			return self.leaf.apply(term, ctx)
+			return self.leaf.tryApply(term, ctx)
 
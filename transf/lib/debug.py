@@ -132,6 +132,9 @@ class Trace(util.Proxy, DebugMixin):
 			#log.write('<= %20s (%.03fs): %s\n' % (self.name, delta, result))
 			log.write('<= %20s: %s\n' % (self.name, result))
 
+	# trace the failures as well
+	tryApply = transformation.Transformation._tryApply.im_func
+
 
 class Traceback(operate.Unary, DebugMixin):
 
@@ -0,0 +1,133 @@
+'''Indexed choice of transformations.
+
+Long choices of rules are tried in order, one failure at a time. Most rules
+however start by matching the term constructor, so an indexed choice groups
+them by the name and arity, or the literal value, their leading pattern
+matches, and only tries those which may apply to the term at hand.
+'''
+
+
+import aterm.types
+
+from transf import transformation
+from transf import operate
+from transf.lib import base
+from transf.lib import combine
+from transf.lib import scope
+from transf.lib import project
+from transf.lib import match
+from transf.lib import congruent
+
+
+def _head(trf):
+	'''Get the key of the terms to which a transformation may apply, as
+	given by its leading pattern: a (name, arity) tuple for applications, the
+	name alone for applications of any arity, a (type, value) tuple for
+	literals, or the type for lists. None if there is no such pattern.'''
+	while True:
+		cls = type(trf)
+		if cls is combine._Composition:
+			if type(trf.loperand) is project.Name:
+				# the application name pattern, i.e., ?C
+				name = trf.roperand
+				if type(name) is combine._Composition:
+					name = name.loperand
+				if type(name) is match._Term and aterm.types.isStr(name.term):
+					return name.term.value
+				return None
+			trf = trf.loperand
+		elif cls in (combine._Where, scope._Scope):
+			trf = trf.operand
+		elif cls in (match.Appl, congruent.Appl):
+			return trf.name, len(trf.args)
+		elif cls is match._Term:
+			term = trf.term
+			if term.type == aterm.types.APPL:
+				return term.name, len(term.args)
+			if term.type & aterm.types.LIT:
+				return term.type, term.value
+			return term.type
+		elif cls is match.Nil:
+			return aterm.types.NIL
+		elif cls in (match._ConsL, match._ConsR, congruent._ConsL, congruent._ConsR):
+			return aterm.types.CONS
+		else:
+			return None
+
+
+def _flatten(operands):
+	'''Flatten nested choices.'''
+	result = []
+	stack = list(operands)
+	stack.reverse()
+	while stack:
+		operand = stack.pop()
+		if type(operand) is combine._Choice:
+			stack.append(operand.roperand)
+			stack.append(operand.loperand)
+		elif type(operand) is _IndexedChoice:
+			stack.extend(operand.operands[::-1])
+		else:
+			result.append(operand)
+	return result
+
+
+class _IndexedChoice(transformation.Transformation):
+
+	__slots__ = ['operands', 'chains', 'default']
+
+	def __init__(self, operands, chains, default):
+		transformation.Transformation.__init__(self)
+		self.operands = operands
+		self.chains = chains
+		self.default = default
+
+	def select(self, term):
+		'''Get the key of the chain of alternatives for a term, if any.'''
+		try:
+			type = term.type
+		except AttributeError:
+			return None
+		if type == aterm.types.APPL:
+			name = term.name
+			key = name, len(term.args)
+			if key in self.chains:
+				return key
+			return name
+		if type & aterm.types.LIT:
+			return type, term.value
+		return type
+
+	def apply(self, term, ctx):
+		return self.chains.get(self.select(term), self.default).apply(term, ctx)
+
+	def tryApply(self, term, ctx):
+		return self.chains.get(self.select(term), self.default).tryApply(term, ctx)
+
+
+def IndexedChoice(operands):
+	'''Attempt the transformations in order, until one succeeds, as a chain of
+	L{combine.Choice}, but skipping those whose leading pattern does not
+	match the term, so that the choice takes constant time in the number of
+	operands, as long as they are distinguished by their leading patterns.
+	'''
+	operands = _flatten(operands)
+	heads = [_head(operand) for operand in operands]
+	keys = []
+	for head in heads:
+		if head is not None and head not in keys:
+			keys.append(head)
+	if len(keys) < 2:
+		return operate.Nary(operands, combine.Choice, base.fail)
+	chains = {}
+	for key in keys:
+		if isinstance(key, tuple) and isinstance(key[0], basestring):
+			# applications of a given arity also match the name patterns
+			name = key[0]
+			members = [operand for operand, head in zip(operands, heads) if head is None or head == key or head == name]
+		else:
+			members = [operand for operand, head in zip(operands, heads) if head is None or head == key]
+		chains[key] = operate.Nary(members, combine.Choice, base.fail)
+	members = [operand for operand, head in zip(operands, heads) if head is None]
+	default = operate.Nary(members, combine.Choice, base.fail)
+	return _IndexedChoice(operands, chains, default)
@@ -41,88 +41,96 @@ reverse = Reverse()
 
 class Map(operate.Unary):
 
-	def apply(self, trm, ctx):
+	def tryApply(self, trm, ctx):
 		assert aterm.types.isList(trm)
-		return aterm.lists.map(lambda trm: self.operand.apply(trm, ctx), trm)
+		operand = self.operand
+		elms = []
+		for elm in trm:
+			elm = operand.tryApply(elm, ctx)
+			if elm is None:
+				return None
+			elms.append(elm)
+		return trm.factory.makeList(elms)
 
 
 class MapR(operate.Unary):
 
-	def apply(self, trm, ctx):
+	def tryApply(self, trm, ctx):
 		assert aterm.types.isList(trm)
-		return aterm.lists.rmap(lambda trm: self.operand.apply(trm, ctx), trm)
+		operand = self.operand
+		factory = trm.factory
+		accum = factory.makeNil()
+		for elm in reversed(list(trm)):
+			elm = operand.tryApply(elm, ctx)
+			if elm is None:
+				return None
+			accum = factory.makeCons(elm, accum)
+		return accum
 
 
 class ForEach(operate.Unary):
 
-	def apply(self, trm, ctx):
+	def tryApply(self, trm, ctx):
 		assert aterm.types.isList(trm)
 		for elm in trm:
-			self.operand.apply(elm, ctx)
+			if self.operand.tryApply(elm, ctx) is None:
+				return None
 		return trm
 
 
 class Filter(operate.Unary):
 
-	def apply(self, trm, ctx):
+	def tryApply(self, trm, ctx):
 		assert aterm.types.isList(trm)
+		operand = self.operand
 		res = []
 		for elm in trm:
-			try:
-				elm = self.operand.apply(elm, ctx)
-			except exception.Failure:
-				pass
-			else:
+			elm = operand.tryApply(elm, ctx)
+			if elm is not None:
 				res.append(elm)
 		return trm.factory.makeList(res)
 
 
 class FilterR(operate.Unary):
 
-	def apply(self, trm, ctx):
+	def tryApply(self, trm, ctx):
 		assert aterm.types.isList(trm)
 		accum = trm.factory.makeNil()
 		for elm in reverse(trm):
-			try:
-				elm = self.operand.apply(elm, ctx)
-			except exception.Failure:
-				pass
-			else:
+			elm = self.operand.tryApply(elm, ctx)
+			if elm is not None:
 				accum = trm.factory.makeCons(elm, accum)
 		return accum
 
 
 class Fetch(operate.Unary):
 
-	def apply(self, trm, ctx):
+	def tryApply(self, trm, ctx):
 		assert aterm.types.isList(trm)
 		for elm in trm:
-			try:
-				return self.operand.apply(elm, ctx)
-			except exception.Failure:
-				pass
-		raise exception.Failure
+			elm = self.operand.tryApply(elm, ctx)
+			if elm is not None:
+				return elm
+		return None
 
 
 class One(operate.Unary):
 
-	def apply(self, trm, ctx):
+	def tryApply(self, trm, ctx):
 		assert aterm.types.isList(trm)
 		head = []
 		tail = trm
 		while tail:
 			elm = tail.head
 			tail = tail.tail
-			try:
-				elm = self.operand.apply(elm, ctx)
-			except exception.Failure:
-				pass
-			else:
-				tail = trm.factory.makeCons(elm, tail)
+			new = self.operand.tryApply(elm, ctx)
+			if new is not None:
+				tail = trm.factory.makeCons(new, tail)
 				for elm in reversed(head):
 					tail = trm.factory.makeCons(elm, tail)
 				return tail
-		raise exception.Failure
+			head.append(elm)
+		return None
 
 
 class _Concat2(operate.Binary):
@@ -130,7 +138,7 @@ class _Concat2(operate.Binary):
 	def apply(self, trm, ctx):
 		head = self.loperand.apply(trm, ctx)
 		tail = self.roperand.apply(trm, ctx)
-		return aterm.lists.extend(head, tail)
+		return head.extend(tail)
 
 
 def Concat2(loperand, roperand):
@@ -163,7 +171,7 @@ class MapConcat(operate.Unary):
 			lsts.append(lst)
 		res = trm.factory.makeNil()
 		for lst in reversed(lsts):
-			res = aterm.lists.extend(lst, res)
+			res = lst.extend(res)
 		return res
 
 
@@ -28,11 +28,10 @@ anAppl = util.BoolAdaptor(aterm.types.isAppl)
 
 class _Term(_common._Term):
 
-	def apply(self, term, ctx):
+	def tryApply(self, term, ctx):
 		if self.term == term:
 			return term
-		else:
-			raise exception.Failure('term mismatch', self.term, term)
+		return None
 
 def Term(term):
 	return _common.Term(term, _Term)
@@ -50,11 +49,10 @@ class TermSet(transformation.Transformation):
 				assert isinstance(term, aterm.term.Term)
 			self.terms[term] = None
 
-	def apply(self, term, ctx):
+	def tryApply(self, term, ctx):
 		if term in self.terms:
 			return term
-		else:
-			raise exception.Failure('term not in set', term)
+		return None
 
 
 def Int(value):
@@ -92,9 +90,9 @@ class Nil(_Term):
 	def __init__(self):
 		_Term.__init__(self, _factory.makeNil())
 
-	def apply(self, term, ctx):
+	def tryApply(self, term, ctx):
 		if not aterm.types.isNil(term):
-			raise exception.Failure('term is not an empty list', term)
+			return None
 		return term
 
 nil = Nil()
@@ -102,16 +100,17 @@ nil = Nil()
 
 class _ConsL(_common._Cons):
 
-	def apply(self, term, ctx):
+	def tryApply(self, term, ctx):
 		try:
 			head = term.head
 			tail = term.tail
 		except AttributeError:
-			raise exception.Failure('not a list construction term', term)
-		else:
-			self.head.apply(head, ctx)
-			self.tail.apply(tail, ctx)
-			return term
+			return None
+		if self.head.tryApply(head, ctx) is None:
+			return None
+		if self.tail.tryApply(tail, ctx) is None:
+			return None
+		return term
 
 def ConsL(head, tail):
 	return _common.Cons(head, tail, _ConsL, _Term)
@@ -119,16 +118,17 @@ def ConsL(head, tail):
 
 class _ConsR(_common._Cons):
 
-	def apply(self, term, ctx):
+	def tryApply(self, term, ctx):
 		try:
 			head = term.head
 			tail = term.tail
 		except AttributeError:
-			raise exception.Failure('not a list construction term', term)
-		else:
-			self.tail.apply(tail, ctx)
-			self.head.apply(head, ctx)
-			return term
+			return None
+		if self.tail.tryApply(tail, ctx) is None:
+			return None
+		if self.head.tryApply(head, ctx) is None:
+			return None
+		return term
 
 def ConsR(head, tail):
 	return _common.Cons(head, tail, _ConsR, _Term)
@@ -143,20 +143,18 @@ def List(elms, tail = None):
 
 class Appl(_common.Appl):
 
-	def apply(self, term, ctx):
+	def tryApply(self, term, ctx):
 		try:
 			term_name = term.name
 			term_args = term.args
 		except AttributeError:
-			raise exception.Failure('not an application term', term)
-		else:
-			if self.name != term_name:
-				raise exception.Failure('application name mismatch', self.name, term_name)
-			if len(self.args) != len(term_args):
-				raise exception.Failure
-			for self_arg, term_arg in zip(self.args, term_args):
-				self_arg.apply(term_arg, ctx)
-			return term
+			return None
+		if self.name != term_name or len(self.args) != len(term_args):
+			return None
+		for self_arg, term_arg in zip(self.args, term_args):
+			if self_arg.tryApply(term_arg, ctx) is None:
+				return None
+		return term
 
 def ApplName(name):
 	return combine.Where(combine.Composition(project.name, Str(name)))
@@ -166,17 +164,18 @@ def ApplNames(names):
 
 class ApplCons(_common.ApplCons):
 
-	def apply(self, term, ctx):
+	def tryApply(self, term, ctx):
 		try:
 			name = term.name
 			args = term.args
 		except AttributeError:
-			raise exception.Failure('not an application term', term)
-		else:
-			factory = term.factory
-			self.name.apply(factory.makeStr(name), ctx)
-			self.args.apply(factory.makeList(args), ctx)
-			return term
+			return None
+		factory = term.factory
+		if self.name.tryApply(factory.makeStr(name), ctx) is None:
+			return None
+		if self.args.tryApply(factory.makeList(args), ctx) is None:
+			return None
+		return term
 
 
 def Var(var):
@@ -186,9 +185,10 @@ def Var(var):
 
 class Annos(_common.Annos):
 
-	def apply(self, term, ctx):
+	def tryApply(self, term, ctx):
 		annos = aterm.project.annotations(term)
-		self.annos.apply(annos, ctx)
+		if self.annos.tryApply(annos, ctx) is None:
+			return None
 		return term
 
 
@@ -27,7 +27,7 @@ _factory = aterm.factory.factory
 
 
 get = combine.Composition(
-	annotation.Get(match.ApplName('Path')),
+	annotation.Get('Path'),
 	combine.Composition(project.args, project.first)
 )
 
@@ -51,18 +51,37 @@ class Annotate(transformation.Transformation):
 
 	def apply(self, term, ctx):
 		root = self.root.apply(term, ctx)
-		def func(term):
-			try:
-				self.operand.apply(term, ctx)
-			except exception.Failure:
-				return False
-			else:
-				return True
-		return aterm.path.annotate(term, root, func)
+		return aterm.path.annotate(term, root, _predicate(self.operand, ctx))
 
 annotate = Annotate(base.ident, build.nil)
 
 
+def _predicate(operand, ctx):
+	'''Wrap a transformation into a predicate function.'''
+	def func(term):
+		return operand.tryApply(term, ctx) is not None
+	return func
+
+
+class AnnotateSelection(transformation.Transformation):
+	'''Transformation which annotates the path of the terms along a selection
+	path, and of the subterms of the selected term, for which the supplied
+	transformation succeeds. The rest of the term is left untouched, so that
+	the selection can be resolved without annotating the whole term.'''
+
+	def __init__(self, operand, path):
+		transformation.Transformation.__init__(self)
+		self.operand = operand
+		if isinstance(path, aterm.term.Term):
+			self.path = build.Term(path)
+		else:
+			self.path = path
+
+	def apply(self, term, ctx):
+		path = aterm.path.Path.fromTerm(self.path.apply(term, ctx))
+		return aterm.path.annotateSelection(term, path, _predicate(self.operand, ctx))
+
+
 class _DeAnnotate(transformation.Transformation):
 
 	def apply(self, term, ctx):
@@ -118,8 +137,8 @@ class Range(transformation.Transformation):
 		self.end = end
 
 	def apply(self, term, ctx):
-		head, rest = aterm.lists.split(term, self.start)
-		old_body, tail = aterm.lists.split(rest, self.end - self.start)
+		head, rest = term.split(self.start)
+		old_body, tail = rest.split(self.end - self.start)
 
 		new_body = self.operand.apply(old_body, ctx)
 		if new_body is not old_body:
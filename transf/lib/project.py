@@ -11,22 +11,22 @@ from transf.lib import combine
 
 class Head(transformation.Transformation):
 
-	def apply(self, trm, ctx):
+	def tryApply(self, trm, ctx):
 		try:
 			return trm.head
 		except AttributeError:
-			raise exception.Failure("not a list construction term", trm)
+			return None
 
 head = Head()
 
 
 class Tail(transformation.Transformation):
 
-	def apply(self, trm, ctx):
+	def tryApply(self, trm, ctx):
 		try:
 			return trm.tail
 		except AttributeError:
-			raise exception.Failure("not a list construction term", trm)
+			return None
 
 tail = Tail()
 
@@ -51,11 +51,11 @@ def Nth(n):
 
 class Name(transformation.Transformation):
 
-	def apply(self, trm, ctx):
+	def tryApply(self, trm, ctx):
 		try:
 			name = trm.name
 		except AttributeError:
-			raise exception.Failure("not an application term", trm)
+			return None
 		else:
 			return trm.factory.makeStr(name)
 
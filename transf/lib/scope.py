@@ -15,6 +15,10 @@ class _Scope(operate.Unary):
 		ctx = context.Context(self.vars, ctx)
 		return self.operand.apply(trm, ctx)
 
+	def tryApply(self, trm, ctx):
+		ctx = context.Context(self.vars, ctx)
+		return self.operand.tryApply(trm, ctx)
+
 
 def Scope(vars, operand):
 	'''Introduces a new variable scope before the transformation.'''
@@ -1,8 +1,17 @@
-'''Term traversal transformations.'''
+'''Term traversal transformations.
 
+The standard traversals are implemented natively, visiting the terms with an
+explicit stack instead of recursing through proxies, so that they are not
+limited by the depth of the Python stack, and rebuilding only the terms
+whose subterms were actually modified.
+'''
+
+
+import aterm.types
 
 from transf import exception
 from transf import transformation
+from transf import operate
 from transf.lib import base
 from transf import util
 from transf.lib import combine
@@ -11,37 +20,216 @@ from transf.lib import congruent
 from transf.lib import lists
 
 
+def _subterms(trm):
+	'''Get the direct subterms of a term, or None if it is a literal.'''
+	type = trm.type
+	if type == aterm.types.APPL:
+		return trm.args
+	if type & aterm.types.LIST:
+		return tuple(trm)
+	return None
+
+
+def _rebuild(trm, old, new):
+	'''Rebuild a term with new subterms, unless they are all the same.'''
+	for oldElm, newElm in zip(old, new):
+		if oldElm is not newElm:
+			break
+	else:
+		return trm
+	if trm.type == aterm.types.APPL:
+		return trm.factory.makeAppl(trm.name, tuple(new), trm.annotations)
+	else:
+		return trm.factory.makeList(new)
+
+
+class _All(operate.Unary):
+
+	__slots__ = []
+
+	def tryApply(self, trm, ctx):
+		kids = _subterms(trm)
+		if not kids:
+			return trm
+		operand = self.operand
+		new = []
+		for kid in kids:
+			kid = operand.tryApply(kid, ctx)
+			if kid is None:
+				return None
+			new.append(kid)
+		return _rebuild(trm, kids, new)
+
+
+class _One(operate.Unary):
+
+	__slots__ = []
+
+	def tryApply(self, trm, ctx):
+		kids = _subterms(trm)
+		if not kids:
+			return None
+		operand = self.operand
+		for index in range(len(kids)):
+			kid = operand.tryApply(kids[index], ctx)
+			if kid is not None:
+				new = list(kids)
+				new[index] = kid
+				return _rebuild(trm, kids, new)
+		return None
+
+
+class _Some(operate.Unary):
+
+	__slots__ = []
+
+	def tryApply(self, trm, ctx):
+		kids = _subterms(trm)
+		if not kids:
+			return None
+		operand = self.operand
+		new = None
+		for index in range(len(kids)):
+			kid = operand.tryApply(kids[index], ctx)
+			if kid is not None:
+				if new is None:
+					new = list(kids[:index])
+				new.append(kid)
+			elif new is not None:
+				new.append(kids[index])
+		if new is None:
+			return None
+		return _rebuild(trm, kids, new)
+
+
 def All(operand):
 	'''Applies a transformation to all direct subterms of a term.'''
-	return congruent.Subterms(lists.Map(operand), base.ident)
+	return _All(operand)
 
 
 def One(operand):
 	'''Applies a transformation to exactly one direct subterm of a term.'''
-	one = util.Proxy()
-	one.subject = congruent.Subterms(
-		# FIXME: write a non-recursive implementation
-		combine.Choice(
-			congruent.Cons(operand, base.ident),
-			congruent.Cons(base.ident, one)
-		),
-		base.fail
-	)
-	return one
+	return _One(operand)
 
 
 def Some(operand):
 	'''Applies a transformation to as many direct subterms of a term, but at list one.'''
-	some = util.Proxy()
-	some.subject = congruent.Subterms(
-		# FIXME: write a non-recursive implementation
-		combine.Choice(
-			congruent.Cons(operand, lists.Map(combine.Try(operand))),
-			congruent.Cons(base.ident, some),
-		),
-		base.fail
-	)
-	return some
+	return _Some(operand)
+
+
+# how the subterms are visited by a traversal, as in All, One, and Some
+ALL, ONE, SOME = range(3)
+
+
+class _Traversal(transformation.Transformation):
+	'''Native traversal.
+
+	Every term is visited as in::
+
+		down ; (before + (-skip ; Subterms(traversal)) + after) ; up
+
+	where Subterms is L{All}, L{One}, or L{Some}, according to the mode, and
+	any of the other transformations may be missing.
+	'''
+
+	__slots__ = ['mode', 'down', 'before', 'skip', 'after', 'up']
+
+	def __init__(self, mode, down = None, before = None, skip = None, after = None, up = None):
+		transformation.Transformation.__init__(self)
+		self.mode = mode
+		self.down = down
+		self.before = before
+		self.skip = skip
+		self.after = after
+		self.up = up
+
+	def leave(self, trm, result, ctx):
+		'''Finish the visit of a term, given the result of the subterms
+		traversal, or None if it failed.'''
+		if result is None:
+			if self.after is None:
+				return None
+			result = self.after.tryApply(trm, ctx)
+			if result is None:
+				return None
+		if self.up is None:
+			return result
+		return self.up.tryApply(result, ctx)
+
+	def tryApply(self, trm, ctx):
+		mode = self.mode
+		down = self.down
+		before = self.before
+		skip = self.skip
+		up = self.up
+		# stack of [term, subterms, index, new subterms] frames
+		stack = []
+		while True:
+			# enter the term
+			if down is not None:
+				trm = down.tryApply(trm, ctx)
+			if trm is None:
+				result = None
+			else:
+				result = None
+				if before is not None:
+					result = before.tryApply(trm, ctx)
+				if result is not None:
+					if up is not None:
+						result = up.tryApply(result, ctx)
+				else:
+					if skip is None or skip.tryApply(trm, ctx) is None:
+						kids = _subterms(trm)
+						if kids:
+							stack.append([trm, kids, 0, None])
+							trm = kids[0]
+							continue
+						if mode == ALL:
+							result = trm
+					result = self.leave(trm, result, ctx)
+
+			# return the result to the enclosing terms
+			while stack:
+				frame = stack[-1]
+				parent, kids, index, new = frame
+				index += 1
+				if mode == ALL:
+					if result is None:
+						done = True
+					else:
+						if new is None:
+							new = frame[3] = []
+						new.append(result)
+						done = index == len(kids)
+						if done:
+							result = _rebuild(parent, kids, new)
+				elif mode == ONE:
+					if result is None:
+						done = index == len(kids)
+					else:
+						new = list(kids)
+						new[index - 1] = result
+						result = _rebuild(parent, kids, new)
+						done = True
+				else:
+					if result is None:
+						if new is not None:
+							new.append(kids[index - 1])
+					else:
+						if new is None:
+							new = frame[3] = list(kids[:index - 1])
+						new.append(result)
+					done = index == len(kids)
+					if done and new is not None:
+						result = _rebuild(parent, kids, new)
+				if not done:
+					frame[2] = index
+					trm = kids[index]
+					break
+				stack.pop()
+				result = self.leave(parent, result, ctx)
+			else:
+				return result
 
 
 def Traverse(Subterms, down = None, up = None, stop = None, Enter = None, Leave = None):
@@ -62,15 +250,7 @@ def Traverse(Subterms, down = None, up = None, stop = None, Enter = None, Leave
 
 
 def DownUp(down = None, up = None, stop = None):
-	downup = util.Proxy()
-	downup.subject = All(downup)
-	if stop is not None:
-		downup.subject = combine.Choice(stop, downup.subject)
-	if up is not None:
-		downup.subject = combine.Composition(downup.subject, up)
-	if down is not None:
-		downup.subject = combine.Composition(down, downup.subject)
-	return downup
+	return _Traversal(ALL, down = down, before = stop, up = up)
 
 
 def TopDown(operand, stop = None):
@@ -81,47 +261,113 @@ def BottomUp(operand, stop = None):
 	return DownUp(up = operand, stop = stop)
 
 
+class _InnerMost(operate.Unary):
+	'''Native innermost normalization.
+
+	The normal form of every term visited is recorded, by identity, for the
+	duration of the transformation, so that the subterms of a rewrite result
+	which were already normalized -- typically those bound to the rule
+	variables -- are not visited again, and so that terms shared in the term
+	DAG, which is always the case for equal terms under maximal sharing, are
+	normalized only once.
+	'''
+
+	__slots__ = []
+
+	def tryApply(self, trm, ctx):
+		operand = self.operand
+		# normal forms, by term identity, along with the terms themselves, so
+		# that their identities are not reused
+		normal = {}
+		# stack of [term, subterms, index, new subterms] frames, or of
+		# [term, rebuilt term, None, None] frames awaiting the normal form of a
+		# rewrite result
+		stack = []
+		while True:
+			# enter the term
+			try:
+				result = normal[id(trm)][1]
+			except KeyError:
+				kids = _subterms(trm)
+				if kids:
+					stack.append([trm, kids, 0, []])
+					trm = kids[0]
+					continue
+				result = operand.tryApply(trm, ctx)
+				if result is None:
+					normal[id(trm)] = trm, trm
+					result = trm
+				else:
+					stack.append([trm, trm, None, None])
+					trm = result
+					continue
+
+			# return the normal form to the enclosing terms
+			while stack:
+				frame = stack[-1]
+				parent, kids, index, new = frame
+				if new is None:
+					# the rebuilt term rewrote into this normal form
+					stack.pop()
+					normal[id(parent)] = parent, result
+					normal[id(kids)] = kids, result
+					continue
+				new.append(result)
+				index += 1
+				if index < len(kids):
+					frame[2] = index
+					trm = kids[index]
+					break
+				rebuilt = _rebuild(parent, kids, new)
+				result = operand.tryApply(rebuilt, ctx)
+				if result is None:
+					stack.pop()
+					normal[id(parent)] = parent, rebuilt
+					normal[id(rebuilt)] = rebuilt, rebuilt
+					result = rebuilt
+				else:
+					frame[1] = rebuilt
+					frame[3] = None
+					trm = result
+					break
+			else:
+				return result
+
+
 def InnerMost(operand):
-	innermost = util.Proxy()
-	innermost.subject = BottomUp(combine.Try(combine.Composition(operand, innermost)))
-	return innermost
+	'''Normalize a term, by applying a transformation to its subterms,
+	innermost first, until it no longer applies anywhere.'''
+	return _InnerMost(operand)
 
 
 def AllTD(operand):
 	'''Apply a transformation to all subterms, but stops recursing
 	as soon as it finds a subterm to which the transformation succeeds.
 	'''
-	alltd = util.Proxy()
-	alltd.subject = combine.Choice(operand, All(alltd))
-	return alltd
+	return _Traversal(ALL, before = operand)
 
 
 def AllBU(operand):
-	allbu = util.Proxy()
-	allbu.subject = combine.Choice(All(allbu), operand)
-	return allbu
+	return _Traversal(ALL, after = operand)
 
 
 def OnceTD(operand, stop = None):
 	'''Performs a left to right depth first search/transformation that
 	stops as soon as the the transformation has been successfuly applied.
 	'''
-	if stop is None:
-		return iterate.Rec(lambda self: combine.Choice(operand, One(self)))
-	else:
-		return iterate.Rec(lambda self: combine.Choice(operand, -stop * One(self)))
+	return _Traversal(ONE, before = operand, skip = stop)
 
 
 def OnceBU(operand):
-	return iterate.Rec(lambda self: combine.Choice(One(self), operand))
+	return _Traversal(ONE, after = operand)
 
 
 def SomeTD(operand):
-	return iterate.Rec(lambda self: combine.Choice(operand, Some(self)))
+	return _Traversal(SOME, before = operand)
 
 
 def SomeBU(operand):
-	return iterate.Rec(lambda self: combine.Choice(Some(self), operand))
+	return _Traversal(SOME, after = operand)
 
 
 def ManyTD(operand):
@@ -134,3 +380,80 @@ def ManyBU(operand):
 
 def Leaves(operand, isLeaf):
 	return iterate.Rec(lambda self: combine.GuardedChoice(isLeaf, operand, All(self)))
+
+
+# Recursive implementations of the traversals above, defined in terms of the
+# congruent transformations, which serve as their reference in tests and
+# benchmarks.
+
+def _ProxyAll(operand):
+	return congruent.Subterms(lists.Map(operand), base.ident)
+
+
+def _ProxyOne(operand):
+	one = util.Proxy()
+	one.subject = congruent.Subterms(
+		combine.Choice(
+			congruent.Cons(operand, base.ident),
+			congruent.Cons(base.ident, one)
+		),
+		base.fail
+	)
+	return one
+
+
+def _ProxySome(operand):
+	some = util.Proxy()
+	some.subject = congruent.Subterms(
+		combine.Choice(
+			congruent.Cons(operand, lists.Map(combine.Try(operand))),
+			congruent.Cons(base.ident, some),
+		),
+		base.fail
+	)
+	return some
+
+
+def _ProxyDownUp(down = None, up = None, stop = None):
+	downup = util.Proxy()
+	downup.subject = _ProxyAll(downup)
+	if stop is not None:
+		downup.subject = combine.Choice(stop, downup.subject)
+	if up is not None:
+		downup.subject = combine.Composition(downup.subject, up)
+	if down is not None:
+		downup.subject = combine.Composition(down, downup.subject)
+	return downup
+
+
+def _ProxyInnerMost(operand):
+	innermost = util.Proxy()
+	innermost.subject = _ProxyDownUp(up = combine.Try(combine.Composition(operand, innermost)))
+	return innermost
+
+
+def _ProxyAllTD(operand):
+	return iterate.Rec(lambda self: combine.Choice(operand, _ProxyAll(self)))
+
+
+def _ProxyAllBU(operand):
+	return iterate.Rec(lambda self: combine.Choice(_ProxyAll(self), operand))
+
+
+def _ProxyOnceTD(operand, stop = None):
+	if stop is None:
+		return iterate.Rec(lambda self: combine.Choice(operand, _ProxyOne(self)))
+	else:
+		return iterate.Rec(lambda self: combine.Choice(operand, -stop * _ProxyOne(self)))
+
+
+def _ProxyOnceBU(operand):
+	return iterate.Rec(lambda self: combine.Choice(_ProxyOne(self), operand))
+
+
+def _ProxySomeTD(operand):
+	return iterate.Rec(lambda self: combine.Choice(operand, _ProxySome(self)))
+
+
+def _ProxySomeBU(operand):
+	return iterate.Rec(lambda self: combine.Choice(_ProxySome(self), operand))
@@ -46,14 +46,14 @@ def _parse(buf, production="definitions", debug=False):
 	return term
 
 
-def _compile(buf, simplify=True, verbose=False, debug=False):
+def _compile(buf, simplify=True, verbose=False, debug=False, specialize=False):
 	term = _parse(buf)
 	if False:
 		# FIXME: re-enable the simplifier
 		import transf.parse.simplifier
 		old = term
 		term = transf.parse.simplifier.simplify(term)
-	compiler = Compiler(debug=debug)
+	compiler = Compiler(debug=debug, specialize=specialize)
 	code = compiler.definitions(term)
 	if verbose:
 		sys.stderr.write("input code:\n%s\n" % buf)
@@ -86,18 +86,22 @@ def _exec(code, globals_, locals_):
 		raise
 
 
-def Transfs(buf, simplify=True, verbose=False, debug=False):
-	'''Parse transformation definitions from a string.'''
-	code = _compile(buf, simplify=simplify, verbose=verbose, debug=debug)
+def Transfs(buf, simplify=True, verbose=False, debug=False, specialize=False):
+	'''Parse transformation definitions from a string.
+
+	If enabled, the definitions are specialized into Python functions;
+	see L{transf.specialize}.
+	'''
+	code = _compile(buf, simplify=simplify, verbose=verbose, debug=debug, specialize=specialize)
 	caller = sys._getframe(1)
 	globals_ = caller.f_globals
 	locals_ = caller.f_locals
 	_exec(code, globals_, locals_)
 
 
-def Transf(buf, simplify=True, verbose=False, debug=False):
+def Transf(buf, simplify=True, verbose=False, debug=False, specialize=False):
 	'''Parse a transformation from a string.'''
-	code = _compile("_tmp = %s" % buf, simplify=simplify, verbose=verbose, debug=debug)
+	code = _compile("_tmp = %s" % buf, simplify=simplify, verbose=verbose, debug=debug, specialize=specialize)
 	caller = sys._getframe(1)
 	globals_ = caller.f_globals
 	locals_ = caller.f_locals.copy()
@@ -14,5 +14,6 @@ from transf.lib import *
 from transf import lib
 
 import transf
+import transf.specialize
 
 from __builtin__ import *
@@ -20,8 +20,11 @@ ASSIGN, MATCH, BUILD, CONGRUENT = range(4)
 
 class Compiler(walker.Walker):
 
-	def __init__(self, debug=False):
+	def __init__(self, debug=False, specialize=False):
 		self.debug = debug
+		# whether to specialize the transformation definitions into Python
+		# functions
+		self.specialize = specialize and not debug
 
 		self.stmts = []
 		self.indent = 0
@@ -30,6 +33,8 @@ class Compiler(walker.Walker):
 		self.args = set()
 		self.locals = set()
 
+		self.proxies = []
+
 	def stmt(self, s):
 		self.stmts.append('\t' * self.indent + s)
 
@@ -37,12 +42,15 @@ class Compiler(walker.Walker):
 	definitions = walker.Dispatch('definitions')
 
 	def definitionsDefs(self, tdefs):
+		self.proxies = []
 		for tdef in tdefs:
 			self.predefine(tdef)
 		self.stmt('')
 		for tdef in tdefs:
 			self.define(tdef)
 			self.stmt('')
+		if self.specialize and self.proxies:
+			self.stmt("transf.specialize.specializeProxies([%s])" % ", ".join(self.proxies))
 
 		return "\n".join(self.stmts)
 
@@ -72,6 +80,7 @@ class Compiler(walker.Walker):
 			self.stmt("%s = transf.lib.debug.Trace(None, name=%r)" % (n, n))
 		else:
 			self.stmt("%s = transf.util.Proxy()" % (n,))
+		self.proxies.append(n)
 
 	def predefineMacroDef(self, n, a, t):
 		pass
@@ -165,12 +174,12 @@ class Compiler(walker.Walker):
 	def transfChoice(self, o):
 		# FIXME: insert a variable scope here
 		o = "[" + ",".join(["%s" % self.transf(_o) for _o in o]) + "]"
-		return "transf.lib.combine.UndeterministicChoice(%s)" % o
+		return "transf.lib.dispatch.IndexedChoice(%s)" % o
 
 	def transfLeftChoice(self, l, r):
 		l = self.transf(l)
 		r = self.transf(r)
-		return "transf.lib.combine.Choice(%s, %s)" % (l, r)
+		return "transf.lib.dispatch.IndexedChoice([%s, %s])" % (l, r)
 
 	def transfGuardedChoice(self, l, m, r):
 		l = self.transf(l)
@@ -0,0 +1,602 @@
+'''Specialization of transformations into Python functions.
+
+Transformations are trees of combinator objects, so applying them costs a
+virtual L{apply<transformation.Transformation.apply>} call for every node.
+The specializer generates instead a straight-line Python function for each
+transformation: compositions, choices and the other combinators are inlined,
+term matching and building become inline attribute and tuple checks, and
+L{proxies<util.Proxy>} -- the recursive definitions -- become direct calls
+between the generated functions. Transformations it does not know are
+called as usual. The generated functions follow the
+L{tryApply<transformation.Transformation.tryApply>} protocol, returning None
+on failure.
+
+Proxies are resolved when specialized, so they should not be re-targeted
+afterwards.
+'''
+
+
+import aterm.types
+
+from transf import transformation
+from transf import context
+from transf import variable
+from transf import util
+from transf.lib import base
+from transf.lib import combine
+from transf.lib import scope
+from transf.lib import match
+from transf.lib import build
+from transf.lib import congruent
+from transf.lib import dispatch
+from transf.types import term as _term
+
+
+# maximum indentation, and maximum nesting of loops, of the generated code,
+# beyond which the nested transformations are generated as functions of
+# their own; CPython allows no more than 20 statically nested blocks
+MAX_INDENT = 24
+MAX_LOOPS = 16
+
+
+_var = _term.Term('_')
+_varMethods = {
+	_var.match.method: 'VarMatch',
+	_var.build.method: 'VarBuild',
+	_var.assign.method: 'VarAssign',
+}
+del _var
+
+class Specialized(transformation.Transformation):
+	'''Transformation specialized into a Python function.'''
+
+	def __init__(self, function, original):
+		transformation.Transformation.__init__(self)
+		# the function is called directly, without the method indirection
+		self.tryApply = function
+		self.original = original
+
+
+_emitters = {
+	base.Ident: 'Ident',
+	base.Fail: 'Fail',
+	util.Proxy: 'Proxy',
+	Specialized: 'Specialized',
+	combine._Composition: 'Composition',
+	combine._Choice: 'Choice',
+	combine._GuardedChoice: 'Choice',
+	combine._Not: 'Not',
+	combine._Try: 'Try',
+	combine._Where: 'Where',
+	combine._If: 'If',
+	combine._IfElse: 'IfElse',
+	combine._IfElifElse: 'IfElifElse',
+	dispatch._IndexedChoice: 'IndexedChoice',
+	scope._Scope: 'Scope',
+	variable._VariableTransformation: 'Var',
+	match._Term: 'MatchTerm',
+	match.Nil: 'MatchNil',
+	match._ConsL: 'MatchCons',
+	match._ConsR: 'MatchCons',
+	match.Appl: 'MatchAppl',
+	build._Term: 'BuildTerm',
+	build._ConsL: 'BuildCons',
+	build._ConsR: 'BuildCons',
+	build.Appl: 'BuildAppl',
+	congruent._ConsL: 'CongruentCons',
+	congruent._ConsR: 'CongruentCons',
+	congruent.Appl: 'CongruentAppl',
+}
+
+
+def _operands(trf):
+	'''Get the operands of a transformation inlined by the specializer.'''
+	cls = type(trf)
+	if cls is util.Proxy:
+		if trf.subject is None:
+			return ()
+		return (trf.subject,)
+	if cls in (combine._Composition, combine._Choice, combine._If):
+		return (trf.loperand, trf.roperand)
+	if cls in (combine._GuardedChoice, combine._IfElse):
+		return (trf.operand1, trf.operand2, trf.operand3)
+	if cls in (combine._Not, combine._Try, combine._Where, scope._Scope):
+		return (trf.operand,)
+	if cls is dispatch._IndexedChoice:
+		return trf.chains.values() + [trf.default]
+	if cls is combine._IfElifElse:
+		operands = []
+		for cond, action in trf.clauses:
+			operands.append(cond)
+			operands.append(action)
+		operands.append(trf.otherwise)
+		return operands
+	if cls in (match.Appl, build.Appl, congruent.Appl):
+		return trf.args
+	if cls in (match._ConsL, match._ConsR, build._ConsL, build._ConsR, congruent._ConsL, congruent._ConsR):
+		return (trf.head, trf.tail)
+	return ()
+
+
+class _Generator(object):
+	'''Python code generator.
+
+	Each emit method writes the code which applies a transformation to the
+	term in a given variable, and returns the name of the variable with the
+	result. Failures are not raised, but break out of the innermost failure
+	handler -- a loop which is run only once -- or else return None from the
+	function.
+	'''
+
+	def __init__(self):
+		self.lines = []
+		self.indent = 0
+		self.loops = 0
+		self.count = 0
+		self.namespace = {
+			'_Context': context.Context,
+		}
+		self.constants = {}
+		self.functions = {}
+		self.pending = []
+		self.counts = {}
+		self.tables = []
+
+	def share(self, roots):
+		'''Count the references to the transformations reachable from the
+		given ones, so that shared transformations are only generated once.'''
+		counts = self.counts
+		stack = list(roots)
+		while stack:
+			trf = stack.pop()
+			key = id(trf)
+			if key in counts:
+				counts[key] += 1
+				continue
+			counts[key] = 1
+			stack.extend(_operands(trf))
+
+	def isShared(self, trf):
+		return self.counts.get(id(trf), 0) > 1 and type(trf) is not util.Proxy and _operands(trf)
+
+	def generate(self):
+		'''Generate the pending functions, and get their namespace.'''
+		while self.pending:
+			name, trf = self.pending.pop()
+			self.stmt('def %s(trm, ctx):' % name)
+			self.indent += 1
+			if type(trf) is util.Proxy:
+				result = self.emit(trf.subject, 'trm', 'ctx')
+			else:
+				result = self.inline(trf, 'trm', 'ctx')
+			self.stmt('return %s' % result)
+			self.indent -= 1
+			self.stmt('')
+		code = '\n'.join(self.lines)
+		namespace = self.namespace
+		exec code in namespace
+		for name, functions in self.tables:
+			namespace[name] = dict([(key, namespace[function]) for key, function in functions])
+		return namespace
+
+	def stmt(self, s):
+		self.lines.append('\t' * self.indent + s)
+
+	def begin(self, s):
+		'''Begin an indented block.'''
+		self.stmt(s)
+		self.indent += 1
+		return len(self.lines)
+
+	def end(self, mark):
+		'''End an indented block.'''
+		if len(self.lines) == mark:
+			self.stmt('pass')
+		self.indent -= 1
+
+	def var(self):
+		self.count += 1
+		return '_t%d' % self.count
+
+	def constant(self, obj):
+		try:
+			return self.constants[id(obj)]
+		except KeyError:
+			name = self.constants[id(obj)] = '_c%d' % len(self.constants)
+			self.namespace[name] = obj
+			return name
+
+	def function(self, trf):
+		'''Get the name of the function generated for a transformation.'''
+		try:
+			return self.functions[id(trf)]
+		except KeyError:
+			name = self.functions[id(trf)] = '_f%d' % len(self.functions)
+			# keep the transformation alive, as its id is the key
+			self.constant(trf)
+			self.pending.append((name, trf))
+			return name
+
+	def emit(self, trf, src, ctx):
+		if self.isShared(trf) or ((self.indent > MAX_INDENT or self.loops >= MAX_LOOPS) and _operands(trf)):
+			return self.call(self.function(trf), src, ctx)
+		return self.inline(trf, src, ctx)
+
+	def inline(self, trf, src, ctx):
+		try:
+			name = _emitters[type(trf)]
+		except KeyError:
+			return self.emitOther(trf, src, ctx)
+		return getattr(self, 'emit' + name)(trf, src, ctx)
+
+	def call(self, func, src, ctx):
+		dst = self.var()
+		self.stmt('%s = %s(%s, %s)' % (dst, func, src, ctx))
+		self.failIf('%s is None' % dst)
+		return dst
+
+	def failure(self):
+		'''Get the statement which signals a failure.'''
+		if self.loops:
+			return 'break'
+		return 'return None'
+
+	def fail(self):
+		self.stmt(self.failure())
+
+	def failIf(self, cond):
+		self.stmt('if %s:' % cond)
+		self.stmt('\t' + self.failure())
+
+	def beginHandler(self):
+		'''Begin a failure handler, out of which the failures within break.'''
+		self.begin('while True:')
+		self.loops += 1
+
+	def endHandler(self):
+		'''End a failure handler.'''
+		self.stmt('break')
+		self.loops -= 1
+		self.indent -= 1
+
+	def emitOther(self, trf, src, ctx):
+		return self.call(self.constant(trf.tryApply), src, ctx)
+
+	def emitIdent(self, trf, src, ctx):
+		return src
+
+	def emitFail(self, trf, src, ctx):
+		self.fail()
+		return src
+
+	def emitProxy(self, trf, src, ctx):
+		subject = trf.subject
+		if subject is None:
+			return self.call(self.constant(trf.tryApply), src, ctx)
+		if type(subject) is Specialized:
+			return self.call(self.constant(subject.tryApply), src, ctx)
+		return self.call(self.function(trf), src, ctx)
+
+	def emitSpecialized(self, trf, src, ctx):
+		return self.call(self.constant(trf.tryApply), src, ctx)
+
+	def emitComposition(self, trf, src, ctx):
+		src = self.emit(trf.loperand, src, ctx)
+		return self.emit(trf.roperand, src, ctx)
+
+	def emitChoice(self, trf, src, ctx):
+		# chains of choices are generated flat, with the result initially
+		# undefined, as they tend to be too long to nest
+		alternatives = []
+		while True:
+			if type(trf) is combine._Choice:
+				alternatives.append((trf.loperand, None))
+				trf = trf.roperand
+			else:
+				alternatives.append((trf.operand1, trf.operand2))
+				trf = trf.operand3
+			if type(trf) not in (combine._Choice, combine._GuardedChoice) or self.isShared(trf):
+				break
+		dst = self.var()
+		self.stmt('%s = None' % dst)
+		for index in range(len(alternatives)):
+			guard, action = alternatives[index]
+			guarded = self.beginAlternative(index, dst, guard, src)
+			if action is None:
+				self.beginHandler()
+				result = self.emit(guard, src, ctx)
+				self.stmt('%s = %s' % (dst, result))
+				self.endHandler()
+			else:
+				# failures of the action are not handled
+				result = self.emitCondition(guard, src, ctx)
+				self.begin('if %s is not None:' % result)
+				result = self.emit(action, result, ctx)
+				self.stmt('%s = %s' % (dst, result))
+				self.end(None)
+			if guarded:
+				self.end(None)
+		self.begin('if %s is None:' % dst)
+		result = self.emit(trf, src, ctx)
+		self.stmt('%s = %s' % (dst, result))
+		self.end(None)
+		return dst
+
+	def emitCondition(self, trf, src, ctx):
+		'''Apply a transformation whose failure is handled, and get the
+		variable with its result, or None on failure.'''
+		dst = self.var()
+		self.stmt('%s = None' % dst)
+		self.beginHandler()
+		result = self.emit(trf, src, ctx)
+		self.stmt('%s = %s' % (dst, result))
+		self.endHandler()
+		return dst
+
+	def beginAlternative(self, index, dst, trf, src):
+		'''Begin the block of an alternative, entered only if the previous
+		ones failed, and if the precondition of the transformation holds, so
+		that most alternatives are skipped without raising failures.'''
+		conds = []
+		if index:
+			conds.append('%s is None' % dst)
+		precondition = self.precondition(trf, src)
+		if precondition is not None:
+			conds.append(precondition)
+		if conds:
+			self.begin('if %s:' % ' and '.join(conds))
+			return True
+		return False
+
+	def precondition(self, trf, src):
+		'''Get a side-effect free expression which must hold for a
+		transformation to succeed, if any.'''
+		cls = type(trf)
+		while cls in (combine._Composition, combine._Where, scope._Scope):
+			if cls is combine._Composition:
+				trf = trf.loperand
+			else:
+				trf = trf.operand
+			cls = type(trf)
+		if cls in (match.Appl, congruent.Appl):
+			return '%s.type == %d and %s.name == %r and len(%s.args) == %d' % (src, aterm.types.APPL, src, trf.name, src, len(trf.args))
+		if cls is match._Term:
+			if trf.term.type & aterm.types.LIT:
+				return '%s.type == %d and %s.value == %s' % (src, trf.term.type, src, self.constant(trf.term.value))
+			return '%s.type == %d' % (src, trf.term.type)
+		if cls is match.Nil:
+			return '%s.type == %d' % (src, aterm.types.NIL)
+		if cls in (match._ConsL, match._ConsR, congruent._ConsL, congruent._ConsR):
+			return '%s.type == %d' % (src, aterm.types.CONS)
+		return None
+
+	def emitNot(self, trf, src, ctx):
+		result = self.emitCondition(trf.operand, src, ctx)
+		self.failIf('%s is not None' % result)
+		return src
+
+	def emitTry(self, trf, src, ctx):
+		dst = self.var()
+		self.stmt('%s = %s' % (dst, src))
+		self.beginHandler()
+		result = self.emit(trf.operand, src, ctx)
+		self.stmt('%s = %s' % (dst, result))
+		self.endHandler()
+		return dst
+
+	def emitWhere(self, trf, src, ctx):
+		self.emit(trf.operand, src, ctx)
+		return src
+
+	def emitIf(self, trf, src, ctx):
+		return self.emitClauses([(trf.loperand, trf.roperand)], base.ident, src, ctx)
+
+	def emitIfElse(self, trf, src, ctx):
+		return self.emitClauses([(trf.operand1, trf.operand2)], trf.operand3, src, ctx)
+
+	def emitIfElifElse(self, trf, src, ctx):
+		return self.emitClauses(trf.clauses, trf.otherwise, src, ctx)
+
+	def emitClauses(self, clauses, otherwise, src, ctx):
+		dst = self.var()
+		self.stmt('%s = None' % dst)
+		for index in range(len(clauses)):
+			cond, action = clauses[index]
+			guarded = self.beginAlternative(index, dst, cond, src)
+			result = self.emitCondition(cond, src, ctx)
+			# failures of the action are not handled
+			self.begin('if %s is not None:' % result)
+			result = self.emit(action, src, ctx)
+			self.stmt('%s = %s' % (dst, result))
+			self.end(None)
+			if guarded:
+				self.end(None)
+		self.begin('if %s is None:' % dst)
+		result = self.emit(otherwise, src, ctx)
+		self.stmt('%s = %s' % (dst, result))
+		self.end(None)
+		return dst
+
+	def emitIndexedChoice(self, trf, src, ctx):
+		# each chain of alternatives becomes a function, looked up by the key
+		# of the term
+		table = '_d%d' % len(self.tables)
+		self.tables.append((table, [(key, self.function(chain)) for key, chain in trf.chains.iteritems()]))
+		key = self.var()
+		self.stmt('%s = %s(%s)' % (key, self.constant(trf.select), src))
+		dst = self.var()
+		self.stmt('%s = %s.get(%s, %s)(%s, %s)' % (dst, table, key, self.function(trf.default), src, ctx))
+		self.failIf('%s is None' % dst)
+		return dst
+
+	def emitScope(self, trf, src, ctx):
+		dst = self.var()
+		self.stmt('%s = _Context(%s, %s)' % (dst, self.constant(trf.vars), ctx))
+		return self.emit(trf.operand, src, dst)
+
+	def emitVar(self, trf, src, ctx):
+		try:
+			name = _varMethods[trf.method]
+		except KeyError:
+			name = None
+		if name is None or type(trf.binding) is not context.Local:
+			return self.emitOther(trf, src, ctx)
+		return getattr(self, 'emit' + name)(self.constant(trf.binding.name), src, ctx)
+
+	def emitVarMatch(self, name, src, ctx):
+		old = self.var()
+		self.stmt('%s = %s.get(%s)' % (old, ctx, name))
+		self.stmt('if %s is None:' % old)
+		self.stmt('\t%s.set(%s, %s)' % (ctx, name, src))
+		self.stmt('elif %s != %s:' % (old, src))
+		self.stmt('\t' + self.failure())
+		return src
+
+	def emitVarBuild(self, name, src, ctx):
+		dst = self.var()
+		self.stmt('%s = %s.get(%s)' % (dst, ctx, name))
+		self.stmt('if %s is None:' % dst)
+		self.stmt('\t' + self.failure())
+		return dst
+
+	def emitVarAssign(self, name, src, ctx):
+		self.stmt('%s.set(%s, %s)' % (ctx, name, src))
+		return src
+
+	def emitMatchTerm(self, trf, src, ctx):
+		term = trf.term
+		if term.type & aterm.types.LIT:
+			self.stmt('if %s.type != %d or %s.value != %s:' % (src, term.type, src, self.constant(term.value)))
+		else:
+			self.stmt('if %s != %s:' % (src, self.constant(term)))
+		self.stmt('\t' + self.failure())
+		return src
+
+	def emitMatchNil(self, trf, src, ctx):
+		self.stmt('if %s.type != %d:' % (src, aterm.types.NIL))
+		self.stmt('\t' + self.failure())
+		return src
+
+	def emitMatchCons(self, trf, src, ctx):
+		self.stmt('if %s.type != %d:' % (src, aterm.types.CONS))
+		self.stmt('\t' + self.failure())
+		head = self.var()
+		tail = self.var()
+		self.stmt('%s = %s.head' % (head, src))
+		self.stmt('%s = %s.tail' % (tail, src))
+		if type(trf) is match._ConsR:
+			self.emit(trf.tail, tail, ctx)
+			self.emit(trf.head, head, ctx)
+		else:
+			self.emit(trf.head, head, ctx)
+			self.emit(trf.tail, tail, ctx)
+		return src
+
+	def emitAppl(self, trf, src):
+		'''Check the name and arity of an application term, and get its
+		arguments.'''
+		if trf.args:
+			self.stmt('if %s.type != %d or %s.name != %r or len(%s.args) != %d:' % (src, aterm.types.APPL, src, trf.name, src, len(trf.args)))
+		else:
+			self.stmt('if %s.type != %d or %s.name != %r or %s.args:' % (src, aterm.types.APPL, src, trf.name, src))
+		self.stmt('\t' + self.failure())
+		args = [self.var() for arg in trf.args]
+		if len(args) == 1:
+			self.stmt('%s, = %s.args' % (args[0], src))
+		elif args:
+			self.stmt('%s = %s.args' % (', '.join(args), src))
+		return args
+
+	def emitMatchAppl(self, trf, src, ctx):
+		args = self.emitAppl(trf, src)
+		for self_arg, arg in zip(trf.args, args):
+			self.emit(self_arg, arg, ctx)
+		return src
+
+	def emitBuildTerm(self, trf, src, ctx):
+		return self.constant(trf.term)
+
+	def emitBuildCons(self, trf, src, ctx):
+		if type(trf) is build._ConsR:
+			tail = self.emit(trf.tail, src, ctx)
+			head = self.emit(trf.head, src, ctx)
+		else:
+			head = self.emit(trf.head, src, ctx)
+			tail = self.emit(trf.tail, src, ctx)
+		dst = self.var()
+		self.stmt('%s = %s.factory.makeCons(%s, %s)' % (dst, src, head, tail))
+		return dst
+
+	def emitBuildAppl(self, trf, src, ctx):
+		args = [self.emit(arg, src, ctx) for arg in trf.args]
+		dst = self.var()
+		self.stmt('%s = %s.factory.makeAppl(%r, (%s))' % (dst, src, trf.name, ''.join([arg + ', ' for arg in args])))
+		return dst
+
+	def emitCongruentCons(self, trf, src, ctx):
+		self.stmt('if %s.type != %d:' % (src, aterm.types.CONS))
+		self.stmt('\t' + self.failure())
+		head = self.var()
+		tail = self.var()
+		self.stmt('%s = %s.head' % (head, src))
+		self.stmt('%s = %s.tail' % (tail, src))
+		if type(trf) is congruent._ConsR:
+			newTail = self.emit(trf.tail, tail, ctx)
+			newHead = self.emit(trf.head, head, ctx)
+		else:
+			newHead = self.emit(trf.head, head, ctx)
+			newTail = self.emit(trf.tail, tail, ctx)
+		if newHead is head and newTail is tail:
+			return src
+		dst = self.var()
+		self.stmt('if %s is not %s or %s is not %s:' % (newHead, head, newTail, tail))
+		self.stmt('\t%s = %s.factory.makeCons(%s, %s)' % (dst, src, newHead, newTail))
+		self.stmt('else:')
+		self.stmt('\t%s = %s' % (dst, src))
+		return dst
+
+	def emitCongruentAppl(self, trf, src, ctx):
+		args = self.emitAppl(trf, src)
+		newArgs = [self.emit(self_arg, arg, ctx) for self_arg, arg in zip(trf.args, args)]
+		modified = [(arg, newArg) for arg, newArg in zip(args, newArgs) if newArg is not arg]
+		if not modified:
+			return src
+		dst = self.var()
+		self.stmt('if %s:' % ' or '.join(['%s is not %s' % (newArg, arg) for arg, newArg in modified]))
+		self.stmt('\t%s = %s.factory.makeAppl(%r, (%s), %s.annotations)' % (dst, src, trf.name, ''.join([arg + ', ' for arg in newArgs]), src))
+		self.stmt('else:')
+		self.stmt('\t%s = %s' % (dst, src))
+		return dst
+
+
+def Specialize(operand):
+	'''Specialize a transformation into a Python function.'''
+	if type(operand) is Specialized:
+		return operand
+	generator = _Generator()
+	generator.share([operand])
+	name = generator.function(operand)
+	try:
+		namespace = generator.generate()
+	except SyntaxError:
+		# the generated code exceeds some limit of the Python compiler
+		return operand
+	return Specialized(namespace[name], operand)
+
+
+def specializeProxies(proxies):
+	'''Specialize the subjects of the given proxies -- typically the
+	definitions of a module -- together, so that they call each other
+	directly.'''
+	generator = _Generator()
+	proxies = [proxy for proxy in proxies if type(proxy) is util.Proxy and proxy.subject is not None and type(proxy.subject) is not Specialized]
+	generator.share(proxies)
+	names = [generator.function(proxy) for proxy in proxies]
+	try:
+		namespace = generator.generate()
+	except SyntaxError:
+		# the generated code exceeds some limit of the Python compiler, so
+		# the proxies are left unspecialized
+		return
+	for proxy, name in zip(proxies, names):
+		proxy.subject = Specialized(namespace[name], proxy.subject)
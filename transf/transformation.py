@@ -6,9 +6,24 @@
 import aterm.factory
 import aterm.term
 
+from transf import exception
 from transf import context
 
 
+class _Type(type):
+	'''Metaclass of transformations, which resolves once per class whether
+	L{Transformation.tryApply} must be implemented in terms of
+	L{Transformation.apply}, instead of checking it on every call.'''
+
+	def __init__(cls, name, bases, dic):
+		super(_Type, cls).__init__(name, bases, dic)
+		root = [klass for klass in cls.__mro__ if isinstance(klass, _Type)][-1]
+		tryApply = getattr(cls.tryApply, 'im_func', None)
+		apply = getattr(cls.apply, 'im_func', None)
+		if tryApply is root.__dict__['tryApply'] and apply is not root.__dict__['apply']:
+			cls.tryApply = root.__dict__['_tryApply']
+
+
 class Transformation(object):
 	'''Abstract class for term transformations.
 
@@ -19,8 +34,16 @@ class Transformation(object):
 	A transformation should B{not} maintain any state itself, i.e., different calls
 	to the L{apply} method with the same term and context must produce the same
 	result.
+
+	Failures can also be signaled by returning None from the L{tryApply}
+	method, which avoids the cost of raising and catching exceptions where
+	failures are common, e.g., in choices and traversals. Derived classes
+	must override at least one of L{apply} and L{tryApply}, as each is
+	implemented in terms of the other.
 	'''
 
+	__metaclass__ = _Type
+
 	__slots__ = []
 
 	def __init__(self):
@@ -44,8 +67,32 @@ class Transformation(object):
 		@return: The transformed term on success.
 		@raise exception.Failure: on failure.
 		'''
+		result = self.tryApply(trm, ctx)
+		if result is None:
+			if exception.DEBUG:
+				raise exception.Failure('transformation failed', self, trm)
+			raise exception.Failure
+		return result
+
+	def tryApply(self, trm, ctx):
+		'''Applies the transformation to the given term with the specified
+		context, returning None on failure instead of raising an exception.
+
+		@param trm: L{Term<aterm.term.Term>} to be transformed.
+		@param ctx: Transformation L{context<context.Context>}.
+		@return: The transformed term on success, None on failure.
+		'''
+		# neither apply nor tryApply was overridden; classes which override
+		# apply get _tryApply instead
 		raise NotImplementedError
 
+	def _tryApply(self, trm, ctx):
+		'''Default L{tryApply}, implemented in terms of L{apply}.'''
+		try:
+			return self.apply(trm, ctx)
+		except exception.Failure:
+			return None
+
 	def __neg__(self):
 		'''Negation operator. Shorthand for L{lib.combine.Not}'''
 		#warnings.warn("using deprecated negation operator", DeprecationWarning, stacklevel=2)
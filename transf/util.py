@@ -47,6 +47,11 @@ class Proxy(transformation.Transformation):
 			raise exception.Fatal('subject transformation not specified')
 		return self.subject.apply(trm, ctx)
 
+	def tryApply(self, trm, ctx):
+		if self.subject is None:
+			raise exception.Fatal('subject transformation not specified')
+		return self.subject.tryApply(trm, ctx)
+
 	def __repr__(self):
 		return '<%s ...>' % (self.__class__.__name__,)
 
@@ -9,6 +9,7 @@ import os.path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(sys.argv[0]), '..')))
 
 import aterm.factory
+import aterm.metrics
 import box
 import ir.path
 import ir.check
@@ -28,7 +29,7 @@ def pretty_print(term):
 	sys.stderr.write(box.stringify(boxes, formatter))
 
 
-def translate(fpin, fpout, verbose = True):
+def translate(fpin, fpout, verbose = True, binary = False, shared = False):
 	if verbose:
 		sys.stderr.write('* %s *\n' % fpin.name)
 		sys.stderr.write('\n')
@@ -41,7 +42,9 @@ def translate(fpin, fpout, verbose = True):
 
 	mach = machine.pentium.Pentium()
 	term = mach.load(factory, fpin)
+	aterm.metrics.dump(factory, 'load')
 	ir.check.module(term)
+	aterm.metrics.dump(factory, 'check')
 
 	if verbose:
 		sys.stderr.write('** Low-level IR **\n')
@@ -51,7 +54,9 @@ def translate(fpin, fpout, verbose = True):
 		sys.stderr.write('\n')
 
 	term = mach.translate(term)
+	aterm.metrics.dump(factory, 'translate')
 	ir.check.module(term)
+	aterm.metrics.dump(factory, 'check')
 
 	if verbose:
 		sys.stderr.write('** Translated IR **\n')
@@ -63,8 +68,15 @@ def translate(fpin, fpout, verbose = True):
 		sys.stderr.write('\n')
 
 	term = ir.path.annotate(term)
+	aterm.metrics.dump(factory, 'annotate')
 
-	term.writeToTextFile(fpout)
+	if binary:
+		term.writeToBinaryFile(fpout)
+	elif shared:
+		term.writeToSharedTextFile(fpout)
+	else:
+		term.writeToTextFile(fpout)
+	aterm.metrics.dump(factory, 'write')
 
 
 def main():
@@ -75,6 +87,14 @@ def main():
 		'-o', '--output',
 		type = "string", dest = "output",
 		help = "specify output file")
+	parser.add_option(
+		'-b', '--binary',
+		action = "store_true", dest = "binary", default = False,
+		help = "write the output in the binary format")
+	parser.add_option(
+		'--shared',
+		action = "store_true", dest = "shared", default = False,
+		help = "write the output in the shared textual format")
 	parser.add_option(
 		'-v', '--verbose',
 		action = "count", dest = "verbose", default = 1,
@@ -87,28 +107,44 @@ def main():
 		'-p', '--profile',
 		action = "store_true", dest = "profile", default = False,
 		help = "collect profiling information")
+	parser.add_option(
+		'-m', '--metrics',
+		action = "store_true", dest = "metrics", default = False,
+		help = "report the term layer metrics of every stage")
+	parser.add_option(
+		'-s', '--sample-checks',
+		type = "int", dest = "sample_checks", default = 1, metavar = "N",
+		help = "only check one in every N intermediate code terms")
 	(options, args) = parser.parse_args(sys.argv[1:])
 
+	ir.check.setSampling(options.sample_checks)
+	factory.setMetrics(options.metrics)
+
+	if options.binary:
+		mode = 'wb'
+	else:
+		mode = 'wt'
+
 	for arg in args:
 		fpin = file(arg, 'rt')
 
 		if options.output is None:
 			root, ext = os.path.splitext(arg)
-			fpout = file(root + '.aterm', 'wt')
+			fpout = file(root + '.aterm', mode)
 		elif options.output is '-':
 			fpout = sys.stdout
 		else:
-			fpout = file(options.output, 'wt')
+			fpout = file(options.output, mode)
 
 		if options.profile:
 			import hotshot
 			root, ext = os.path.splitext(arg)
 			profname = root + '.prof'
 			prof = hotshot.Profile(profname, lineevents=0)
-			prof.runcall(translate, fpin, fpout, options.verbose)
+			prof.runcall(translate, fpin, fpout, options.verbose, options.binary, options.shared)
 			prof.close()
 		else:
-			translate(fpin, fpout, options.verbose)
+			translate(fpin, fpout, options.verbose, options.binary, options.shared)
 
 
 if __name__ == '__main__':
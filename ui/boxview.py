@@ -5,6 +5,7 @@ import gtk
 import pango
 
 import box
+import ir.path
 import ir.pprint
 
 from ui.menus import PopupMenu
@@ -126,7 +127,9 @@ class BoxBuffer(gtk.TextBuffer):
 		model.connect('notify::selection', self.on_selection_update)
 
 	def on_term_update(self, term):
-		boxes = ir.pprint.module(term)
+		# the printed boxes carry the term paths which map the text back into
+		# the term
+		boxes = ir.pprint.module(ir.path.annotate(term))
 		self.set_text("")
 		self.range = None
 		self.path_range = {}
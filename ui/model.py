@@ -2,6 +2,7 @@
 
 
 import aterm.factory
+import aterm.metrics
 import aterm.term
 import ir.path
 import ir.pprint
@@ -44,8 +45,8 @@ class Model:
 		return self._term
 
 	def set_term(self, term):
-		# keep term paths annotated
-		self._term = ir.path.annotate(term)
+		# selection paths are annotated by the refactorings as needed
+		self._term = term
 		self._selection = self._default_selection
 		self.notify('notify::term', self._term)
 		self.notify('notify::selection', self._selection)
@@ -77,23 +78,33 @@ class Model:
 		machine = Pentium()
 		# TODO: catch exceptions here
 		term = machine.load(_factory, file(filename, 'rt'))
+		aterm.metrics.dump(_factory, 'load')
 		term = machine.translate(term)
+		aterm.metrics.dump(_factory, 'translate')
 		self.set_term(term)
 		self.clean_history()
 
 	def open_ir(self, filename):
-		"""Open a text file with the intermediate representation."""
+		"""Open a text or binary file with the intermediate representation."""
 		self.filename = filename
-		fp = file(filename, 'rt')
-		term = _factory.readFromTextFile(fp)
-		self.set_term(term)
+		fp = file(filename, 'rb')
+		term = _factory.readFromFile(fp)
+		aterm.metrics.dump(_factory, 'read')
+		self.set_term(ir.path.deannotate(term))
 		self.clean_history()
 
-	def save_ir(self, filename):
-		"""Save a text file with the intermediate representation."""
+	def save_ir(self, filename, binary = False, shared = False):
+		"""Save a text or binary file with the intermediate representation."""
 		term = self.get_term()
-		fp = file(filename, 'wt')
-		term.writeToTextFile(fp)
+		if binary:
+			fp = file(filename, 'wb')
+			term.writeToBinaryFile(fp)
+		elif shared:
+			fp = file(filename, 'wt')
+			term.writeToSharedTextFile(fp)
+		else:
+			fp = file(filename, 'wt')
+			term.writeToTextFile(fp)
 
 	def export_c(self, filename):
 		"""Export C code."""
@@ -115,6 +126,7 @@ class Model:
 		"""Apply a refactoring."""
 		old_term = self.get_term()
 		new_term = refactoring.apply(old_term, args)
+		aterm.metrics.dump(_factory, 'refactoring')
 		self.set_term(new_term)
 		self._undo_history.append(old_term)
 		self._redo_history = []